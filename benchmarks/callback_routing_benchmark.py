@@ -0,0 +1,129 @@
+"""
+Measure the routing cost of survey answer callbacks.
+
+Compares the previous setup (pydantic CallbackData with one aiogram handler and
+filter per action, registered after the admin handlers) with the compact
+encoding dispatched through the prefix table. Handlers are no-ops, so the numbers
+are the cost of decoding and routing a single callback query.
+
+Usage (from the project root):
+    python benchmarks/callback_routing_benchmark.py [--repeat 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+
+from aiogram import F, Router  # noqa: E402
+from aiogram.filters.callback_data import CallbackData  # noqa: E402
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from aiogram.types import CallbackQuery, User  # noqa: E402
+
+from bot.models.callbacks import AdminCallback, AnswerCallback  # noqa: E402
+from bot.models.state import SurveyStates  # noqa: E402
+from bot.utils.callback_dispatch import AnswerCallbackRouter  # noqa: E402
+
+ACTIONS = ("toggle", "select", "custom", "done")
+ADMIN_ACTIONS = ("all_results", "funnel", "pdf_report", "timeseries")
+
+
+class LegacyAnswerCallback(CallbackData, prefix="ans"):
+    """The previous pydantic answer callback"""
+    action: str
+    question_idx: int
+    answer_idx: Optional[int] = None
+
+
+async def noop(*args, **kwargs) -> None:
+    """Handler that does nothing"""
+
+
+def build_legacy_router() -> Router:
+    """Admin handlers followed by one filtered handler per answer action"""
+    router = Router()
+    for action in ADMIN_ACTIONS:
+        router.callback_query.register(noop, AdminCallback.filter(F.action == action))
+    router.callback_query.register(noop, F.data == "start_survey")
+    for action in ACTIONS:
+        router.callback_query.register(noop, LegacyAnswerCallback.filter(F.action == action))
+    return router
+
+
+def build_compact_router() -> Router:
+    """The answer prefix table in front of the rest of the handlers"""
+    answers = AnswerCallbackRouter()
+    for action in ACTIONS:
+        answers.handler(action)(noop)
+    router = Router()
+    answers.register(router)
+    return router
+
+
+def make_queries(pack) -> list:
+    """Callback queries for every action, as a survey would produce them"""
+    user = User(id=1, is_bot=False, first_name="Benchmark")
+    return [
+        CallbackQuery(id=str(idx), from_user=user, chat_instance="1", data=pack(action, idx % 20 + 1, idx % 6))
+        for idx, action in enumerate(ACTIONS * 25)
+    ]
+
+
+async def survey_state() -> FSMContext:
+    """FSM context of a respondent in the middle of a survey, as the dispatcher would pass it"""
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.set_state(SurveyStates.answering)
+    return state
+
+
+async def measure_routing(router: Router, queries: list, repeat: int) -> float:
+    """Mean seconds to route one callback query through the router"""
+    state = await survey_state()
+    for query in queries:
+        await router.propagate_event("callback_query", query, state=state)
+
+    started = time.perf_counter()
+    for idx in range(repeat):
+        await router.propagate_event("callback_query", queries[idx % len(queries)], state=state)
+    return (time.perf_counter() - started) / repeat
+
+
+def measure_decoding(unpack, values: list, repeat: int) -> float:
+    """Mean seconds to decode one callback data string"""
+    started = time.perf_counter()
+    for idx in range(repeat):
+        unpack(values[idx % len(values)])
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="callbacks per measurement")
+    args = parser.parse_args()
+
+    legacy_queries = make_queries(lambda action, question, answer: LegacyAnswerCallback(
+        action=action, question_idx=question, answer_idx=answer).pack())
+    compact_queries = make_queries(lambda action, question, answer: AnswerCallback(
+        action, question, answer).pack())
+
+    print(f"callback data: {legacy_queries[0].data!r} -> {compact_queries[0].data!r}")
+
+    legacy_decode = measure_decoding(LegacyAnswerCallback.unpack, [q.data for q in legacy_queries], args.repeat)
+    compact_decode = measure_decoding(AnswerCallback.unpack, [q.data for q in compact_queries], args.repeat)
+    print(f"decode: pydantic {legacy_decode * 1e6:.2f} µs, compact {compact_decode * 1e6:.2f} µs "
+          f"({legacy_decode / compact_decode:.1f}x)")
+
+    legacy_route = asyncio.run(measure_routing(build_legacy_router(), legacy_queries, args.repeat))
+    compact_route = asyncio.run(measure_routing(build_compact_router(), compact_queries, args.repeat))
+    print(f"route: filter chain {legacy_route * 1e6:.1f} µs, prefix table {compact_route * 1e6:.1f} µs "
+          f"({legacy_route / compact_route:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the matplotlib and Pillow chart backends.
+
+Renders the same pie and bar charts with both backends and reports the mean
+render time, peak Python memory (tracemalloc) and PNG size. With --save the
+charts are written to the current directory for a visual comparison.
+
+Usage (from the project root):
+    python benchmarks/chart_backends_benchmark.py [--repeat 20] [--save]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+
+from bot.utils.visualization import get_chart_renderer  # noqa: E402
+
+PIE_TITLE = "Питання 3:\nДе ви зазвичай купуєте продукти?"
+PIE_LABELS = ["Супермаркети (АТБ, Сільпо тощо)", "Ринок", "Інтернет-магазини", "Локальні магазини",
+              "Безпосередньо у фермерів"]
+PIE_VALUES = [412, 233, 97, 158, 41]
+
+BAR_TITLE = "Опитування за днями"
+BAR_LABELS = [f"{day:02d}.05" for day in range(1, 15)]
+BAR_SERIES = {
+    "Розпочали": [120, 98, 143, 77, 65, 201, 188, 150, 132, 90, 84, 111, 170, 160],
+    "Завершили": [80, 61, 99, 50, 41, 150, 120, 101, 93, 60, 55, 70, 119, 104],
+}
+
+
+def measure(render, repeat: int):
+    """Return mean seconds, peak traced memory and PNG size of a render call"""
+    render()  # Warm up fonts, imports and caches
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    buffer = render()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return elapsed, peak, buffer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="renders per measurement")
+    parser.add_argument("--save", action="store_true", help="write the rendered charts as PNG files")
+    args = parser.parse_args()
+
+    for backend in ("matplotlib", "pillow"):
+        started = time.perf_counter()
+        renderer = get_chart_renderer(backend)
+        import_seconds = time.perf_counter() - started
+        print(f"{backend}: import {import_seconds * 1000:.0f} ms")
+
+        charts = {
+            "pie": lambda: renderer.render_pie_chart(PIE_TITLE, PIE_LABELS, PIE_VALUES),
+            "bar": lambda: renderer.render_bar_chart(BAR_TITLE, BAR_LABELS, BAR_SERIES),
+        }
+        for chart, render in charts.items():
+            elapsed, peak, buffer = measure(render, args.repeat)
+            png = buffer.getvalue()
+            print(f"  {chart}: {elapsed * 1000:.1f} ms/chart, peak {peak / 1024:.0f} KiB, PNG {len(png) / 1024:.0f} KiB")
+            if args.save:
+                with open(f"{chart}_{backend}.png", "wb") as image_file:
+                    image_file.write(png)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Replay recorded update traffic through the bot's dispatcher.
+
+Feeds updates recorded with RECORD_UPDATES=1 (see bot/utils/recorder.py) to the
+Dispatcher built by bot/main.py, keeping their original spacing at 1x or an accelerated
+speed. Bot API calls go to an in-process mock that answers after a fixed latency, and
+the database is a fresh one (or a copy of --database) in a scratch folder, so production
+data is never touched. Updates of one chat are handled in their recorded order, updates of
+different chats run concurrently as with polling; --sequential handles them one by one for
+a fully deterministic run.
+
+Reports handler latency percentiles per kind of update, how late updates started
+compared to their schedule, SQL statement timings of the write and read engines with
+"database is locked" errors, Bot API calls and the resulting row counts.
+
+Usage (from the project root):
+    python benchmarks/replay_updates.py recordings/updates_2026-10-19.jsonl.gz [--speed 60]
+        [--sequential] [--api-latency 0.05] [--database survey_data.db] [--workdir DIR]
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import (  # noqa: E402
+    GetMe, SendDocument, SendMediaGroup, SendMessage, SendPhoto, TelegramMethod
+)
+from aiogram.types import Chat, Document, Message, PhotoSize, Update, User  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from bot.configs import bot  # noqa: E402
+from bot.db import database  # noqa: E402
+from bot.db.checkpoints import checkpointer  # noqa: E402
+from bot.main import create_dispatcher  # noqa: E402
+from bot.models.callbacks import AnswerCallback  # noqa: E402
+from bot.utils.recorder import read_recording  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+
+
+class MockSession(BaseSession):
+    """Bot API session that answers every request locally after a fixed delay"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    def _message(self, method: TelegramMethod, **content: Any) -> Message:
+        chat_id = getattr(method, "chat_id", 0)
+        return Message(
+            message_id=next(self._message_ids),
+            date=datetime.now(),
+            chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            **content
+        )
+
+    def _file(self) -> Dict[str, str]:
+        file_number = next(self._file_ids)
+        return {"file_id": f"replay-file-{file_number}", "file_unique_id": f"replay-{file_number}"}
+
+    async def make_request(self, bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, GetMe):
+            result = User(id=bot.id, is_bot=True, first_name="Replay", username="replay_bot")
+        elif isinstance(method, SendMessage):
+            result = self._message(method, text=method.text)
+        elif isinstance(method, SendPhoto):
+            result = self._message(method, photo=[PhotoSize(width=800, height=600, **self._file())])
+        elif isinstance(method, SendDocument):
+            result = self._message(method, document=Document(**self._file()))
+        elif isinstance(method, SendMediaGroup):
+            result = [
+                self._message(method, photo=[PhotoSize(width=800, height=600, **self._file())])
+                for _ in method.media
+            ]
+        else:
+            # Answers to callbacks, edits and the rest only report success
+            result = True
+
+        if isinstance(result, list):
+            return [item.as_(bot) for item in result]
+        return result.as_(bot) if isinstance(result, Message) else result
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class StatementTimer:
+    """Times every SQL statement of an engine and counts lock errors"""
+
+    def __init__(self, engine):
+        self.durations: List[float] = []
+        self.locked = 0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("replay_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.durations.append(time.perf_counter() - conn.info["replay_started"].pop())
+
+    def _error(self, context):
+        if context.connection is not None and context.connection.info.get("replay_started"):
+            context.connection.info["replay_started"].pop()
+        if "database is locked" in str(context.original_exception):
+            self.locked += 1
+
+
+def use_database(path: str) -> None:
+    """Point both engines at another database file, they resolved the relative DB_PATH at import"""
+    def redirect(dialect, connection_record, cargs, cparams):
+        cargs[0] = path
+
+    for engine in (database.ENGINE, database.READ_ENGINE):
+        engine.dispose()
+        event.listen(engine, "do_connect", redirect)
+
+
+def update_kind(update: Dict[str, Any]) -> str:
+    """Group an update by what the bot does with it"""
+    if "message" in update:
+        text = update["message"].get("text") or ""
+        if text.startswith("/"):
+            return "command " + text.split()[0].split("@")[0]
+        return "message"
+    if "callback_query" in update:
+        data = update["callback_query"].get("data") or ""
+        answer = AnswerCallback.unpack(data)
+        if answer:
+            return f"answer {answer.action}"
+        if data.startswith("admin:"):
+            return "admin " + data.split(":")[1]
+        return "callback " + data.split(":")[0]
+    return next((key for key in update if key != "update_id"), "unknown")
+
+
+def chat_key(update: Dict[str, Any]) -> Optional[int]:
+    """The user whose updates must be handled in order"""
+    for key in ("message", "callback_query", "edited_message"):
+        if key in update:
+            return update[key].get("from", {}).get("id")
+    return None
+
+
+def percentiles(values: List[float]) -> str:
+    """Format p50/p90/p99/max of durations in milliseconds"""
+    if len(values) < 2:
+        return f"max {max(values, default=0) * 1000:8.1f} ms"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    parts = [f"p{p} {cuts[p - 1] * 1000:8.1f}" for p in PERCENTILES]
+    return " ".join(parts) + f" max {max(values) * 1000:8.1f} ms"
+
+
+async def replay(paths: List[str], speed: float, sequential: bool) -> Dict[str, Any]:
+    """Feed the recorded updates to the dispatcher and collect their timings"""
+    dp = create_dispatcher()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    lateness: List[float] = []
+    failures: Counter = Counter()
+    last_task: Dict[int, asyncio.Task] = {}
+    tasks = set()
+
+    async def handle(update: Dict[str, Any], due: float, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        started = time.perf_counter()
+        lateness.append(max(0.0, started - due))
+        kind = update_kind(update)
+        try:
+            await dp.feed_update(bot, Update.model_validate(update, context={"bot": bot}))
+        except Exception as e:
+            failures[f"{kind}: {type(e).__name__}"] += 1
+        latencies[kind].append(time.perf_counter() - started)
+
+    checkpointer.start()
+    replay_started = time.perf_counter()
+    first_time = None
+    try:
+        entries = itertools.chain.from_iterable(read_recording(path) for path in paths)
+        for recorded_at, update in entries:
+            first_time = recorded_at if first_time is None else first_time
+            due = replay_started + ((recorded_at - first_time) / speed if speed else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if sequential:
+                await handle(update, due, None)
+                continue
+            user_id = chat_key(update)
+            task = asyncio.create_task(handle(update, due, last_task.get(user_id)))
+            last_task[user_id] = task
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        await checkpointer.stop()
+
+    return {
+        "seconds": time.perf_counter() - replay_started,
+        "latencies": latencies,
+        "lateness": lateness,
+        "failures": failures,
+    }
+
+
+def row_counts(db_path: str) -> Dict[str, int]:
+    """Rows left in the replay database, to compare runs with each other"""
+    connection = sqlite3.connect(db_path)
+    try:
+        counts = {
+            table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "answers")
+        }
+        counts["completed runs"] = connection.execute(
+            "SELECT COUNT(*) FROM users WHERE end_time IS NOT NULL").fetchone()[0]
+        return counts
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+", help="recorded files (or glob patterns), replayed in the given order")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="time acceleration, e.g. 60 replays an hour in a minute; 0 = no waiting at all")
+    parser.add_argument("--sequential", action="store_true", help="handle one update at a time")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds every Bot API call takes")
+    parser.add_argument("--database", help="start from a copy of this database instead of an empty one")
+    parser.add_argument("--workdir", help="folder for the replay databases (a temporary one by default)")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's info logs")
+    args = parser.parse_args()
+
+    paths = [path for pattern in args.recordings for path in sorted(glob.glob(pattern)) or [pattern]]
+    paths = [os.path.abspath(path) for path in paths]
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"recording not found: {', '.join(missing)}")
+    if not args.verbose:
+        logging.getLogger("project_logger").setLevel(logging.WARNING)
+
+    # Everything is written to the scratch folder (the archive path is relative to the working directory)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="survey-replay-"))
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, database.DB_PATH)
+    if args.database:
+        shutil.copyfile(args.database, db_path)
+    os.chdir(workdir)
+    use_database(db_path)
+    database.init_db()
+
+    session = MockSession(args.api_latency)
+    bot.session = session
+    writes = StatementTimer(database.ENGINE)
+    reads = StatementTimer(database.READ_ENGINE)
+
+    result = asyncio.run(replay(paths, args.speed, args.sequential))
+
+    latencies = result["latencies"]
+    total = sum(len(values) for values in latencies.values())
+    mode = "sequential" if args.sequential else "concurrent"
+    speed = f"{args.speed:g}x" if args.speed else "no waiting"
+    print(f"Replayed {total} updates in {result['seconds']:.1f} s ({speed}, {mode}, "
+          f"API latency {args.api_latency * 1000:.0f} ms), {total / max(result['seconds'], 1e-9):.1f} updates/s")
+    print(f"Database: {db_path}")
+
+    print("\nHandler latency:")
+    for kind in sorted(latencies, key=lambda kind: -len(latencies[kind])):
+        print(f"  {kind:<24} {len(latencies[kind]):>7}  {percentiles(latencies[kind])}")
+    if args.speed:
+        print(f"  {'start delay':<24} {len(result['lateness']):>7}  {percentiles(result['lateness'])}")
+
+    print("\nDatabase statements:")
+    for name, timer in (("write engine", writes), ("read engine", reads)):
+        print(f"  {name:<24} {len(timer.durations):>7}  {percentiles(timer.durations)}  "
+              f"total {sum(timer.durations):.2f} s, locked errors {timer.locked}")
+
+    print("\nBot API calls: " + ", ".join(f"{name} {count}" for name, count in session.calls.most_common()))
+    if result["failures"]:
+        print("Failed updates: " + ", ".join(f"{name} {count}" for name, count in result["failures"].most_common()))
+    print("Rows: " + ", ".join(f"{table} {count}" for table, count in row_counts(db_path).items()))
+
+
+if __name__ == "__main__":
+    main()
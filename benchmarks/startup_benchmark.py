@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark of the bot process.
+
+Every measurement runs in a fresh interpreter, imports the bot modules the way
+bot/main.py does and registers all handlers. Reports import time, peak RSS and
+which heavy analytics libraries ended up loaded.
+
+Usage (from the project root):
+    python benchmarks/startup_benchmark.py [--runs 5] [--admin]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+
+from aiogram import Router
+from bot.handlers.admin_handlers import register_admin_handlers
+from bot.handlers.survey_handlers import register_survey_handlers
+
+router = Router()
+register_admin_handlers(router)
+register_survey_handlers(router)
+if {admin}:
+    import bot.utils.visualization
+
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": sorted(m for m in ("pandas", "matplotlib", "numpy") if m in sys.modules)
+}}))
+"""
+
+
+def measure(admin: bool) -> dict:
+    """Start a fresh interpreter and return its startup measurements"""
+    env = dict(os.environ, BOT_TOKEN=os.environ.get("BOT_TOKEN", "123456:benchmark"))
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT.format(admin=admin)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--admin", action="store_true", help="also load the charting stack, as on the first admin click")
+    args = parser.parse_args()
+
+    samples = [measure(args.admin) for _ in range(args.runs)]
+    seconds = [sample["seconds"] for sample in samples]
+    rss = [sample["max_rss_mb"] for sample in samples]
+
+    path = "survey + admin charts" if args.admin else "survey only"
+    print(f"Startup path: {path} ({args.runs} runs)")
+    print(f"  import + registration: median {statistics.median(seconds) * 1000:.0f} ms, "
+          f"min {min(seconds) * 1000:.0f} ms")
+    print(f"  peak RSS: median {statistics.median(rss):.1f} MB")
+    print(f"  heavy modules loaded: {', '.join(samples[-1]['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,3 +23,60 @@ dp = Dispatcher()
 ADMIN_IDS = [446915311, 299793265]
 
 IMAGES_FOLDER = os.path.join(CURRENT_FOLDER, "src")
+
+# Surveys served by the bot: QUESTIONS_FILE and IMAGES_FOLDER make up the default survey,
+# every SURVEYS_FOLDER/<survey id>/ with a questions.json (and images in src/) adds another one.
+# Respondents open a survey with the deep link t.me/<bot>?start=<survey id>.
+DEFAULT_SURVEY: Final[str] = os.getenv('DEFAULT_SURVEY', 'main')
+SURVEYS_FOLDER = os.path.join(CURRENT_FOLDER, "surveys")
+
+# What happens to earlier answers when a user takes the survey again:
+# "latest" - they are deleted when the new run saves its first answer, "all" - every run is kept.
+# Analytics always count only the latest run of each respondent.
+RETAKE_POLICY: Final[str] = os.getenv('RETAKE_POLICY', 'latest')
+if RETAKE_POLICY not in ("latest", "all"):
+    raise ValueError(f"RETAKE_POLICY має бути 'latest' або 'all', отримано '{RETAKE_POLICY}'")
+
+# Chart rendering backend: "matplotlib" or "pillow" (faster, lighter)
+CHART_BACKEND: Final[str] = os.getenv('CHART_BACKEND', 'matplotlib')
+# TrueType fonts with Cyrillic glyphs for the pillow backend, common system fonts are tried when not set
+CHART_FONT_PATH = os.getenv('CHART_FONT_PATH')
+CHART_FONT_BOLD_PATH = os.getenv('CHART_FONT_BOLD_PATH')
+
+# Google Sheets export (disabled when GOOGLE_SHEETS_ID is not set)
+GOOGLE_SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID')
+GOOGLE_SHEETS_WORKSHEET = os.getenv('GOOGLE_SHEETS_WORKSHEET', 'Відповіді')
+GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', os.path.join(CURRENT_FOLDER, 'credentials.json'))
+# Base URL of a Sheets-compatible REST API (e.g. a local fake server), gspread is used when empty
+SHEETS_API_URL = os.getenv('SHEETS_API_URL')
+SHEETS_SYNC_INTERVAL = int(os.getenv('SHEETS_SYNC_INTERVAL', '300'))
+
+# Sampling profiler: fraction of updates to profile (0 disables it, admins can change it with /profile),
+# stack sampling interval and the folder for collapsed stack files
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = int(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILES_FOLDER = os.path.join(CURRENT_FOLDER, "profiles")
+
+# FSM sessions memory budget: total size in MB and session count (0 - unlimited).
+# Only sessions idle for at least SESSION_MIN_IDLE_MINUTES are evicted, oldest first.
+SESSION_MEMORY_BUDGET_MB = float(os.getenv('SESSION_MEMORY_BUDGET_MB', '64'))
+SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', '0'))
+SESSION_MIN_IDLE_MINUTES = float(os.getenv('SESSION_MIN_IDLE_MINUTES', '30'))
+
+# Retention: answers of respondents inactive for this many days are moved to the archive
+# database with precomputed tallies (0 disables archival), checked every ARCHIVE_INTERVAL_HOURS
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_INTERVAL_HOURS = int(os.getenv('ARCHIVE_INTERVAL_HOURS', '24'))
+
+# Traffic recording: every incoming update is appended with its arrival time to a gzipped
+# JSON Lines file per day in RECORDINGS_FOLDER (replay them with benchmarks/replay_updates.py).
+# Recordings contain the users' messages, enable it only where that is acceptable.
+RECORD_UPDATES = os.getenv('RECORD_UPDATES', '0') == '1'
+RECORDINGS_FOLDER = os.path.join(CURRENT_FOLDER, "recordings")
+
+# Reminders for abandoned surveys: hours of inactivity after which each successive reminder is sent
+# (comma-separated, empty disables reminders) and the limit of reminder messages per second,
+# which leaves room for the survey traffic within Telegram's ~30 messages per second
+REMINDER_DELAYS_HOURS = [float(hours) for hours in os.getenv('REMINDER_DELAYS_HOURS', '24,72').split(',')
+                         if hours.strip()]
+REMINDER_RATE_PER_SECOND = float(os.getenv('REMINDER_RATE_PER_SECOND', '10'))
@@ -0,0 +1,263 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import DateTime, bindparam, func, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.configs import DEFAULT_SURVEY
+from bot.db.database import get_read_session, LATEST_RUN, ALL_ANSWERS, ALL_ANSWERS_LATEST_RUN
+from bot.db.models import Answer, User, ArchivedTally
+from bot.logger import error, debug
+
+# All answers of the runs that were touched since the given moment, timestamps as Unix seconds
+TOUCHED_RUNS_QUERY = text("""
+WITH touched AS (
+    SELECT DISTINCT user_id, run FROM answers WHERE survey_id = :survey_id AND timestamp >= :since
+)
+SELECT
+    a.user_id,
+    a.run,
+    a.question_id,
+    a.answer_text,
+    (julianday(a.timestamp) - 2440587.5) * 86400.0 AS answered_at,
+    CASE WHEN u.run = a.run THEN (julianday(u.start_time) - 2440587.5) * 86400.0 END AS started_at
+FROM touched AS t
+JOIN answers AS a ON a.user_id = t.user_id AND a.survey_id = :survey_id AND a.run = t.run
+JOIN users AS u ON u.user_id = a.user_id AND u.survey_id = a.survey_id
+""").bindparams(bindparam("since", type_=DateTime))
+
+# Every answer of every run, archived ones included, for the first (cold) load; same columns as above
+ALL_RUNS_QUERY = text("""
+WITH all_answers AS (
+    SELECT user_id, run, question_id, answer_text, timestamp FROM answers WHERE survey_id = :survey_id
+    UNION ALL
+    SELECT user_id, run, question_id, answer_text, timestamp FROM archive.archived_answers
+    WHERE survey_id = :survey_id AND id NOT IN (SELECT id FROM answers)
+)
+SELECT
+    a.user_id,
+    a.run,
+    a.question_id,
+    a.answer_text,
+    (julianday(a.timestamp) - 2440587.5) * 86400.0 AS answered_at,
+    CASE WHEN u.run = a.run THEN (julianday(u.start_time) - 2440587.5) * 86400.0 END AS started_at
+FROM all_answers AS a
+JOIN users AS u ON u.user_id = a.user_id AND u.survey_id = :survey_id
+""")
+
+# Completed runs that have answers newer than the cursor, in the order they were finished
+NEW_COMPLETED_RUNS_QUERY = text("""
+WITH candidates AS (
+    SELECT DISTINCT user_id, run FROM answers WHERE id > :cursor AND survey_id = :survey_id
+),
+runs AS (
+    SELECT a.user_id, a.run, MAX(a.id) AS last_id
+    FROM candidates AS c
+    JOIN answers AS a ON a.user_id = c.user_id AND a.survey_id = :survey_id AND a.run = c.run
+    JOIN users AS u ON u.user_id = a.user_id AND u.survey_id = a.survey_id
+    GROUP BY a.user_id, a.run
+    HAVING MAX(a.question_id = :last_question_id) OR MAX(u.run = a.run AND u.completed_survey)
+    ORDER BY last_id
+    LIMIT :limit
+)
+SELECT r.last_id, a.user_id, a.run, a.question_id, a.answer_text, a.custom_answer, a.timestamp
+FROM runs AS r
+JOIN answers AS a ON a.user_id = r.user_id AND a.survey_id = :survey_id AND a.run = r.run
+ORDER BY r.last_id, a.question_id
+""")
+
+# Event times (as Unix seconds of the stored local time) in a range, served by the column indexes
+EVENT_TIME_QUERIES = {
+    "started": "SELECT (julianday(start_time) - 2440587.5) * 86400.0 FROM users "
+               "WHERE survey_id = :survey_id AND start_time >= :since AND start_time < :until",
+    "completed": "SELECT (julianday(end_time) - 2440587.5) * 86400.0 FROM users "
+                 "WHERE survey_id = :survey_id AND end_time >= :since AND end_time < :until AND completed_survey",
+    "answers": "SELECT (julianday(timestamp) - 2440587.5) * 86400.0 FROM answers "
+               "WHERE survey_id = :survey_id AND timestamp >= :since AND timestamp < :until",
+}
+
+# Unfinished runs in which not a single question was answered
+EMPTY_RUNS_QUERY = text("""
+SELECT u.start_time < :idle_cutoff AS idle, COUNT(*) AS total
+FROM users AS u
+WHERE u.survey_id = :survey_id AND NOT u.completed_survey
+  AND NOT EXISTS (
+      SELECT 1 FROM answers AS a WHERE a.user_id = u.user_id AND a.survey_id = u.survey_id AND a.run = u.run
+  )
+  AND NOT EXISTS (
+      SELECT 1 FROM archive.archived_answers AS a
+      WHERE a.user_id = u.user_id AND a.survey_id = u.survey_id AND a.run = u.run
+  )
+GROUP BY 1
+""").bindparams(bindparam("idle_cutoff", type_=DateTime))
+
+
+def get_touched_run_answers(since: Optional[datetime], survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """
+    Get every answer of the runs that have answers written at or after `since`
+    (all runs, archived ones included, if None).
+
+    Returns rows of (user_id, run, question_id, answer_text, answered_at, started_at).
+    """
+    session = get_read_session()
+    try:
+        if since is None:
+            # Archived respondents only change through archival, so they are read on the cold load only
+            rows = session.execute(ALL_RUNS_QUERY, {"survey_id": survey_id}).all()
+        else:
+            rows = session.execute(TOUCHED_RUNS_QUERY, {"since": since, "survey_id": survey_id}).all()
+        debug(f"Отримано {len(rows)} відповідей змінених спроб з {since}")
+        return rows
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання відповідей змінених спроб: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_empty_run_counts(idle_cutoff: datetime, survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """Get (idle, total) counts of unfinished runs that have no answers yet"""
+    session = get_read_session()
+    try:
+        return session.execute(EMPTY_RUNS_QUERY, {"idle_cutoff": idle_cutoff, "survey_id": survey_id}).all()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання незавершених спроб без відповідей: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_answer_text_counts(question_id: int, survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """Get (answer_text, count) pairs for a question, grouped by the database"""
+    session = get_read_session()
+    try:
+        hot_rows = (
+            session.query(Answer.answer_text, func.count())
+            .join(User, LATEST_RUN)
+            .filter(Answer.survey_id == survey_id, Answer.question_id == question_id)
+            .group_by(Answer.answer_text)
+            .all()
+        )
+        # Archived answers are already counted by the retention job
+        archived_rows = (
+            session.query(ArchivedTally.answer_text, ArchivedTally.count)
+            .filter(ArchivedTally.survey_id == survey_id, ArchivedTally.question_id == question_id)
+            .all()
+        )
+
+        counts = {}
+        for answer_text, count in hot_rows + archived_rows:
+            counts[answer_text or ""] = counts.get(answer_text or "", 0) + count
+        rows = list(counts.items())
+        debug(f"Отримано {len(rows)} різних відповідей на питання {question_id}")
+        return rows
+    except SQLAlchemyError as e:
+        error(f"Помилка підрахунку відповідей для питання {question_id}: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def iter_custom_answers(batch_size: int = 500, survey_id: str = DEFAULT_SURVEY) -> Iterator[Tuple[int, str]]:
+    """Stream (question_id, custom_answer) pairs of all free-text answers, archived included, ordered by question"""
+    session = get_read_session()
+    try:
+        query = (
+            session.query(ALL_ANSWERS.c.question_id, ALL_ANSWERS.c.custom_answer)
+            .join(User, ALL_ANSWERS_LATEST_RUN)
+            .filter(ALL_ANSWERS.c.survey_id == survey_id)
+            .filter(ALL_ANSWERS.c.custom_answer.isnot(None), ALL_ANSWERS.c.custom_answer != "")
+            .order_by(ALL_ANSWERS.c.question_id, ALL_ANSWERS.c.id)
+            .yield_per(batch_size)
+        )
+        for question_id, custom_answer in query:
+            yield question_id, custom_answer
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання текстових відповідей: {e}")
+    finally:
+        session.close()
+
+
+def get_new_completed_runs(cursor: int, last_question_id: int, limit: int,
+                           survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """
+    Get the answers of up to `limit` completed runs whose newest Answer id is above the cursor.
+
+    Returns rows of (last_id, user_id, run, question_id, answer_text, custom_answer, timestamp).
+    """
+    session = get_read_session()
+    try:
+        params = {"cursor": cursor, "last_question_id": last_question_id, "limit": limit, "survey_id": survey_id}
+        return session.execute(NEW_COMPLETED_RUNS_QUERY, params).all()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання нових завершених опитувань: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_event_times(event: str, since: datetime, until: datetime, survey_id: str = DEFAULT_SURVEY) -> List[float]:
+    """Get the times of survey starts, completions or answers within [since, until)"""
+    query = text(EVENT_TIME_QUERIES[event]).bindparams(
+        bindparam("since", type_=DateTime), bindparam("until", type_=DateTime)
+    )
+    session = get_read_session()
+    try:
+        return session.execute(query, {"since": since, "until": until, "survey_id": survey_id}).scalars().all()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання часу подій '{event}': {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_answers_since(since: Optional[datetime], survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """
+    Get (user_id, run, question_id, answer_text) of answers written at or after `since`.
+
+    With `since` None every answer is returned, archived ones included.
+    """
+    session = get_read_session()
+    try:
+        if since is None:
+            columns = ALL_ANSWERS.c
+            query = session.query(columns.user_id, columns.run, columns.question_id, columns.answer_text)
+            return query.filter(columns.survey_id == survey_id).order_by(columns.timestamp).all()
+
+        query = session.query(Answer.user_id, Answer.run, Answer.question_id, Answer.answer_text)
+        query = query.filter(Answer.survey_id == survey_id, Answer.timestamp >= since)
+        return query.order_by(Answer.timestamp).all()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання нових відповідей: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_custom_answers_since(since: Optional[datetime], survey_id: str = DEFAULT_SURVEY) -> List[tuple]:
+    """
+    Get (user_id, run, question_id, custom_answer) of answers written at or after `since`.
+
+    With `since` None the non-empty free-text answers of the latest runs are returned, archived ones included.
+    Later reads return every changed answer, so cleared texts and new runs are noticed too.
+    """
+    session = get_read_session()
+    try:
+        if since is None:
+            columns = ALL_ANSWERS.c
+            query = (
+                session.query(columns.user_id, columns.run, columns.question_id, columns.custom_answer)
+                .join(User, ALL_ANSWERS_LATEST_RUN)
+                .filter(columns.survey_id == survey_id)
+                .filter(columns.custom_answer.isnot(None), columns.custom_answer != "")
+            )
+            return query.order_by(columns.timestamp).all()
+
+        query = session.query(Answer.user_id, Answer.run, Answer.question_id, Answer.custom_answer)
+        query = query.filter(Answer.survey_id == survey_id, Answer.timestamp >= since)
+        return query.order_by(Answer.timestamp).all()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання текстових відповідей: {e}")
+        return []
+    finally:
+        session.close()
@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, bindparam, column, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.configs import ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS
+from bot.db.database import ENGINE, get_db_session, _bump_data_version
+from bot.db.models import ArchiveBatch, ARCHIVE_SCHEMA
+from bot.logger import info, warning, error, debug
+
+# Respondents moved to the archive per transaction, so the bot is never blocked for long
+BATCH_SIZE = 1000
+
+# Respondents of a survey whose every answer and latest start are older than the cutoff
+CANDIDATES_QUERY = text("""
+CREATE TEMP TABLE archive_candidates AS
+SELECT u.user_id, u.survey_id FROM users AS u
+WHERE u.start_time < :cutoff
+  AND EXISTS (SELECT 1 FROM answers AS a WHERE a.user_id = u.user_id AND a.survey_id = u.survey_id)
+  AND NOT EXISTS (
+      SELECT 1 FROM answers AS a
+      WHERE a.user_id = u.user_id AND a.survey_id = u.survey_id AND a.timestamp >= :cutoff
+  )
+LIMIT :limit
+""").bindparams(bindparam("cutoff", type_=DateTime))
+
+# In WAL mode a transaction is atomic per database file, not across the attached archive.
+# If the bot stops between the two, the next run must not count or copy the same answers again.
+
+# Latest runs of the candidates are added to the precomputed tallies
+ADD_TALLIES_QUERY = text("""
+INSERT INTO archive.archived_tallies (survey_id, question_id, answer_text, count)
+SELECT a.survey_id, a.question_id, COALESCE(a.answer_text, ''), COUNT(*)
+FROM answers AS a
+JOIN users AS u ON u.user_id = a.user_id AND u.survey_id = a.survey_id AND u.run = a.run
+WHERE (a.user_id, a.survey_id) IN (SELECT user_id, survey_id FROM temp.archive_candidates)
+  AND a.id NOT IN (SELECT id FROM archive.archived_answers)
+GROUP BY 1, 2, 3
+ON CONFLICT (survey_id, question_id, answer_text) DO UPDATE SET count = count + excluded.count
+""")
+
+# Every run of the candidates is kept in the archive
+MOVE_ANSWERS_QUERY = text("""
+INSERT OR IGNORE INTO archive.archived_answers
+    (id, user_id, survey_id, question_id, run, answer_text, custom_answer, timestamp)
+SELECT id, user_id, survey_id, question_id, run, answer_text, custom_answer, timestamp
+FROM answers
+WHERE (user_id, survey_id) IN (SELECT user_id, survey_id FROM temp.archive_candidates)
+""")
+
+BATCH_STATS_QUERY = text("""
+SELECT MIN(timestamp) AS first_answer_at, MAX(timestamp) AS last_answer_at,
+       (SELECT COUNT(*) FROM temp.archive_candidates) AS respondents, COUNT(*) AS answers
+FROM answers
+WHERE (user_id, survey_id) IN (SELECT user_id, survey_id FROM temp.archive_candidates)
+""").columns(
+    column("first_answer_at", DateTime), column("last_answer_at", DateTime),
+    column("respondents", Integer), column("answers", Integer)
+)
+
+# Only answers whose archived copy is really there are deleted, whatever INSERT OR IGNORE skipped stays hot
+PRUNE_ANSWERS_QUERY = text("""
+DELETE FROM answers
+WHERE (user_id, survey_id) IN (SELECT user_id, survey_id FROM temp.archive_candidates)
+  AND EXISTS (
+      SELECT 1 FROM archive.archived_answers AS c
+      WHERE c.id = answers.id AND c.user_id = answers.user_id AND c.survey_id = answers.survey_id
+        AND c.question_id = answers.question_id AND c.run = answers.run
+  )
+""")
+
+
+def archive_batch(cutoff: datetime, limit: int = BATCH_SIZE) -> int:
+    """Move up to `limit` respondents inactive since the cutoff to the archive and return how many were moved"""
+    session = get_db_session()
+    try:
+        session.execute(text("DROP TABLE IF EXISTS temp.archive_candidates"))
+        session.execute(CANDIDATES_QUERY, {"cutoff": cutoff, "limit": limit})
+
+        first_answer_at, last_answer_at, respondents, answers = session.execute(BATCH_STATS_QUERY).one()
+        if not respondents:
+            session.rollback()
+            return 0
+
+        # Tallies, archived copies and pruning are committed together
+        session.execute(ADD_TALLIES_QUERY)
+        session.execute(MOVE_ANSWERS_QUERY)
+        session.add(ArchiveBatch(
+            first_answer_at=first_answer_at,
+            last_answer_at=last_answer_at,
+            respondents=respondents,
+            answers=answers
+        ))
+        pruned = session.execute(PRUNE_ANSWERS_QUERY).rowcount
+        if pruned < answers:
+            warning(f"{answers - pruned} відповідей не скопійовано до архіву (id вже зайнятий), "
+                    f"вони залишаються в основній базі")
+        session.execute(text("DROP TABLE temp.archive_candidates"))
+        session.commit()
+        _bump_data_version()
+
+        debug(f"Архівовано {answers} відповідей {respondents} респондентів ({first_answer_at} — {last_answer_at})")
+        return respondents
+    except SQLAlchemyError as e:
+        session.rollback()
+        error(f"Помилка архівування відповідей: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def release_free_pages() -> None:
+    """Return pages freed by pruning to the file system"""
+    with ENGINE.connect() as connection:
+        for schema in ("main", ARCHIVE_SCHEMA):
+            mode = connection.exec_driver_sql(f"PRAGMA {schema}.auto_vacuum").scalar()
+            if mode == 2:
+                connection.exec_driver_sql(f"PRAGMA {schema}.incremental_vacuum")
+                continue
+
+            # Databases created before the archive existed need one full VACUUM to switch the mode
+            info(f"Переведення бази {schema} у режим auto_vacuum=INCREMENTAL (одноразовий VACUUM)")
+            connection.exec_driver_sql(f"PRAGMA {schema}.auto_vacuum = INCREMENTAL")
+            connection.exec_driver_sql(f"VACUUM {schema}")
+        connection.commit()
+
+
+def archive_closed_runs(older_than: timedelta = timedelta(days=ARCHIVE_AFTER_DAYS)) -> int:
+    """Archive every respondent without activity for `older_than`, compact the database and return their count"""
+    cutoff = datetime.now() - older_than
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff)
+        archived += moved
+        if moved < BATCH_SIZE:
+            break
+
+    if archived:
+        release_free_pages()
+        info(f"Архівовано відповіді {archived} респондентів, неактивних з {cutoff:%Y-%m-%d}")
+    return archived
+
+
+class ArchiveJob:
+    """Periodically moves closed runs to the archive database without blocking the bot"""
+
+    def __init__(self, interval: int = ARCHIVE_INTERVAL_HOURS * 60 * 60):
+        """
+        :param interval: Seconds between archival runs
+        """
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the periodic archival loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            info(f"Запущено архівування відповідей старших за {ARCHIVE_AFTER_DAYS} днів")
+
+    async def stop(self) -> None:
+        """Stop the periodic archival loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Run the archival in a worker thread every interval"""
+        while True:
+            try:
+                await asyncio.to_thread(archive_closed_runs)
+            except Exception as e:
+                error(f"Помилка архівування відповідей: {e}")
+            await asyncio.sleep(self.interval)
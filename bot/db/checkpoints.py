@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bot.db.database import save_answer_checkpoints, format_answer_text
+from bot.logger import info, error, debug
+
+
+class AnswerCheckpointer:
+    """
+    Buffers answer checkpoints and writes them to the database in background batches.
+
+    Checkpoints with the same (user, survey, question, run) key are coalesced,
+    so only the latest version of an answer reaches the database.
+    The same goes for the question every respondent is at, which drives the reminders.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, max_batch: int = 500):
+        """
+        :param flush_interval: Maximum delay (in seconds) between batch writes
+        :param max_batch: Number of pending answers that triggers an immediate write
+        """
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._answers: Dict[Tuple[int, str, int, int], Dict[str, Any]] = {}
+        self._completions: List[Tuple[int, str, int, datetime]] = []
+        self._progress: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def checkpoint(self, user_id: int, survey_id: str, run: int, question_id: int, selected: Any,
+                   custom: Optional[str]) -> None:
+        """Queue the current answer of a user to a question"""
+        self._answers[(user_id, survey_id, question_id, run)] = {
+            "user_id": user_id,
+            "survey_id": survey_id,
+            "question_id": question_id,
+            "run": run,
+            "answer_text": format_answer_text(selected),
+            "custom_answer": custom or "",
+            "timestamp": datetime.now()
+        }
+        debug(f"Додано до черги відповідь користувача {user_id} на питання {question_id} (спроба {run})")
+
+        if len(self._answers) >= self.max_batch and self._wakeup:
+            self._wakeup.set()
+
+    def progress(self, user_id: int, survey_id: str, run: int, question_index: int) -> None:
+        """Queue the question the user has reached, the resume point of the run"""
+        self._progress[(user_id, survey_id)] = {
+            "user_id": user_id,
+            "survey_id": survey_id,
+            "run": run,
+            "question_index": question_index,
+            "updated_at": datetime.now()
+        }
+
+    def complete(self, user_id: int, survey_id: str, run: int) -> None:
+        """Queue marking the user's run as completed"""
+        self._completions.append((user_id, survey_id, run, datetime.now()))
+
+    def start(self) -> None:
+        """Start the background flush loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            info("Запущено фоновий запис відповідей")
+
+    async def stop(self) -> None:
+        """Stop the background loop and write everything that is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        info("Зупинено фоновий запис відповідей")
+
+    async def flush(self) -> None:
+        """Write all pending checkpoints to the database, after the batch that is already being written"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # One batch at a time: batches committed out of order could overwrite newer answers with older ones
+        async with self._lock:
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        """Write the pending checkpoints as one batch"""
+        if not self._answers and not self._completions and not self._progress:
+            return
+
+        answers, self._answers = self._answers, {}
+        completions, self._completions = self._completions, []
+        progress, self._progress = self._progress, {}
+
+        saved = await asyncio.to_thread(
+            save_answer_checkpoints, list(answers.values()), completions, list(progress.values())
+        )
+        if not saved:
+            # Put the batch back without overwriting answers that arrived in the meantime
+            answers.update(self._answers)
+            self._answers = answers
+            self._completions = completions + self._completions
+            progress.update(self._progress)
+            self._progress = progress
+            error(f"Не вдалося записати пакет з {len(answers)} відповідей, буде повторна спроба")
+
+    async def _run(self) -> None:
+        """Periodically flush pending checkpoints"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                error(f"Помилка фонового запису відповідей: {e}")
+
+
+checkpointer = AnswerCheckpointer()
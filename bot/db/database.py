@@ -1,29 +1,235 @@
 import os
-from typing import List, Dict, Any
-from datetime import datetime
-from sqlalchemy import create_engine, func
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, func, inspect, select, text, union_all, update, delete, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
-from bot.db.models import Base, User, Answer
+from bot.configs import RETAKE_POLICY, DEFAULT_SURVEY, REMINDER_DELAYS_HOURS
+from bot.db.models import Base, User, Answer, SyncCursor, ArchivedAnswer, ArchivedTally, Reminder, ARCHIVE_SCHEMA
 from bot.logger import info, error, warning, debug
 
 # Database settings
 DB_PATH = "survey_data.db"
+# Answers of closed runs are moved here by the retention job (see bot/db/archive.py)
+ARCHIVE_DB_PATH = "survey_archive.db"
+# Milliseconds a connection waits for a lock before failing with "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Survey writes go through ENGINE, analytics and exports read through READ_ENGINE.
+# In WAL mode readers work on a snapshot and never block writers (or get blocked by them).
 ENGINE = create_engine(f"sqlite:///{DB_PATH}", echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ENGINE)
+READ_ENGINE = create_engine(f"sqlite:///{DB_PATH}", echo=False, pool_size=4)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=READ_ENGINE)
+
+
+def _configure_connection(dbapi_connection, read_only: bool) -> None:
+    """Attach the archive database and set up WAL mode and lock waiting on a new connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (ARCHIVE_DB_PATH,))
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON")
+    else:
+        # Only takes effect while the archive is still empty, so pruned pages can be released incrementally
+        cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.auto_vacuum = INCREMENTAL")
+        # WAL is remembered by the database files, NORMAL sync is safe with it and makes commits cheaper
+        cursor.execute("PRAGMA main.journal_mode = WAL")
+        cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+
+@event.listens_for(ENGINE, "connect")
+def _connect_writer(dbapi_connection, connection_record):
+    _configure_connection(dbapi_connection, read_only=False)
+
+
+@event.listens_for(READ_ENGINE, "connect")
+def _connect_reader(dbapi_connection, connection_record):
+    _configure_connection(dbapi_connection, read_only=True)
+
+
+# Join condition that keeps only the answers of each respondent's latest run of the survey
+LATEST_RUN = and_(User.user_id == Answer.user_id, User.survey_id == Answer.survey_id, User.run == Answer.run)
+
+# Hot and archived answers together, for reports that need every answer ever given
+ALL_ANSWERS = union_all(
+    select(Answer.id, Answer.user_id, Answer.survey_id, Answer.question_id, Answer.run, Answer.answer_text,
+           Answer.custom_answer, Answer.timestamp),
+    select(ArchivedAnswer.id, ArchivedAnswer.user_id, ArchivedAnswer.survey_id, ArchivedAnswer.question_id,
+           ArchivedAnswer.run, ArchivedAnswer.answer_text, ArchivedAnswer.custom_answer, ArchivedAnswer.timestamp)
+).subquery("all_answers")
+ALL_ANSWERS_LATEST_RUN = and_(
+    User.user_id == ALL_ANSWERS.c.user_id, User.survey_id == ALL_ANSWERS.c.survey_id, User.run == ALL_ANSWERS.c.run
+)
+
+# Removes an archived run from the precomputed tallies once it is no longer the respondent's latest run
+RELEASE_ARCHIVED_RUN_QUERIES = (
+    text(f"""
+    UPDATE {ARCHIVE_SCHEMA}.archived_tallies SET count = count - (
+        SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.archived_answers AS a
+        WHERE a.user_id = :user_id AND a.survey_id = :survey_id AND a.run = :run
+          AND a.question_id = archived_tallies.question_id
+          AND COALESCE(a.answer_text, '') = archived_tallies.answer_text
+    )
+    WHERE survey_id = :survey_id AND (question_id, answer_text) IN (
+        SELECT question_id, COALESCE(answer_text, '') FROM {ARCHIVE_SCHEMA}.archived_answers
+        WHERE user_id = :user_id AND survey_id = :survey_id AND run = :run
+    )
+    """),
+    text(f"DELETE FROM {ARCHIVE_SCHEMA}.archived_tallies WHERE count <= 0"),
+)
+
+# Incremented on every write so that analytics caches know when to refresh
+_data_version = 0
+# Version of the last write per survey, and of the last write that touched every survey (archival)
+_survey_versions: Dict[str, int] = {}
+_all_surveys_version = 0
+# Bumped per survey when already recorded event times change: a run is restarted or replaced by a retake
+_history_versions: Dict[str, int] = {}
+
+
+def get_data_version(survey_id: Optional[str] = None) -> int:
+    """Return a counter that changes every time this process writes survey data (of the given survey)"""
+    if survey_id is None:
+        return _data_version
+    return max(_survey_versions.get(survey_id, 0), _all_surveys_version)
+
+
+def _bump_data_version(survey_ids: Optional[Iterable[str]] = None):
+    """Invalidate analytics caches after a successful write to the given surveys (all if None)"""
+    global _data_version, _all_surveys_version
+    _data_version += 1
+    if survey_ids is None:
+        _all_surveys_version = _data_version
+        return
+    for survey_id in survey_ids:
+        _survey_versions[survey_id] = _data_version
+
+
+def get_history_version(survey_id: str) -> int:
+    """Return a counter that changes every time this process rewrites past start, end or answer times of a survey"""
+    return _history_versions.get(survey_id, 0)
+
+
+def _bump_history_version(survey_ids: Iterable[str]):
+    """Invalidate caches of closed time buckets after run times of the given surveys were rewritten"""
+    for survey_id in survey_ids:
+        _history_versions[survey_id] = _history_versions.get(survey_id, 0) + 1
 
 
 def init_db():
     """Initialize the database with all required tables"""
     try:
         Base.metadata.create_all(bind=ENGINE)
+        _migrate_schema()
         info("Database initialized successfully")
     except Exception as e:
         error(f"Database initialization failed: {e}")
         raise
 
 
+def _rebuild_table(connection, table, suffix: str, defaults: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Recreate a table with its current definition and copy the rows over.
+
+    Columns missing from the old table are filled from `defaults`. Returns the name of the old table,
+    which the caller drops once every dependent table is rebuilt.
+    """
+    defaults = defaults or {}
+    schema = table.schema or "main"
+    old_name = f"{table.name}_{suffix}"
+    connection.execute(text(f"ALTER TABLE {schema}.{table.name} RENAME TO {old_name}"))
+
+    # Indexes keep their names when a table is renamed, they must be dropped before the new table creates them
+    index_names = connection.execute(
+        text(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+        {"name": old_name}
+    ).scalars().all()
+    for index_name in index_names:
+        connection.execute(text(f"DROP INDEX {schema}.{index_name}"))
+
+    table.create(connection)
+    columns = [column.name for column in table.columns if column.name not in defaults]
+    values = [f":{name}" for name in defaults] + columns
+    connection.execute(
+        text(f"INSERT INTO {schema}.{table.name} ({', '.join(list(defaults) + columns)}) "
+             f"SELECT {', '.join(values)} FROM {schema}.{old_name}"),
+        defaults
+    )
+    return f"{schema}.{old_name}"
+
+
+def _reserve_archived_answer_ids(connection) -> None:
+    """Make new answer ids start above every id ever used, including answers that only live in the archive"""
+    last_id = connection.execute(text(
+        f"SELECT MAX(COALESCE((SELECT MAX(id) FROM answers), 0), "
+        f"COALESCE((SELECT MAX(id) FROM {ARCHIVE_SCHEMA}.archived_answers), 0))"
+    )).scalar()
+    updated = connection.execute(
+        text("UPDATE sqlite_sequence SET seq = MAX(seq, :last_id) WHERE name = 'answers'"), {"last_id": last_id}
+    ).rowcount
+    if not updated and last_id:
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('answers', :last_id)"),
+                           {"last_id": last_id})
+
+
+def _migrate_schema():
+    """Bring databases created by older versions of the bot up to the current schema"""
+    inspector = inspect(ENGINE)
+    user_columns = {column["name"] for column in inspector.get_columns("users")}
+    answer_columns = {column["name"] for column in inspector.get_columns("answers")}
+    # Tables whose keys gained the survey id
+    single_survey_tables = [
+        table for table in (User.__table__, Answer.__table__, ArchivedAnswer.__table__, ArchivedTally.__table__)
+        if "survey_id" not in {column["name"] for column in inspector.get_columns(table.name, schema=table.schema)}
+    ]
+
+    with ENGINE.begin() as connection:
+        if "run" not in user_columns:
+            connection.execute(text("ALTER TABLE users ADD COLUMN run INTEGER NOT NULL DEFAULT 1"))
+            info("Додано колонку run до таблиці users")
+
+        if "run" not in answer_columns:
+            connection.execute(text("ALTER TABLE answers ADD COLUMN run INTEGER NOT NULL DEFAULT 1"))
+            # Every repeated answer to the same question was a separate retake, so number them in order
+            connection.execute(text(
+                "UPDATE answers SET run = ("
+                " SELECT COUNT(*) FROM answers AS earlier"
+                " WHERE earlier.user_id = answers.user_id"
+                " AND earlier.question_id = answers.question_id"
+                " AND earlier.id <= answers.id)"
+            ))
+            connection.execute(text(
+                "UPDATE users SET run = COALESCE("
+                " (SELECT MAX(answers.run) FROM answers WHERE answers.user_id = users.user_id), 1)"
+            ))
+            info("Додано колонку run до таблиці answers")
+
+        # Rebuilt tables get the indexes of the current models, answers are copied before users are dropped
+        old_tables = [
+            _rebuild_table(connection, table, "single_survey", {"survey_id": DEFAULT_SURVEY})
+            for table in single_survey_tables
+        ]
+        for old_table in reversed(old_tables):
+            connection.execute(text(f"DROP TABLE {old_table}"))
+        if old_tables:
+            info(f"Таблиці {', '.join(table.name for table in single_survey_tables)} переведено на кілька "
+                 f"опитувань, наявні дані належать опитуванню '{DEFAULT_SURVEY}'")
+
+        # Without AUTOINCREMENT SQLite reuses the ids of deleted answers
+        answers_sql = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'answers'")
+        ).scalar()
+        if "AUTOINCREMENT" not in answers_sql.upper():
+            connection.execute(text(f"DROP TABLE {_rebuild_table(connection, Answer.__table__, 'reused_ids')}"))
+            info("Таблицю answers перебудовано з AUTOINCREMENT, id видалених відповідей більше не повторюються")
+        _reserve_archived_answer_ids(connection)
+
+
 def get_db_session():
     """Get a database session"""
     session = SessionLocal()
@@ -34,93 +240,264 @@ def get_db_session():
         raise
 
 
-def save_user_answer(user_id: int, question_id: int, answer_text: str, custom_answer: str = ""):
-    """Save a user's answer to a question using SQLAlchemy"""
+def get_read_session():
+    """Get a read-only database session for analytics, reports and exports"""
+    return ReadSessionLocal()
+
+
+def format_answer_text(selected: Any) -> str:
+    """Convert the selected option(s) of an answer to the text stored in the database"""
+    # Convert list to string if it's a multiple choice answer
+    if isinstance(selected, list):
+        return " | ".join(selected)
+    return selected or ""
+
+
+def _answer_upsert(rows: List[Dict[str, Any]]):
+    """Build an INSERT ... ON CONFLICT statement that keeps the latest answer per (user, survey, question, run)"""
+    statement = sqlite_insert(Answer).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[Answer.user_id, Answer.survey_id, Answer.question_id, Answer.run],
+        set_={
+            "answer_text": statement.excluded.answer_text,
+            "custom_answer": statement.excluded.custom_answer,
+            "timestamp": statement.excluded.timestamp,
+        }
+    )
+
+
+def _progress_upsert(rows: List[Dict[str, Any]]):
+    """Build an upsert that moves the respondents' resume points and plans their first reminder"""
+    rows = [
+        dict(row, attempt=0, due_at=(
+            row["updated_at"] + timedelta(hours=REMINDER_DELAYS_HOURS[0]) if REMINDER_DELAYS_HOURS else None
+        ))
+        for row in rows
+    ]
+    statement = sqlite_insert(Reminder).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[Reminder.user_id, Reminder.survey_id],
+        set_={
+            "run": statement.excluded.run,
+            "question_index": statement.excluded.question_index,
+            "attempt": statement.excluded.attempt,
+            "due_at": statement.excluded.due_at,
+            "updated_at": statement.excluded.updated_at,
+        }
+    )
+
+
+def start_survey_run(user_id: int, survey_id: str = DEFAULT_SURVEY) -> int:
+    """
+    Return the run number for a new attempt at the survey by the user.
+
+    Nothing of the previous run is touched here: it stays the latest run (and stays completed)
+    until the new run saves its first answer, so a stray /start doesn't discard a finished response.
+    """
     session = get_db_session()
     try:
-        # Check if user exists
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = session.get(User, (user_id, survey_id))
 
-        # If user doesn't exist, create them
         if not user:
-            user = User(user_id=user_id, start_time=datetime.now())
-            session.add(user)
-            debug(f"Створено нового користувача з ID {user_id}")
+            session.add(User(user_id=user_id, survey_id=survey_id, run=1))
+            session.commit()
+            _bump_data_version([survey_id])
+            debug(f"Створено нового користувача з ID {user_id} в опитуванні '{survey_id}'")
+            return 1
+
+        # A run without a single answer is simply started over, answers may already be archived
+        answered = session.scalar(select(or_(
+            select(Answer.id)
+            .where(Answer.user_id == user_id, Answer.survey_id == survey_id, Answer.run == user.run)
+            .exists(),
+            select(ArchivedAnswer.id)
+            .where(ArchivedAnswer.user_id == user_id, ArchivedAnswer.survey_id == survey_id,
+                   ArchivedAnswer.run == user.run)
+            .exists()
+        )))
+        if not answered and not user.completed_survey:
+            user.start_time = datetime.now()
+            session.commit()
+            _bump_data_version([survey_id])
+            _bump_history_version([survey_id])
+            return user.run
+
+        debug(f"Користувач {user_id} розпочинає спробу {user.run + 1} опитування '{survey_id}'")
+        return user.run + 1
+    except SQLAlchemyError as e:
+        session.rollback()
+        error(f"Помилка реєстрації початку опитування '{survey_id}' для користувача {user_id}: {e}")
+        return 1
+    finally:
+        session.close()
 
-        # Create and save the answer
-        answer = Answer(
-            user_id=user_id,
-            question_id=question_id,
-            answer_text=answer_text,
-            custom_answer=custom_answer,
-            timestamp=datetime.now()
-        )
-        session.add(answer)
 
-        # Commit changes
+def _promote_run(session, user: User, run: int) -> None:
+    """Make a retake the user's latest run once it has its first answer"""
+    # The previous run stops counting, archived runs are counted in the precomputed tallies
+    for query in RELEASE_ARCHIVED_RUN_QUERIES:
+        session.execute(query, {"user_id": user.user_id, "survey_id": user.survey_id, "run": user.run})
+
+    # With the "latest" policy a retake replaces the previous answers
+    if RETAKE_POLICY == "latest":
+        deleted = session.execute(
+            delete(Answer).where(
+                Answer.user_id == user.user_id, Answer.survey_id == user.survey_id, Answer.run < run
+            )
+        ).rowcount
+        deleted += session.execute(
+            delete(ArchivedAnswer).where(
+                ArchivedAnswer.user_id == user.user_id, ArchivedAnswer.survey_id == user.survey_id,
+                ArchivedAnswer.run < run
+            )
+        ).rowcount
+        debug(f"Видалено {deleted} відповідей попередніх спроб користувача {user.user_id}")
+
+    user.run = run
+    user.completed_survey = False
+    user.start_time = datetime.now()
+    user.end_time = None
+    debug(f"Користувач {user.user_id} розпочав спробу {run} опитування '{user.survey_id}'")
+
+
+def save_user_answer(user_id: int, question_id: int, answer_text: str, custom_answer: str = "", run: int = 1,
+                     survey_id: str = DEFAULT_SURVEY):
+    """Save (or overwrite) a user's answer to a question using SQLAlchemy"""
+    return save_answer_checkpoints([{
+        "user_id": user_id,
+        "survey_id": survey_id,
+        "question_id": question_id,
+        "run": run,
+        "answer_text": answer_text,
+        "custom_answer": custom_answer,
+        "timestamp": datetime.now()
+    }])
+
+
+def save_answer_checkpoints(answers: List[Dict[str, Any]],
+                            completions: Optional[List[Tuple[int, str, int, datetime]]] = None,
+                            progress: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """
+    Upsert a batch of answer checkpoints, move the resume points of unfinished runs
+    and mark finished runs as completed in one transaction
+    """
+    completions = completions or []
+    promoted = set()
+    session = get_db_session()
+    try:
+        if answers:
+            # The newest run answered by every participant in this batch
+            runs: Dict[Tuple[int, str], int] = {}
+            for answer in answers:
+                key = (answer["user_id"], answer["survey_id"])
+                runs[key] = max(runs.get(key, 0), answer["run"])
+
+            user_ids = {user_id for user_id, _ in runs}
+            known = {
+                (user.user_id, user.survey_id): user
+                for user in session.query(User).filter(User.user_id.in_(user_ids))
+            }
+            for (user_id, survey_id), run in runs.items():
+                user = known.get((user_id, survey_id))
+                if user is None:
+                    # Users may answer before their run was registered (e.g. after a restart)
+                    session.add(User(user_id=user_id, survey_id=survey_id, run=run, start_time=datetime.now()))
+                    debug(f"Створено нового користувача з ID {user_id} в опитуванні '{survey_id}'")
+                elif run > user.run:
+                    _promote_run(session, user, run)
+                    promoted.add(survey_id)
+                else:
+                    runs[(user_id, survey_id)] = user.run
+            session.flush()
+
+            # Late checkpoints of a replaced run are dropped with the rest of it
+            if RETAKE_POLICY == "latest":
+                answers = [
+                    answer for answer in answers if answer["run"] >= runs[(answer["user_id"], answer["survey_id"])]
+                ]
+            if answers:
+                session.execute(_answer_upsert(answers))
+
+        # Every step restarts the reminder countdown of the run
+        if progress:
+            session.execute(_progress_upsert(progress))
+
+        # Completion is a cheap status flip, the answers are already stored
+        for user_id, survey_id, run, end_time in completions:
+            session.execute(
+                update(User)
+                .where(User.user_id == user_id, User.survey_id == survey_id, User.run == run)
+                .values(completed_survey=True, end_time=end_time)
+            )
+            # A finished run has nothing to resume
+            session.execute(
+                delete(Reminder)
+                .where(Reminder.user_id == user_id, Reminder.survey_id == survey_id, Reminder.run == run)
+            )
+
         session.commit()
-        debug(f"Збережено відповідь користувача {user_id} на питання {question_id}")
+        _bump_data_version({answer["survey_id"] for answer in answers} | {c[1] for c in completions})
+        _bump_history_version(promoted)
+        debug(f"Збережено {len(answers)} відповідей та {len(completions)} завершень опитування")
         return True
     except SQLAlchemyError as e:
         session.rollback()
-        error(f"Помилка збереження відповіді: {e}")
+        error(f"Помилка збереження пакета відповідей: {e}")
         return False
     finally:
         session.close()
 
 
-def save_all_user_answers(user_id: int, answers: Dict[str, Any], questions_map: Dict[int, Dict[str, Any]]):
-    """Save all answers from a user's completed survey"""
+def save_all_user_answers(user_id: int, answers: Dict[str, Any], questions_map: Dict[int, Dict[str, Any]],
+                          run: Optional[int] = None, survey_id: str = DEFAULT_SURVEY):
+    """Save all answers from a user's completed survey (idempotent per user, survey, question and run)"""
     session = get_db_session()
     try:
         # Check if user exists
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = session.get(User, (user_id, survey_id))
 
         # If user doesn't exist, create them
         if not user:
-            user = User(user_id=user_id, start_time=datetime.now())
+            user = User(user_id=user_id, survey_id=survey_id, start_time=datetime.now(), run=run or 1)
             session.add(user)
             session.flush()  # Flush to get the user ID if it's auto-generated
             debug(f"Створено нового користувача з ID {user_id}")
 
-        # Save each answer
-        for question_text, answer_data in answers.items():
-            # Find question_id from question text
-            question_id = None
-            for q_id, q_info in questions_map.items():
-                if q_info.get("question") == question_text:
-                    question_id = q_id
-                    break
+        run = run or user.run
+
+        # Find question_id from question text
+        question_ids = {q_info.get("question"): q_id for q_id, q_info in questions_map.items()}
 
+        rows = []
+        for question_text, answer_data in answers.items():
+            question_id = question_ids.get(question_text)
             if question_id is None:
                 warning(f"Не вдалося знайти ID питання для: {question_text}")
                 continue
 
-            # Process the answer
-            selected = answer_data.get("selected", "")
-            custom = answer_data.get("custom", "")
-
-            # Convert list to string if it's a multiple choice answer
-            if isinstance(selected, list):
-                selected = " | ".join(selected)
-
-            # Create and save the answer
-            answer = Answer(
-                user_id=user_id,
-                question_id=question_id,
-                answer_text=selected or "",
-                custom_answer=custom or "",
-                timestamp=datetime.now()
-            )
-            session.add(answer)
-            debug(f"Збережено відповідь користувача {user_id} на питання {question_id}")
+            rows.append({
+                "user_id": user_id,
+                "survey_id": survey_id,
+                "question_id": question_id,
+                "run": run,
+                "answer_text": format_answer_text(answer_data.get("selected", "")),
+                "custom_answer": answer_data.get("custom", "") or "",
+                "timestamp": datetime.now()
+            })
+
+        # Saving the same survey twice overwrites the answers instead of duplicating them
+        if rows:
+            session.execute(_answer_upsert(rows))
+            debug(f"Збережено {len(rows)} відповідей користувача {user_id}")
 
         # Mark survey as completed
-        user.completed_survey = True
-        user.end_time = datetime.now()
+        if user.run == run:
+            user.completed_survey = True
+            user.end_time = datetime.now()
 
         # Commit all changes
         session.commit()
+        _bump_data_version([survey_id])
         info(f"Збережено всі відповіді для користувача {user_id}")
         return True
     except SQLAlchemyError as e:
@@ -131,12 +508,42 @@ def save_all_user_answers(user_id: int, answers: Dict[str, Any], questions_map:
         session.close()
 
 
-def get_question_answers(question_id: int) -> List[Dict[str, Any]]:
-    """Get all answers for a specific question"""
+def get_sync_cursor(name: str) -> int:
+    """Get the last exported Answer id of a background export job"""
     session = get_db_session()
     try:
-        # Query answers for this question
-        answers_query = session.query(Answer).filter(Answer.question_id == question_id).all()
+        cursor = session.get(SyncCursor, name)
+        return cursor.last_id if cursor else 0
+    finally:
+        session.close()
+
+
+def set_sync_cursor(name: str, last_id: int) -> None:
+    """Store the last exported Answer id of a background export job"""
+    session = get_db_session()
+    try:
+        session.merge(SyncCursor(name=name, last_id=last_id, updated_at=datetime.now()))
+        session.commit()
+        debug(f"Курсор експорту {name} переміщено на {last_id}")
+    except SQLAlchemyError as e:
+        session.rollback()
+        error(f"Помилка збереження курсора експорту {name}: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def get_question_answers(question_id: int, survey_id: str = DEFAULT_SURVEY) -> List[Dict[str, Any]]:
+    """Get all answers for a specific question"""
+    session = get_read_session()
+    try:
+        # Query hot and archived answers for this question, one run per respondent
+        answers_query = (
+            session.query(ALL_ANSWERS)
+            .join(User, ALL_ANSWERS_LATEST_RUN)
+            .filter(ALL_ANSWERS.c.survey_id == survey_id, ALL_ANSWERS.c.question_id == question_id)
+            .all()
+        )
 
         # Format the results
         answers = []
@@ -157,12 +564,17 @@ def get_question_answers(question_id: int) -> List[Dict[str, Any]]:
         session.close()
 
 
-def get_all_answers() -> Dict[int, List[Dict[str, Any]]]:
+def get_all_answers(survey_id: str = DEFAULT_SURVEY) -> Dict[int, List[Dict[str, Any]]]:
     """Get all answers for all questions"""
-    session = get_db_session()
+    session = get_read_session()
     try:
-        # Query all answers
-        answers_query = session.query(Answer).all()
+        # Query all hot and archived answers, one run per respondent
+        answers_query = (
+            session.query(ALL_ANSWERS)
+            .join(User, ALL_ANSWERS_LATEST_RUN)
+            .filter(ALL_ANSWERS.c.survey_id == survey_id)
+            .all()
+        )
 
         # Group by question_id
         answers_by_question = {}
@@ -188,18 +600,25 @@ def get_all_answers() -> Dict[int, List[Dict[str, Any]]]:
         session.close()
 
 
-def get_survey_stats():
+def get_survey_stats(survey_id: str = DEFAULT_SURVEY):
     """Get statistics about the survey responses"""
-    session = get_db_session()
+    session = get_read_session()
     try:
         # Get total users
-        total_users = session.query(func.count(User.user_id)).scalar() or 0
+        total_users = session.query(func.count(User.user_id)).filter(User.survey_id == survey_id).scalar() or 0
 
         # Get completed surveys
-        completed_surveys = session.query(func.count(User.user_id)).filter(User.completed_survey == True).scalar() or 0
-
-        # Get total answers
-        total_answers = session.query(func.count(Answer.id)).scalar() or 0
+        completed_surveys = session.query(func.count(User.user_id)).filter(
+            User.survey_id == survey_id, User.completed_survey == True
+        ).scalar() or 0
+
+        # Get total answers of the latest runs, archived ones are taken from the precomputed tallies
+        total_answers = session.query(func.count(Answer.id)).join(User, LATEST_RUN).filter(
+            Answer.survey_id == survey_id
+        ).scalar() or 0
+        total_answers += session.query(func.sum(ArchivedTally.count)).filter(
+            ArchivedTally.survey_id == survey_id
+        ).scalar() or 0
 
         stats = {
             "total_users": total_users,
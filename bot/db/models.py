@@ -1,34 +1,59 @@
-from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import (
+    Column, Integer, Boolean, ForeignKeyConstraint, DateTime, Text, String, UniqueConstraint, Index
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
+from bot.configs import DEFAULT_SURVEY
+
 Base = declarative_base()
 
 
 class User(Base):
-    """Model for survey participants"""
+    """Model for survey participants, one row per user and survey"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Per-survey reports filter by survey first, then by the event time
+        Index('ix_users_survey_start_time', 'survey_id', 'start_time'),
+        Index('ix_users_survey_end_time', 'survey_id', 'end_time'),
+    )
 
-    user_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    survey_id = Column(String(32), primary_key=True, default=DEFAULT_SURVEY)
     completed_survey = Column(Boolean, default=False)
     start_time = Column(DateTime, default=datetime.now)
     end_time = Column(DateTime, nullable=True)
+    # Number of the latest attempt at this survey (incremented on every /start)
+    run = Column(Integer, default=1, nullable=False)
 
     # Relationship to answers
     answers = relationship("Answer", back_populates="user")
 
     def __repr__(self):
-        return f"<User(user_id={self.user_id}, completed={self.completed_survey})>"
+        return f"<User(user_id={self.user_id}, survey_id={self.survey_id}, completed={self.completed_survey})>"
 
 
 class Answer(Base):
     """Model for survey answers"""
     __tablename__ = 'answers'
+    __table_args__ = (
+        ForeignKeyConstraint(['user_id', 'survey_id'], ['users.user_id', 'users.survey_id']),
+        # Also serves per-respondent lookups (the latest run join, retakes, archival)
+        UniqueConstraint('user_id', 'survey_id', 'question_id', 'run', name='uq_answers_user_survey_question_run'),
+        # Covering index for per-question answer tallies over the latest runs
+        Index('ix_answers_question_tally', 'survey_id', 'question_id', 'answer_text', 'user_id', 'run'),
+        Index('ix_answers_survey_timestamp', 'survey_id', 'timestamp'),
+        # Ids of deleted (retaken or archived) answers must never be handed out again:
+        # archived copies and the export cursor identify answers by id
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.user_id'))
+    user_id = Column(Integer, nullable=False)
+    survey_id = Column(String(32), nullable=False, default=DEFAULT_SURVEY)
     question_id = Column(Integer, nullable=False)
+    run = Column(Integer, default=1, nullable=False)
     answer_text = Column(Text, default="")
     custom_answer = Column(Text, default="")
     timestamp = Column(DateTime, default=datetime.now)
@@ -37,4 +62,97 @@ class Answer(Base):
     user = relationship("User", back_populates="answers")
 
     def __repr__(self):
-        return f"<Answer(user_id={self.user_id}, question_id={self.question_id})>"
\ No newline at end of file
+        return (f"<Answer(user_id={self.user_id}, survey_id={self.survey_id}, "
+                f"question_id={self.question_id}, run={self.run})>")
+
+
+class SyncCursor(Base):
+    """Model for the progress of background export jobs"""
+    __tablename__ = 'sync_cursors'
+
+    name = Column(String(64), primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<SyncCursor(name={self.name}, last_id={self.last_id})>"
+
+
+class Reminder(Base):
+    """Model for the resume point of an unfinished survey run and its next reminder"""
+    __tablename__ = 'reminders'
+    __table_args__ = (
+        # The scheduler always reads the earliest due reminders, so the index works as a persistent queue
+        Index('ix_reminders_due_at', 'due_at'),
+    )
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    survey_id = Column(String(32), primary_key=True, default=DEFAULT_SURVEY)
+    run = Column(Integer, nullable=False)
+    # Index of the question the respondent stopped at
+    question_index = Column(Integer, default=0, nullable=False)
+    # Reminders already sent since the last activity, due_at is empty when no more are planned
+    attempt = Column(Integer, default=0, nullable=False)
+    due_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return (f"<Reminder(user_id={self.user_id}, survey_id={self.survey_id}, "
+                f"attempt={self.attempt}, due_at={self.due_at})>")
+
+
+# Name under which the archive database is attached to every connection
+ARCHIVE_SCHEMA = "archive"
+
+
+class ArchivedAnswer(Base):
+    """Model for answers of closed runs moved out of the hot answers table"""
+    __tablename__ = 'archived_answers'
+    __table_args__ = (
+        Index('ix_archived_answers_user_run', 'user_id', 'survey_id', 'run'),
+        {"schema": ARCHIVE_SCHEMA},
+    )
+
+    # Ids are kept from the answers table, so hot and archived answers can be ordered together
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    survey_id = Column(String(32), nullable=False, default=DEFAULT_SURVEY)
+    question_id = Column(Integer, nullable=False)
+    run = Column(Integer, nullable=False)
+    answer_text = Column(Text, default="")
+    custom_answer = Column(Text, default="")
+    timestamp = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ArchivedAnswer(user_id={self.user_id}, question_id={self.question_id}, run={self.run})>"
+
+
+class ArchivedTally(Base):
+    """Model for precomputed answer counts of the archived latest runs"""
+    __tablename__ = 'archived_tallies'
+    __table_args__ = {"schema": ARCHIVE_SCHEMA}
+
+    survey_id = Column(String(32), primary_key=True, default=DEFAULT_SURVEY)
+    question_id = Column(Integer, primary_key=True)
+    answer_text = Column(Text, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (f"<ArchivedTally(survey_id={self.survey_id}, question_id={self.question_id}, "
+                f"answer_text={self.answer_text}, count={self.count})>")
+
+
+class ArchiveBatch(Base):
+    """Model for the log of archival runs and the periods they rolled up"""
+    __tablename__ = 'archive_batches'
+    __table_args__ = {"schema": ARCHIVE_SCHEMA}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    archived_at = Column(DateTime, default=datetime.now)
+    first_answer_at = Column(DateTime)
+    last_answer_at = Column(DateTime)
+    respondents = Column(Integer, default=0, nullable=False)
+    answers = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchiveBatch(id={self.id}, respondents={self.respondents}, answers={self.answers})>"
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.db.database import get_db_session, get_read_session
+from bot.db.models import Reminder, User
+from bot.logger import error, debug
+
+# Answers of a run wherever they are stored, archived runs can be resumed too
+RUN_ANSWERS_QUERY = text("""
+SELECT question_id, answer_text, custom_answer FROM answers
+WHERE user_id = :user_id AND survey_id = :survey_id AND run = :run
+UNION ALL
+SELECT question_id, answer_text, custom_answer FROM archive.archived_answers
+WHERE user_id = :user_id AND survey_id = :survey_id AND run = :run
+""")
+
+# Reschedules a sent reminder unless the respondent was active (and the row rewritten) in the meantime
+RESCHEDULE_QUERY = (
+    update(Reminder.__table__)
+    .where(
+        Reminder.user_id == bindparam("b_user_id"),
+        Reminder.survey_id == bindparam("b_survey_id"),
+        Reminder.attempt == bindparam("b_attempt"),
+        Reminder.due_at == bindparam("b_due_at"),
+    )
+    .values(attempt=bindparam("new_attempt"), due_at=bindparam("new_due_at"))
+)
+
+
+def get_due_reminders(now: datetime, limit: int) -> List[Tuple[int, str, int, int, int, datetime]]:
+    """
+    Get the earliest reminders that are due, read from the due_at index.
+
+    Returns rows of (user_id, survey_id, run, question_index, attempt, due_at).
+    """
+    session = get_read_session()
+    try:
+        return [tuple(row) for row in session.execute(
+            select(Reminder.user_id, Reminder.survey_id, Reminder.run, Reminder.question_index,
+                   Reminder.attempt, Reminder.due_at)
+            .where(Reminder.due_at <= now)
+            .order_by(Reminder.due_at)
+            .limit(limit)
+        )]
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання нагадувань: {e}")
+        return []
+    finally:
+        session.close()
+
+
+def get_next_due_at() -> Optional[datetime]:
+    """Get the time of the earliest planned reminder"""
+    session = get_read_session()
+    try:
+        return session.execute(select(func.min(Reminder.due_at))).scalar()
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання часу наступного нагадування: {e}")
+        return None
+    finally:
+        session.close()
+
+
+def reschedule_reminders(outcomes: List[Dict[str, Any]]) -> int:
+    """
+    Store what happened to processed reminders in one transaction.
+
+    Every outcome holds the row it was read as (b_user_id, b_survey_id, b_attempt, b_due_at)
+    and its new attempt counter and due time (None when no more reminders are planned).
+    Returns the number of reminders that were updated.
+    """
+    if not outcomes:
+        return 0
+    session = get_db_session()
+    try:
+        updated = session.execute(RESCHEDULE_QUERY, outcomes).rowcount
+        session.commit()
+        debug(f"Оновлено {updated} з {len(outcomes)} нагадувань")
+        return updated
+    except SQLAlchemyError as e:
+        session.rollback()
+        error(f"Помилка оновлення нагадувань: {e}")
+        return 0
+    finally:
+        session.close()
+
+
+def get_resume_point(user_id: int, survey_id: str) -> Optional[Tuple[int, int, List[Tuple[int, str, str]]]]:
+    """
+    Get the unfinished run of a respondent to continue it.
+
+    Returns (run, question_index, [(question_id, answer_text, custom_answer)]),
+    or None if there is nothing to resume.
+    """
+    session = get_read_session()
+    try:
+        row = session.execute(
+            select(Reminder.run, Reminder.question_index)
+            .join(User, (User.user_id == Reminder.user_id) & (User.survey_id == Reminder.survey_id))
+            .where(Reminder.user_id == user_id, Reminder.survey_id == survey_id,
+                   User.run == Reminder.run, User.completed_survey.isnot(True))
+        ).first()
+        if row is None:
+            return None
+
+        run, question_index = row
+        answers = session.execute(
+            RUN_ANSWERS_QUERY, {"user_id": user_id, "survey_id": survey_id, "run": run}
+        ).all()
+        return run, question_index, [tuple(answer) for answer in answers]
+    except SQLAlchemyError as e:
+        error(f"Помилка отримання незавершеного опитування '{survey_id}' користувача {user_id}: {e}")
+        return None
+    finally:
+        session.close()
@@ -1,11 +1,118 @@
+import asyncio
+from typing import List, Optional, Tuple
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, BufferedInputFile
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.filters import Command, CommandObject
+from aiogram.types import (
+    CallbackQuery, Message, BufferedInputFile, FSInputFile, InputMediaPhoto, InlineKeyboardMarkup,
+    InlineKeyboardButton
+)
 
+from bot.configs import bot
 from bot.models.callbacks import AdminCallback
-from bot.utils.helpers import is_admin
-from bot.utils.visualization import generate_pie_chart
+from bot.utils.helpers import is_admin, split_message
+from bot.utils.surveys import Survey, surveys
 from bot.logger import info, warning, error, debug
 
+# Telegram limits: photos per album and caption length
+MEDIA_GROUP_SIZE = 10
+CAPTION_LIMIT = 1024
+
+# Charts rendered in parallel worker threads
+CHART_WORKERS = 4
+
+
+async def ensure_admin(callback_query: CallbackQuery) -> bool:
+    """Check that the callback comes from an admin and notify the user otherwise"""
+    user_id = callback_query.from_user.id
+    if is_admin(user_id):
+        return True
+
+    warning(
+        f"Користувач {user_id} (@{callback_query.from_user.username}) намагався отримати доступ до результатів без прав адміністратора")
+    await callback_query.answer("У вас немає прав доступу до цієї функції.", show_alert=True)
+    return False
+
+
+async def callback_survey(callback_query: CallbackQuery, callback_data: AdminCallback) -> Optional[Survey]:
+    """Find the survey an admin button belongs to and notify the admin if it no longer exists"""
+    survey = surveys.get(callback_data.survey)
+    if survey is None:
+        warning(f"Адміністратор {callback_query.from_user.id} запросив невідоме опитування '{callback_data.survey}'")
+        await callback_query.answer("Опитування не знайдено.", show_alert=True)
+    return survey
+
+
+async def render_report_charts(survey: Survey) -> List[Tuple[int, Optional[bytes], Optional[str]]]:
+    """Render the charts of all report questions concurrently in worker threads"""
+    # pandas and matplotlib are only loaded once an admin actually asks for charts
+    from bot.utils.visualization import generate_pie_chart
+
+    workers = asyncio.Semaphore(CHART_WORKERS)
+
+    async def render(question_id: int) -> Tuple[int, Optional[bytes], Optional[str]]:
+        async with workers:
+            debug(f"Генерація діаграми для питання {question_id}")
+            chart_buffer, color_data = await asyncio.to_thread(generate_pie_chart, question_id, None, survey)
+        return question_id, chart_buffer.getvalue() if chart_buffer else None, color_data
+
+    # Questions with answer options get a chart, free-text questions are skipped
+    question_ids = [q["question_id"] for q in survey.questions if q["answers"]]
+    return await asyncio.gather(*(render(question_id) for question_id in question_ids))
+
+
+async def send_with_retry(send, *args, **kwargs):
+    """Call a Bot API method, waiting once if Telegram asks to slow down"""
+    try:
+        return await send(*args, **kwargs)
+    except TelegramRetryAfter as e:
+        warning(f"Telegram обмежив частоту запитів, повтор через {e.retry_after} с")
+        await asyncio.sleep(e.retry_after)
+        return await send(*args, **kwargs)
+
+
+async def send_results_report(chat_id: int, survey: Survey) -> None:
+    """Send all charts as albums with the results in captions, plus one summary message"""
+    charts = await render_report_charts(survey)
+
+    media = []
+    summary_lines = []
+    failed = []
+    for question_id, chart, color_data in charts:
+        if not chart:
+            error(f"Не вдалося згенерувати діаграму для питання {question_id}")
+            failed.append(str(question_id))
+            continue
+
+        # Fold the breakdown into the caption, too long ones go to the summary message instead
+        results_text = "\n".join(line for line in color_data.split("\n") if line.strip())
+        caption = f"Питання {question_id}\n📊 Результати:\n{results_text}"
+        if len(caption) > CAPTION_LIMIT:
+            caption = f"Питання {question_id}"
+            summary_lines.append(f"Питання {question_id}:\n{results_text}\n")
+
+        media.append(InputMediaPhoto(
+            media=BufferedInputFile(chart, filename=f"question_{question_id}.png"),
+            caption=caption,
+            parse_mode=None
+        ))
+
+    # Albums of one chat go one after another, parallel uploads could arrive out of question order
+    albums = [media[idx:idx + MEDIA_GROUP_SIZE] for idx in range(0, len(media), MEDIA_GROUP_SIZE)]
+    for album in albums:
+        if len(album) == 1:
+            await send_with_retry(bot.send_photo, chat_id, album[0].media, caption=album[0].caption,
+                                  parse_mode=None)
+        else:
+            await send_with_retry(bot.send_media_group, chat_id, album)
+    info(f"Відправлено {len(media)} діаграм у {len(albums)} альбомах")
+
+    if failed:
+        summary_lines.append(f"Не вдалося згенерувати діаграми для питань: {', '.join(failed)}.")
+    if summary_lines:
+        for page in split_message("📊 Результати:\n\n" + "\n".join(summary_lines)):
+            await send_with_retry(bot.send_message, chat_id, page, parse_mode=None)
+
 
 def register_admin_handlers(router: Router):
     """Register all admin-related handlers"""
@@ -18,39 +125,221 @@ def register_admin_handlers(router: Router):
         username = callback_query.from_user.username
 
         # Only admins can see results
-        if not is_admin(user_id):
-            warning(
-                f"Користувач {user_id} (@{username}) намагався отримати доступ до результатів без прав адміністратора")
-            await callback_query.answer("У вас немає прав доступу до цієї функції.", show_alert=True)
+        if not await ensure_admin(callback_query):
+            return
+        survey = await callback_survey(callback_query, callback_data)
+        if survey is None:
             return
 
-        info(f"Адміністратор {user_id} (@{username}) запросив усі результати")
+        info(f"Адміністратор {user_id} (@{username}) запросив усі результати опитування '{survey.survey_id}'")
         await callback_query.answer()
+
         await callback_query.message.answer("Генерую діаграми для всіх питань...")
+        await send_results_report(callback_query.message.chat.id, survey)
+        info(f"Відправлено результати опитування адміністратору {user_id}")
+
+    @router.callback_query(AdminCallback.filter(F.action == "funnel"))
+    async def funnel_callback(callback_query: CallbackQuery, callback_data: AdminCallback) -> None:
+        """Handle button click to show the drop-off funnel"""
+        if not await ensure_admin(callback_query):
+            return
+        survey = await callback_survey(callback_query, callback_data)
+        if survey is None:
+            return
 
-        # Send all charts in sequence
-        for question_id in range(1, 21):  # Assuming question IDs are 1 through 20
-            if question_id not in [15, 17]:
-                debug(f"Генерація діаграми для питання {question_id}")
-                chart_buffer, color_data = generate_pie_chart(question_id)
+        info(f"Адміністратор {callback_query.from_user.id} запросив воронку проходження "
+             f"опитування '{survey.survey_id}'")
+        await callback_query.answer()
 
-                if not chart_buffer:
-                    error(f"Не вдалося згенерувати діаграму для питання {question_id}")
-                    await callback_query.message.answer(f"Не вдалося згенерувати діаграму для питання {question_id}.")
-                    continue
+        from bot.utils.funnel import build_funnel_report, format_funnel_report
+        report = await asyncio.to_thread(build_funnel_report, survey)
+        await callback_query.message.answer(format_funnel_report(report))
 
-                # Send the chart without any caption
-                await callback_query.message.answer_photo(
-                    BufferedInputFile(chart_buffer.read(), filename=f"question_{question_id}.png")
+    @router.callback_query(AdminCallback.filter(F.action == "text_stats"))
+    async def text_stats_callback(callback_query: CallbackQuery, callback_data: AdminCallback) -> None:
+        """Handle button click to show terms, phrases and similar answers of the free-text answers"""
+        if not await ensure_admin(callback_query):
+            return
+        survey = await callback_survey(callback_query, callback_data)
+        if survey is None:
+            return
+
+        info(f"Адміністратор {callback_query.from_user.id} запросив аналіз текстових відповідей "
+             f"опитування '{survey.survey_id}'")
+        await callback_query.answer()
+
+        from bot.utils.text_stats import build_text_report
+        report = await asyncio.to_thread(build_text_report, 10, survey)
+        for page in split_message(report):
+            await callback_query.message.answer(page, parse_mode=None)
+
+    @router.callback_query(AdminCallback.filter(F.action == "pdf_report"))
+    async def pdf_report_callback(callback_query: CallbackQuery, callback_data: AdminCallback) -> None:
+        """Handle button click to build and send the PDF report"""
+        if not await ensure_admin(callback_query):
+            return
+        survey = await callback_survey(callback_query, callback_data)
+        if survey is None:
+            return
+
+        user_id = callback_query.from_user.id
+        info(f"Адміністратор {user_id} запросив PDF-звіт опитування '{survey.survey_id}'")
+        await callback_query.answer()
+        await callback_query.message.answer("Готую PDF-звіт, це може зайняти деякий час...")
+
+        # The document is built in a worker thread so survey users are not blocked
+        from bot.utils.pdf_report import build_pdf_report
+        try:
+            report_path = await asyncio.to_thread(build_pdf_report, survey)
+        except Exception as e:
+            error(f"Не вдалося згенерувати PDF-звіт: {e}")
+            await callback_query.message.answer("Не вдалося згенерувати PDF-звіт.")
+            return
+
+        await callback_query.message.answer_document(
+            FSInputFile(report_path, filename=f"survey_report_{survey.survey_id}.pdf"),
+            caption="📄 Звіт за результатами опитування"
+        )
+        info(f"Відправлено PDF-звіт адміністратору {user_id}")
+
+    @router.callback_query(AdminCallback.filter(F.action == "timeseries"))
+    async def timeseries_callback(callback_query: CallbackQuery, callback_data: AdminCallback) -> None:
+        """Handle choosing the period of the response-rate chart and sending the chart"""
+        if not await ensure_admin(callback_query):
+            return
+        survey = await callback_survey(callback_query, callback_data)
+        if survey is None:
+            return
+
+        from bot.utils.timeseries import PERIODS, generate_timeseries_chart
+        await callback_query.answer()
+
+        # First click: let the admin choose the period
+        if callback_data.period not in PERIODS:
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(
+                    text=title.capitalize(),
+                    callback_data=AdminCallback(action="timeseries", period=period, survey=survey.survey_id).pack()
+                )]
+                for period, (title, _, _) in PERIODS.items()
+            ])
+            await callback_query.message.answer("Оберіть період:", reply_markup=keyboard)
+            return
+
+        info(f"Адміністратор {callback_query.from_user.id} запросив динаміку опитування '{survey.survey_id}' "
+             f"({callback_data.period})")
+        chart_buffer, summary = await asyncio.to_thread(
+            generate_timeseries_chart, callback_data.period, None, survey
+        )
+        await callback_query.message.answer_photo(
+            BufferedInputFile(chart_buffer.getvalue(), filename=f"timeseries_{callback_data.period}.png"),
+            caption=summary,
+            parse_mode=None
+        )
+
+    @router.message(Command("crosstab"))
+    async def crosstab_command(message: Message, command: CommandObject) -> None:
+        """Handle /crosstab <row question> <column question> [survey] to compare answers of two questions"""
+        user_id = message.from_user.id
+        if not is_admin(user_id):
+            warning(f"Користувач {user_id} намагався побудувати перехресну таблицю без прав адміністратора")
+            await message.answer("У вас немає прав доступу до цієї функції.")
+            return
+
+        arguments = (command.args or "").split()
+        survey = surveys.get(arguments[2] if len(arguments) == 3 else None)
+        if len(arguments) not in (2, 3) or not all(argument.isdigit() for argument in arguments[:2]) or not survey:
+            await message.answer(
+                "Використання: /crosstab <питання> <питання> [опитування]\n"
+                "Наприклад, /crosstab 2 1 — частота покупок залежно від розміру родини.",
+                parse_mode=None
+            )
+            return
+
+        row_question, column_question = int(arguments[0]), int(arguments[1])
+        info(f"Адміністратор {user_id} запросив перехресну таблицю питань {row_question} та {column_question} "
+             f"опитування '{survey.survey_id}'")
+
+        from bot.utils.crosstab import generate_crosstab_chart
+        chart_buffer, caption = await asyncio.to_thread(
+            generate_crosstab_chart, row_question, column_question, None, survey
+        )
+        if not chart_buffer:
+            await message.answer(caption, parse_mode=None)
+            return
+
+        await message.answer_photo(
+            BufferedInputFile(chart_buffer.getvalue(), filename=f"crosstab_{row_question}_{column_question}.png"),
+            caption=caption,
+            parse_mode=None
+        )
+
+    @router.message(Command("profile"))
+    async def profile_command(message: Message, command: CommandObject) -> None:
+        """Handle /profile [fraction|off|dump] to profile the live bot"""
+        user_id = message.from_user.id
+        if not is_admin(user_id):
+            warning(f"Користувач {user_id} намагався керувати профілюванням без прав адміністратора")
+            await message.answer("У вас немає прав доступу до цієї функції.")
+            return
+
+        from bot.utils.profiler import profiler
+        argument = (command.args or "").strip().lower()
+
+        if argument in ("off", "dump"):
+            if argument == "off":
+                profiler.disable()
+            summary = profiler.summary()
+            profile_path = await asyncio.to_thread(profiler.dump)
+            info(f"Адміністратор {user_id} отримав результати профілювання")
+            for page in split_message(summary):
+                await message.answer(page, parse_mode=None)
+            if profile_path:
+                await message.answer_document(
+                    FSInputFile(profile_path),
+                    caption="Стеки у форматі collapsed (flamegraph.pl, speedscope)"
+                )
+            return
+
+        if argument:
+            try:
+                sample_rate = float(argument)
+            except ValueError:
+                sample_rate = 0.0
+            if not 0 < sample_rate <= 1:
+                await message.answer(
+                    "Використання: /profile [частка|off|dump]\n"
+                    "Наприклад, /profile 0.1 — профілювати 10% оновлень, "
+                    "/profile off — вимкнути та отримати результати."
                 )
-                info(f"Відправлено діаграму для питання {question_id}")
+                return
+            profiler.enable(sample_rate)
+            info(f"Адміністратор {user_id} увімкнув профілювання {sample_rate:.0%} оновлень")
+
+        for page in split_message(profiler.summary()):
+            await message.answer(page, parse_mode=None)
+
+    @router.message(Command("memory"))
+    async def memory_command(message: Message, command: CommandObject, fsm_storage) -> None:
+        """Handle /memory [trace|stop] to report memory held by sessions and caches"""
+        user_id = message.from_user.id
+        if not is_admin(user_id):
+            warning(f"Користувач {user_id} намагався переглянути використання пам'яті без прав адміністратора")
+            await message.answer("У вас немає прав доступу до цієї функції.")
+            return
 
-                # Format the results data without repeating the question
-                results_text = "📊 Результати:\n\n"
-                for line in color_data.split('\n'):
-                    if line.strip():
-                        results_text += line + "\n"
+        from bot.utils.memory import build_memory_report, start_tracing, stop_tracing
+        argument = (command.args or "").strip().lower()
+        if argument == "trace":
+            start_tracing()
+        elif argument == "stop":
+            stop_tracing()
 
-                await callback_query.message.answer(results_text)
+        info(f"Адміністратор {user_id} запросив звіт про використання пам'яті")
+        # Sessions are listed here, the storage is only changed from the event loop
+        sessions = fsm_storage.get_sessions()
+        report = await asyncio.to_thread(build_memory_report, sessions, fsm_storage.budget_bytes, fsm_storage.evicted)
+        for page in split_message(report):
+            await message.answer(page, parse_mode=None)
 
     debug("Обробники адміністратора успішно зареєстровані")
\ No newline at end of file
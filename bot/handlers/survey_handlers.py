@@ -1,69 +1,193 @@
+import asyncio
+from typing import Any, Dict
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
-from aiogram.filters import CommandStart
+from aiogram.filters import CommandStart, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest
-import os
 
-from bot.configs import bot, IMAGES_FOLDER
+from bot.configs import bot
 from bot.models.state import SurveyStates
 from bot.models.callbacks import AnswerCallback, AdminCallback
-from bot.utils.helpers import (
-    is_admin, questions, generate_keyboard, save_answers
-)
+from bot.utils.callback_dispatch import AnswerCallbackRouter
+from bot.utils.helpers import is_admin, generate_keyboard, checkpoint_answer, complete_survey, track_progress
+from bot.utils.surveys import Survey, surveys
+from bot.utils.reminders import resume_session_data
+from bot.db.database import start_survey_run
+from bot.db.checkpoints import checkpointer
 
 from bot.logger import info, warning, error, debug
 
+# Sent after the last question of surveys without their own final message
+FINAL_MESSAGE = (
+    "🎉 Дякуємо, що пройшли опитування!\n\n"
+    "Це лише початок. Ми створюємо не просто магазин — ми будуємо нову модель життя, "
+    "де люди об’єднуються та разом вирішують, що, як і для кого створювати.\n\n"
+    "Запрошуємо вас до нашої спільноти — тут ми ділимося новинами, прозоро показуємо, "
+    "як реалізується проєкт, і разом формуємо нову економіку без спекуляцій.\n\n"
+    "📲 Переходьте до нашого новинного каналу та станьте частиною нового світу:\n"
+    "🔗 t.me/noviySvit_Ukraine\n\n"
+    "Разом — сильніше. Разом — чесніше. Разом — інакше. 💛"
+)
+
+
+def session_survey(data: Dict[str, Any]) -> Survey:
+    """Return the survey a respondent is taking, sessions without one belong to the default survey."""
+    return surveys.get(data.get("survey")) or surveys.default
+
+
+def admin_keyboard(survey: Survey) -> InlineKeyboardMarkup:
+    """Build the admin panel of a survey."""
+    survey_id = survey.survey_id
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Показати результати опитування",
+                              callback_data=AdminCallback(action="all_results", survey=survey_id).pack())],
+        [InlineKeyboardButton(text="Воронка проходження",
+                              callback_data=AdminCallback(action="funnel", survey=survey_id).pack())],
+        [InlineKeyboardButton(text="Динаміка відповідей",
+                              callback_data=AdminCallback(action="timeseries", survey=survey_id).pack())],
+        [InlineKeyboardButton(text="Текстові відповіді",
+                              callback_data=AdminCallback(action="text_stats", survey=survey_id).pack())],
+        [InlineKeyboardButton(text="PDF-звіт",
+                              callback_data=AdminCallback(action="pdf_report", survey=survey_id).pack())],
+        [InlineKeyboardButton(text="Почати опитування",
+                              callback_data=f"start_survey:{survey_id}")]
+    ])
+
+
+async def begin_survey(user_id: int, survey: Survey, state: FSMContext) -> None:
+    """Register a new attempt at the survey and send its first question."""
+    # The run is registered in a worker thread, the write may wait for the database lock
+    run = await asyncio.to_thread(start_survey_run, user_id, survey.survey_id)
+    await state.set_data({
+        "survey": survey.survey_id,
+        "current_question": 0,
+        "answers": {},
+        "run": run
+    })
+
+    await send_question(user_id, state)
+
 
 def register_survey_handlers(router: Router):
     """Register all survey-related handlers"""
     debug("Реєстрація обробників опитування")
 
     @router.message(CommandStart())
-    async def start_command(message: Message, state: FSMContext) -> None:
-        """Start the survey when user sends /start command."""
+    async def start_command(message: Message, command: CommandObject, state: FSMContext) -> None:
+        """Start the survey when user sends /start command, /start <survey> (a deep link) opens a specific one."""
         user_id = message.from_user.id
         username = message.from_user.username
 
+        survey = surveys.get(command.args)
+        if survey is None:
+            warning(f"Користувач {user_id} (@{username}) відкрив невідоме опитування '{command.args}'")
+            await message.answer("Такого опитування не знайдено. Перевірте посилання.", parse_mode=None)
+            return
+
         # If admin, show admin panel instead of starting survey
         if is_admin(user_id):
-            info(f"Адміністратор {user_id} (@{username}) розпочав роботу з ботом")
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="Показати результати опитування",
-                                      callback_data=AdminCallback(action="all_results").pack())],
-                [InlineKeyboardButton(text="Почати опитування",
-                                      callback_data="start_survey")]
-            ])
-            await message.answer("Вітаю, адміністратор! Виберіть опцію:", reply_markup=keyboard)
+            info(f"Адміністратор {user_id} (@{username}) розпочав роботу з ботом (опитування '{survey.survey_id}')")
+            text = "Вітаю, адміністратор! Виберіть опцію:"
+            if len(surveys) > 1:
+                others = ", ".join(f"/start {other.survey_id}" for other in surveys if other is not survey)
+                text = f"Опитування: {survey.title} ({survey.survey_id})\nІнші опитування: {others}\n\n{text}"
+            await message.answer(text, reply_markup=admin_keyboard(survey), parse_mode=None)
             return
 
         # Otherwise, start the survey for regular users
-        info(f"Користувач {user_id} (@{username}) розпочав роботу з ботом")
-        await state.set_data({
-            "current_question": 0,
-            "answers": {}
-        })
-
-        await send_question(user_id, state)
+        info(f"Користувач {user_id} (@{username}) розпочав роботу з ботом (опитування '{survey.survey_id}')")
+        await begin_survey(user_id, survey, state)
 
-    @router.callback_query(F.data == "start_survey")
+    @router.callback_query(F.data.startswith("start_survey"))
     async def start_survey_callback(callback_query: CallbackQuery, state: FSMContext) -> None:
         """Start the survey from a callback button."""
         await callback_query.answer()
         user_id = callback_query.from_user.id
         username = callback_query.from_user.username
 
-        info(f"Користувач {user_id} (@{username}) розпочав опитування")
+        # Buttons sent before surveys existed carry no survey id
+        survey = surveys.get(callback_query.data.partition(":")[2]) or surveys.default
+        info(f"Користувач {user_id} (@{username}) розпочав опитування '{survey.survey_id}'")
 
-        # Initialize user data
-        await state.set_data({
-            "current_question": 0,
-            "answers": {}
-        })
+        await begin_survey(user_id, survey, state)
+
+    @router.callback_query(F.data.startswith("resume_survey:"))
+    async def resume_survey_callback(callback_query: CallbackQuery, state: FSMContext) -> None:
+        """Continue an unfinished survey from a reminder at the question the user stopped at."""
+        await callback_query.answer()
+        user_id = callback_query.from_user.id
 
+        survey = surveys.get(callback_query.data.partition(":")[2])
+        if survey is None:
+            await bot.send_message(user_id, "Це опитування вже недоступне.")
+            return
+
+        # The session may be gone after a restart or eviction, then it is rebuilt from the saved answers
+        data = await state.get_data()
+        if "current_question" not in data or session_survey(data) is not survey:
+            # Answers still waiting in the checkpointer are part of the resume point
+            await checkpointer.flush()
+            data = await resume_session_data(user_id, survey)
+            if data is None:
+                info(f"Користувач {user_id} не має незавершеного опитування '{survey.survey_id}', починаємо заново")
+                await begin_survey(user_id, survey, state)
+                return
+            await state.set_data(data)
+
+        info(f"Користувач {user_id} продовжив опитування '{survey.survey_id}' з питання {data['current_question'] + 1}")
         await send_question(user_id, state)
 
-    @router.callback_query(AnswerCallback.filter(F.action == "toggle"))
+    @router.message(SurveyStates.custom_input)
+    async def process_text_response(message: Message, state: FSMContext) -> None:
+        """Process text response from user."""
+        user_id = message.from_user.id
+
+        # Get current data
+        data = await state.get_data()
+        question_index = data.get("current_question", 0)
+        user_answers = data.get("answers", {})
+
+        survey = session_survey(data)
+        question_data = survey.questions[question_index]
+        q_text = question_data["question"]
+
+        # Save custom text answer
+        if q_text not in user_answers:
+            default_selected = [] if question_data["multiple_choice"] else None
+            user_answers[q_text] = {"selected": default_selected, "custom": message.text}
+        else:
+            user_answers[q_text]["custom"] = message.text
+
+        # Update state and move to next question
+        data["answers"] = user_answers
+        checkpoint_answer(user_id, survey.survey_id, data.get("run", 1), question_data, user_answers)
+        data["current_question"] += 1
+        await state.set_data(data)
+
+        info(
+            f"Користувач {user_id} надав текстову відповідь на питання {question_index + 1}: '{message.text[:50]}...' " if len(
+                message.text) > 50 else f"Користувач {user_id} надав текстову відповідь на питання {question_index + 1}: '{message.text}'")
+
+        await send_question(user_id, state)
+
+    @router.message()
+    async def handle_unexpected(message: Message) -> None:
+        """Handle unexpected messages."""
+        user_id = message.from_user.id
+        warning(f"Користувач {user_id} надіслав неочікуване повідомлення: '{message.text}'")
+        await message.answer("Будь ласка, використовуйте кнопки опитування або команду /start для початку опитування.")
+
+    debug("Обробники опитування успішно зареєстровані")
+
+
+def register_answer_handlers(router: Router):
+    """Register the survey answer button handlers, dispatched by a single prefix table lookup"""
+    debug("Реєстрація обробників відповідей")
+    answer_callbacks = AnswerCallbackRouter()
+
+    @answer_callbacks.handler("toggle")
     async def process_toggle_answer(callback_query: CallbackQuery, callback_data: AnswerCallback,
                                     state: FSMContext) -> None:
         """Handle toggling a multiple-choice answer."""
@@ -75,7 +199,8 @@ def register_survey_handlers(router: Router):
         question_index = data.get("current_question", 0)
         user_answers = data.get("answers", {})
 
-        question_data = questions[question_index]
+        survey = session_survey(data)
+        question_data = survey.questions[question_index]
         q_text = question_data["question"]
         answer_idx = callback_data.answer_idx
         answer_text = question_data["answers"][answer_idx]
@@ -99,12 +224,12 @@ def register_survey_handlers(router: Router):
 
         # Update message keyboard
         try:
-            keyboard = await generate_keyboard(question_data, user_answers)
+            keyboard = await generate_keyboard(survey, question_data, user_answers)
             await callback_query.message.edit_reply_markup(reply_markup=keyboard)
         except TelegramBadRequest as e:
             error(f"Не вдалося оновити клавіатуру для користувача {user_id}: {e}")
 
-    @router.callback_query(AnswerCallback.filter(F.action == "select"))
+    @answer_callbacks.handler("select")
     async def process_select_answer(callback_query: CallbackQuery, callback_data: AnswerCallback,
                                     state: FSMContext) -> None:
         """Handle selecting a single-choice answer."""
@@ -116,7 +241,8 @@ def register_survey_handlers(router: Router):
         question_index = data.get("current_question", 0)
         user_answers = data.get("answers", {})
 
-        question_data = questions[question_index]
+        survey = session_survey(data)
+        question_data = survey.questions[question_index]
         q_text = question_data["question"]
         answer_idx = callback_data.answer_idx
         answer_text = question_data["answers"][answer_idx]
@@ -124,15 +250,13 @@ def register_survey_handlers(router: Router):
         # Save answer
         user_answers[q_text] = {"selected": answer_text, "custom": None}
         data["answers"] = user_answers
+        checkpoint_answer(user_id, survey.survey_id, data.get("run", 1), question_data, user_answers)
 
-        # Check if this is question 16 about pets and the answer is "Ні"
-        if question_index == 15 and answer_text == "Ні":  # Note: indexes are 0-based, so question 16 is at index 15
-            # Skip questions 17, 18, 19 and go directly to question 20
-            data["current_question"] = 19  # Set to index 19, which is question 20
-            info(f"Користувач {user_id} відповів 'Ні' на питання про домашніх тварин, пропускаємо питання 17-19")
-        else:
-            # Normal progression to the next question
-            data["current_question"] += 1
+        # Move to the next question, skipping the ones that don't apply
+        data["current_question"] = survey.next_question_index(question_index, answer_text)
+        if data["current_question"] > question_index + 1:
+            info(f"Користувач {user_id} відповів '{answer_text}' на питання {question_index + 1}, "
+                 f"пропускаємо питання {question_index + 2}-{data['current_question']}")
 
         await state.set_data(data)
 
@@ -141,8 +265,9 @@ def register_survey_handlers(router: Router):
         # Go to next question
         await send_question(user_id, state)
 
-    @router.callback_query(AnswerCallback.filter(F.action == "custom"))
-    async def process_custom_input_request(callback_query: CallbackQuery, state: FSMContext) -> None:
+    @answer_callbacks.handler("custom")
+    async def process_custom_input_request(callback_query: CallbackQuery, callback_data: AnswerCallback,
+                                           state: FSMContext) -> None:
         """Handle request for custom text input."""
         await callback_query.answer()
         user_id = callback_query.from_user.id
@@ -151,8 +276,9 @@ def register_survey_handlers(router: Router):
         await bot.send_message(user_id, "Напишіть ваш варіант відповіді:")
         await state.set_state(SurveyStates.custom_input)
 
-    @router.callback_query(AnswerCallback.filter(F.action == "done"))
-    async def process_done(callback_query: CallbackQuery, state: FSMContext) -> None:
+    @answer_callbacks.handler("done")
+    async def process_done(callback_query: CallbackQuery, callback_data: AnswerCallback,
+                           state: FSMContext) -> None:
         """Handle completion of multiple-choice question."""
         await callback_query.answer()
         user_id = callback_query.from_user.id
@@ -160,6 +286,9 @@ def register_survey_handlers(router: Router):
         # Move to next question
         data = await state.get_data()
         question_index = data.get("current_question", 0)
+        survey = session_survey(data)
+        checkpoint_answer(user_id, survey.survey_id, data.get("run", 1), survey.questions[question_index],
+                          data.get("answers", {}))
         data["current_question"] += 1
         await state.set_data(data)
 
@@ -167,45 +296,7 @@ def register_survey_handlers(router: Router):
 
         await send_question(user_id, state)
 
-    @router.message(SurveyStates.custom_input)
-    async def process_text_response(message: Message, state: FSMContext) -> None:
-        """Process text response from user."""
-        user_id = message.from_user.id
-
-        # Get current data
-        data = await state.get_data()
-        question_index = data.get("current_question", 0)
-        user_answers = data.get("answers", {})
-
-        question_data = questions[question_index]
-        q_text = question_data["question"]
-
-        # Save custom text answer
-        if q_text not in user_answers:
-            default_selected = [] if question_data["multiple_choice"] else None
-            user_answers[q_text] = {"selected": default_selected, "custom": message.text}
-        else:
-            user_answers[q_text]["custom"] = message.text
-
-        # Update state and move to next question
-        data["answers"] = user_answers
-        data["current_question"] += 1
-        await state.set_data(data)
-
-        info(
-            f"Користувач {user_id} надав текстову відповідь на питання {question_index + 1}: '{message.text[:50]}...' " if len(
-                message.text) > 50 else f"Користувач {user_id} надав текстову відповідь на питання {question_index + 1}: '{message.text}'")
-
-        await send_question(user_id, state)
-
-    @router.message()
-    async def handle_unexpected(message: Message) -> None:
-        """Handle unexpected messages."""
-        user_id = message.from_user.id
-        warning(f"Користувач {user_id} надіслав неочікуване повідомлення: '{message.text}'")
-        await message.answer("Будь ласка, використовуйте кнопки опитування або команду /start для початку опитування.")
-
-    debug("Обробники опитування успішно зареєстровані")
+    answer_callbacks.register(router)
 
 
 async def send_question(user_id: int, state: FSMContext) -> None:
@@ -214,60 +305,54 @@ async def send_question(user_id: int, state: FSMContext) -> None:
     data = await state.get_data()
     question_index = data.get("current_question", 0)
     user_answers = data.get("answers", {})
+    survey = session_survey(data)
 
     # Check if survey is complete
-    if question_index >= len(questions):
-        info(f"Користувач {user_id} завершив опитування")
-        final_message = (
-            "🎉 Дякуємо, що пройшли опитування!\n\n"
-            "Це лише початок. Ми створюємо не просто магазин — ми будуємо нову модель життя, "
-            "де люди об’єднуються та разом вирішують, що, як і для кого створювати.\n\n"
-            "Запрошуємо вас до нашої спільноти — тут ми ділимося новинами, прозоро показуємо, "
-            "як реалізується проєкт, і разом формуємо нову економіку без спекуляцій.\n\n"
-            "📲 Переходьте до нашого новинного каналу та станьте частиною нового світу:\n"
-            "🔗 t.me/noviySvit_Ukraine\n\n"
-            "Разом — сильніше. Разом — чесніше. Разом — інакше. 💛"
-        )
-        await bot.send_message(user_id, final_message)
-        await save_answers(user_id, user_answers)
+    if question_index >= len(survey.questions):
+        info(f"Користувач {user_id} завершив опитування '{survey.survey_id}'")
+        # Answers are already checkpointed, so completing is just a status flip
+        complete_survey(user_id, survey.survey_id, data.get("run", 1))
+        await bot.send_message(user_id, survey.final_message or FINAL_MESSAGE)
         await state.clear()
         return
 
     # Get current question data
-    question_data = questions[question_index]
+    question_data = survey.questions[question_index]
     question_text = f"{question_data['question']}\n\n{question_data['hint']}"
+    track_progress(user_id, survey.survey_id, data.get("run", 1), question_index)
 
     debug(f"Відправка питання {question_index + 1} користувачу {user_id}")
 
     # Send image for the question first
-    image_number = question_index + 1  # Question indexes start from 0, image files from 1
-    image_filename = f"{image_number}.PNG"
-    image_path = os.path.join(IMAGES_FOLDER, image_filename)
+    image_path = survey.image_path(question_index)
 
     try:
         # Create appropriate keyboard if needed
         keyboard = None
         if question_data["answers"]:
-            keyboard = await generate_keyboard(question_data, user_answers)
+            keyboard = await generate_keyboard(survey, question_data, user_answers)
             await state.set_state(SurveyStates.answering)
         elif question_data["text_response"]:
             await state.set_state(SurveyStates.custom_input)
 
-        # Send the image with caption and keyboard (if available)
-        image = FSInputFile(image_path)
-        await bot.send_photo(
+        # Send the image with caption and keyboard (if available),
+        # it is uploaded once per survey and later sent by its Telegram file_id
+        image = survey.photo_ids.get(question_index) or FSInputFile(image_path)
+        sent = await bot.send_photo(
             user_id,
             image,
             caption=question_text,
             reply_markup=keyboard
         )
-        debug(f"Відправлено зображення {image_filename} для питання {question_index + 1}")
+        if question_index not in survey.photo_ids and sent.photo:
+            survey.photo_ids[question_index] = sent.photo[-1].file_id
+        debug(f"Відправлено зображення {image_path} для питання {question_index + 1}")
 
     except FileNotFoundError:
-        error(f"Зображення {image_filename} не знайдено у {IMAGES_FOLDER}")
+        error(f"Зображення {image_path} не знайдено")
         # If image not found, just send the question as text
         if question_data["answers"]:
-            keyboard = await generate_keyboard(question_data, user_answers)
+            keyboard = await generate_keyboard(survey, question_data, user_answers)
             await bot.send_message(user_id, question_text, reply_markup=keyboard)
             await state.set_state(SurveyStates.answering)
         elif question_data["text_response"]:
@@ -276,9 +361,11 @@ async def send_question(user_id: int, state: FSMContext) -> None:
 
     except Exception as e:
         error(f"Помилка при відправці зображення для питання {question_index + 1}: {e}")
+        # A file_id Telegram no longer accepts is replaced by a fresh upload next time
+        survey.photo_ids.pop(question_index, None)
         # If any error, fall back to text-only question
         if question_data["answers"]:
-            keyboard = await generate_keyboard(question_data, user_answers)
+            keyboard = await generate_keyboard(survey, question_data, user_answers)
             await bot.send_message(user_id, question_text, reply_markup=keyboard)
             await state.set_state(SurveyStates.answering)
 
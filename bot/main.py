@@ -1,35 +1,83 @@
 import asyncio
+from typing import Optional
+
 from aiogram import Router, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
-from bot.configs import bot
+from bot.configs import bot, GOOGLE_SHEETS_ID, ARCHIVE_AFTER_DAYS, RECORD_UPDATES, REMINDER_DELAYS_HOURS
 from bot.handlers.admin_handlers import register_admin_handlers
-from bot.handlers.survey_handlers import register_survey_handlers
+from bot.handlers.survey_handlers import register_survey_handlers, register_answer_handlers
 from bot.db.database import init_db
+from bot.db.checkpoints import checkpointer
+from bot.models.storage import TrackedMemoryStorage
+from bot.utils.profiler import profiler
+from bot.utils.recorder import UpdateRecorder
 from bot.logger import ProjectLogger, info, error
 
 logger = ProjectLogger().get_logger()
 
-# Create main router
-router = Router()
+
+def create_dispatcher(recorder: Optional[UpdateRecorder] = None) -> Dispatcher:
+    """Create the dispatcher with all handlers and middlewares registered"""
+    # Create dispatcher with FSM storage
+    dp = Dispatcher(storage=TrackedMemoryStorage())
+
+    # Record raw updates before any filter sees them
+    if recorder:
+        dp.update.outer_middleware(recorder)
+
+    # Create main router
+    router = Router()
+    # Answer buttons are the most frequent updates, their router is checked first
+    answers_router = Router()
+
+    # Register all handlers
+    register_answer_handlers(answers_router)
+    register_admin_handlers(router)
+    register_survey_handlers(router)
+
+    # Sampled updates are profiled per handler (inner middlewares apply to every included router)
+    dp.message.middleware(profiler)
+    dp.callback_query.middleware(profiler)
+
+    # Include the routers
+    dp.include_router(answers_router)
+    dp.include_router(router)
+    return dp
 
 
 async def main() -> None:
     """Main function to start the bot."""
+    sheets_sync = None
+    archive_job = None
+    reminders = None
+    recorder = UpdateRecorder() if RECORD_UPDATES else None
     try:
         # Initialize the SQLAlchemy database
         init_db()
         info("SQLAlchemy database initialized")
 
-        # Create dispatcher with FSM storage
-        dp = Dispatcher(storage=MemoryStorage())
+        dp = create_dispatcher(recorder)
+
+        # Write answer checkpoints in the background
+        checkpointer.start()
+
+        # Export completed surveys to Google Sheets if configured
+        if GOOGLE_SHEETS_ID:
+            from bot.utils.sheets_sync import SheetsSyncJob
+            sheets_sync = SheetsSyncJob()
+            sheets_sync.start()
 
-        # Register all handlers
-        register_admin_handlers(router)
-        register_survey_handlers(router)
+        # Move answers of long inactive respondents to the archive database
+        if ARCHIVE_AFTER_DAYS > 0:
+            from bot.db.archive import ArchiveJob
+            archive_job = ArchiveJob()
+            archive_job.start()
 
-        # Include the main router
-        dp.include_router(router)
+        # Remind respondents about unfinished surveys
+        if REMINDER_DELAYS_HOURS:
+            from bot.utils.reminders import ReminderScheduler
+            reminders = ReminderScheduler()
+            reminders.start()
 
         # Start polling
         info("Starting bot...")
@@ -37,6 +85,16 @@ async def main() -> None:
     except Exception as e:
         error(f"Error starting bot: {e}")
         raise
+    finally:
+        if reminders:
+            await reminders.stop()
+        if sheets_sync:
+            await sheets_sync.stop()
+        if archive_job:
+            await archive_job.stop()
+        await checkpointer.stop()
+        if recorder:
+            recorder.close()
 
 
 if __name__ == "__main__":
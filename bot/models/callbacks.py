@@ -1,13 +1,59 @@
-from typing import Optional
+from typing import NamedTuple, Optional
 from aiogram.filters.callback_data import CallbackData
 
-class AnswerCallback(CallbackData, prefix="ans"):
-    """Callback data for survey answers"""
+# Single-character codes of the survey answer actions used in callback data
+ANSWER_ACTION_CODES = {"toggle": "t", "select": "s", "custom": "c", "done": "d"}
+ANSWER_ACTIONS = {code: action for action, code in ANSWER_ACTION_CODES.items()}
+# Prefix of the previous pydantic answer callbacks ("ans:toggle:3:2"), still on keyboards sent before
+LEGACY_ANSWER_PREFIX = "ans:"
+
+
+class AnswerCallback(NamedTuple):
+    """
+    Callback data for survey answers in a compact form, e.g. "t3.2" or "d5".
+
+    The action code is followed by the question id and, for answer buttons, the answer index.
+    Survey buttons are tapped on every question, so parsing is plain string splitting without pydantic.
+    """
     action: str  # "toggle", "select", "custom", "done"
     question_idx: int
     answer_idx: Optional[int] = None
 
+    def pack(self) -> str:
+        """Encode the callback data for a button"""
+        code = ANSWER_ACTION_CODES[self.action]
+        if self.answer_idx is None:
+            return f"{code}{self.question_idx}"
+        return f"{code}{self.question_idx}.{self.answer_idx}"
+
+    @classmethod
+    def parse(cls, action: str, payload: str) -> Optional["AnswerCallback"]:
+        """Parse the part after the action code, return None if it is malformed"""
+        question_idx, _, answer_idx = payload.partition(".")
+        if not question_idx.isdigit() or (answer_idx and not answer_idx.isdigit()):
+            return None
+        return cls(action, int(question_idx), int(answer_idx) if answer_idx else None)
+
+    @classmethod
+    def parse_legacy(cls, value: str) -> Optional["AnswerCallback"]:
+        """Decode the previous "ans:<action>:<question>:<answer>" format, return None if it is malformed"""
+        parts = value[len(LEGACY_ANSWER_PREFIX):].split(":")
+        if len(parts) != 3 or parts[0] not in ANSWER_ACTION_CODES:
+            return None
+        action, question_idx, answer_idx = parts
+        return cls.parse(action, f"{question_idx}.{answer_idx}" if answer_idx else question_idx)
+
+    @classmethod
+    def unpack(cls, value: str) -> Optional["AnswerCallback"]:
+        """Decode callback data, return None if it is not a survey answer"""
+        if value.startswith(LEGACY_ANSWER_PREFIX):
+            return cls.parse_legacy(value)
+        action = ANSWER_ACTIONS.get(value[:1])
+        return cls.parse(action, value[1:]) if action else None
+
 
 class AdminCallback(CallbackData, prefix="admin"):
     """Callback data for admin functions"""
-    action: str  # "all_results"
\ No newline at end of file
+    action: str  # "all_results", "funnel", "pdf_report", "timeseries", "text_stats"
+    period: Optional[str] = None  # "24h", "7d", "30d" for "timeseries"
+    survey: Optional[str] = None  # Survey id, the default survey if not set
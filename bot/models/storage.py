@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, MemoryStorageRecord
+
+from bot.configs import SESSION_MEMORY_BUDGET_MB, SESSION_MAX_COUNT, SESSION_MIN_IDLE_MINUTES
+from bot.utils.memory import deep_sizeof
+from bot.logger import info, debug
+
+
+# Changed sessions are re-measured and the budget is checked at most this often (seconds)
+BUDGET_CHECK_INTERVAL = 5.0
+
+
+class TrackedMemoryStorage(MemoryStorage):
+    """
+    In-memory FSM storage that knows how much memory its sessions hold.
+
+    Sessions are kept in least recently used order with their approximate size.
+    Sizes of changed sessions are measured in batches, so a write costs the same as in MemoryStorage.
+    When the total size or count exceeds the budget, the least recently used sessions
+    that have been idle long enough are evicted. Empty sessions are dropped right away.
+    """
+
+    def __init__(self, budget_mb: float = SESSION_MEMORY_BUDGET_MB, max_sessions: int = SESSION_MAX_COUNT,
+                 min_idle_minutes: float = SESSION_MIN_IDLE_MINUTES):
+        """
+        :param budget_mb: Memory budget of all sessions in megabytes (0 - unlimited)
+        :param max_sessions: Maximum number of sessions (0 - unlimited)
+        :param min_idle_minutes: Sessions used more recently than this are never evicted
+        """
+        super().__init__()
+        self.storage: "OrderedDict[StorageKey, MemoryStorageRecord]" = OrderedDict()
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.max_sessions = max_sessions
+        self.min_idle = min_idle_minutes * 60
+        self.total_bytes = 0
+        self.evicted = 0
+        self._sizes: Dict[StorageKey, int] = {}
+        self._last_access: Dict[StorageKey, float] = {}
+        # Sessions whose data changed since they were last measured
+        self._dirty = set()
+        self._checked_at = 0.0
+
+    def _record(self, key: StorageKey) -> MemoryStorageRecord:
+        """Get or create the record of a session and mark it as recently used"""
+        record = self.storage.get(key)
+        if record is None:
+            record = self.storage[key] = MemoryStorageRecord()
+            self._sizes[key] = 0
+        else:
+            self.storage.move_to_end(key)
+        self._last_access[key] = time.monotonic()
+        return record
+
+    def _update(self, key: StorageKey, record: MemoryStorageRecord, data_changed: bool) -> None:
+        """Remember a changed session, drop it if it became empty and check the budget from time to time"""
+        if record.state is None and not record.data:
+            self._remove(key)
+            return
+
+        if data_changed:
+            self._dirty.add(key)
+        if self._last_access[key] - self._checked_at >= BUDGET_CHECK_INTERVAL:
+            self.enforce_budget()
+
+    def _measure(self) -> None:
+        """Re-measure the sessions that changed since the previous check"""
+        for key in self._dirty:
+            if key in self.storage:
+                size = deep_sizeof(self.storage[key].data)
+                self.total_bytes += size - self._sizes[key]
+                self._sizes[key] = size
+        self._dirty.clear()
+
+    def _remove(self, key: StorageKey) -> None:
+        """Forget a session"""
+        self.storage.pop(key, None)
+        self._dirty.discard(key)
+        self.total_bytes -= self._sizes.pop(key, 0)
+        self._last_access.pop(key, None)
+
+    def _over_budget(self) -> bool:
+        return ((self.budget_bytes and self.total_bytes > self.budget_bytes)
+                or (self.max_sessions and len(self.storage) > self.max_sessions))
+
+    def enforce_budget(self) -> int:
+        """Evict the least recently used idle sessions until the budget is met, return how many were evicted"""
+        self._measure()
+        self._checked_at = time.monotonic()
+
+        evicted = 0
+        idle_before = self._checked_at - self.min_idle
+        while self.storage and self._over_budget():
+            key = next(iter(self.storage))
+            if self._last_access[key] > idle_before:
+                break
+            self._remove(key)
+            evicted += 1
+
+        if evicted:
+            self.evicted += evicted
+            info(f"Витіснено {evicted} неактивних сесій, залишилось {len(self.storage)} "
+                 f"({self.total_bytes / 1024 / 1024:.1f} МБ)")
+        elif self._over_budget():
+            debug("Бюджет пам'яті сесій перевищено, але неактивних сесій для витіснення немає")
+        return evicted
+
+    def get_sessions(self) -> List[Tuple[StorageKey, int, float]]:
+        """Every session with its approximate size in bytes and idle time in seconds"""
+        self._measure()
+        now = time.monotonic()
+        return [(key, self._sizes[key], now - self._last_access[key]) for key in self.storage]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._update(key, record, data_changed=False)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self.storage.get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self._record(key)
+        record.data = data.copy()
+        self._update(key, record, data_changed=True)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self.storage.get(key)
+        return record.data.copy() if record else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Optional[Any] = None) -> Optional[Any]:
+        record = self.storage.get(storage_key)
+        return await super().get_value(storage_key, dict_key, default) if record else default
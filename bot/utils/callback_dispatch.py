@@ -0,0 +1,65 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple, Union
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+from bot.models.callbacks import AnswerCallback, ANSWER_ACTION_CODES, LEGACY_ANSWER_PREFIX
+from bot.logger import debug
+
+AnswerHandler = Callable[[CallbackQuery, AnswerCallback, FSMContext], Awaitable[None]]
+
+
+class AnswerCallbackRouter:
+    """
+    Routes survey answer callbacks by their action code with a single dict lookup.
+
+    It is registered as one aiogram handler whose filter is the prefix table itself,
+    so answer taps don't walk a chain of per-action filters.
+    """
+
+    def __init__(self):
+        self._table: Dict[str, Tuple[str, AnswerHandler]] = {}
+
+    def handler(self, action: str) -> Callable[[AnswerHandler], AnswerHandler]:
+        """Register a handler for an answer action"""
+        def decorator(handler: AnswerHandler) -> AnswerHandler:
+            self._table[ANSWER_ACTION_CODES[action]] = (action, handler)
+            return handler
+        return decorator
+
+    def __call__(self, callback_query: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        """Filter: match answer callbacks and pass the parsed data and the handler on"""
+        data = callback_query.data
+        if data and data.startswith(LEGACY_ANSWER_PREFIX):
+            # Keyboards sent before the compact format still carry the old callback data
+            callback_data = AnswerCallback.parse_legacy(data)
+            entry = self._table.get(ANSWER_ACTION_CODES[callback_data.action]) if callback_data else None
+            if entry is None:
+                return False
+            return {"callback_data": callback_data, "answer_handler": entry[1]}
+
+        entry = self._table.get(data[:1]) if data else None
+        if entry is None:
+            return False
+
+        callback_data = AnswerCallback.parse(entry[0], data[1:])
+        if callback_data is None:
+            return False
+        return {"callback_data": callback_data, "answer_handler": entry[1]}
+
+    @staticmethod
+    async def _dispatch(callback_query: CallbackQuery, callback_data: AnswerCallback,
+                        answer_handler: AnswerHandler, state: FSMContext) -> None:
+        """Call the handler found by the filter"""
+        # The session may have been evicted or lost on restart, answers would land on the wrong question
+        if await state.get_state() is None:
+            await callback_query.answer("Сесія опитування завершилася. Надішліть /start, щоб почати знову.",
+                                        show_alert=True)
+            return
+        await answer_handler(callback_query, callback_data, state)
+
+    def register(self, router: Router) -> None:
+        """Attach the table to an aiogram router as a single callback query handler"""
+        router.callback_query.register(self._dispatch, self)
+        debug(f"Зареєстровано {len(self._table)} обробників відповідей")
@@ -0,0 +1,169 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from bot.db.analytics import get_answers_since
+from bot.utils.surveys import Survey, surveys
+from bot.utils.memory import register_cache
+from bot.logger import info, debug
+
+# Answers are timestamped before they are written, so re-read a short window before the cursor
+CURSOR_OVERLAP = timedelta(minutes=1)
+
+
+def _bitset_dtype(options: int):
+    """Smallest unsigned dtype with a bit for every option, object (Python ints) when none is wide enough"""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if options <= np.iinfo(dtype).bits:
+            return dtype
+    return object
+
+
+class ResponseMatrix:
+    """
+    Compact respondent × question matrix of answer option codes, updated incrementally.
+
+    Single-choice questions are stored as int16 option indexes (-1 when unanswered),
+    multiple-choice questions as bitsets of the chosen options, in the smallest unsigned dtype
+    that has a bit for every option (Python ints for questions with more than 64 options).
+    Only the latest run of every respondent is kept.
+    """
+
+    def __init__(self, survey: Survey, capacity: int = 1024):
+        self._survey = survey
+        self._multiple_choice = {q_id: q["multiple_choice"] for q_id, q in survey.questions_map.items()}
+        self._question_ids = [q_id for q_id, q in survey.questions_map.items() if q["answers"]]
+        self._options = {
+            q_id: {answer: idx for idx, answer in enumerate(survey.questions_map[q_id]["answers"])}
+            for q_id in self._question_ids
+        }
+        self._bitsets = {
+            q_id: _bitset_dtype(len(self._options[q_id])) for q_id in self._question_ids if self._multiple_choice[q_id]
+        }
+        self._rows: Dict[int, int] = {}
+        self._runs = np.zeros(capacity, dtype=np.int32)
+        self._columns: Dict[int, np.ndarray] = {
+            q_id: self._empty_column(q_id, capacity) for q_id in self._question_ids
+        }
+        self._cursor: Optional[datetime] = None
+        # Crosstabs are computed in worker threads
+        self._lock = threading.Lock()
+
+    def _empty_column(self, question_id: int, size: int) -> np.ndarray:
+        """Create storage for a question column with every respondent unanswered"""
+        if self._multiple_choice[question_id]:
+            return np.zeros(size, dtype=self._bitsets[question_id])
+        return np.full(size, -1, dtype=np.int16)
+
+    def _clear_row(self, row: int) -> None:
+        """Forget every answer of a respondent, e.g. when a retake starts"""
+        for question_id, column in self._columns.items():
+            column[row] = 0 if self._multiple_choice[question_id] else -1
+
+    def _row(self, user_id: int) -> int:
+        """Get the matrix row of a respondent, growing the arrays when needed"""
+        row = self._rows.get(user_id)
+        if row is None:
+            row = len(self._rows)
+            if row >= len(self._runs):
+                size = len(self._runs)
+                self._runs = np.concatenate([self._runs, np.zeros(size, dtype=np.int32)])
+                for question_id, column in self._columns.items():
+                    self._columns[question_id] = np.concatenate([column, self._empty_column(question_id, size)])
+            self._rows[user_id] = row
+        return row
+
+    def _encode(self, question_id: int, answer_text: str) -> int:
+        """Convert stored answer text to an option index or a bitset of option indexes"""
+        options = self._options[question_id]
+        if self._multiple_choice[question_id]:
+            bits = 0
+            for option in (answer_text or "").split(" | "):
+                if option.strip() in options:
+                    bits |= 1 << options[option.strip()]
+            return bits
+        return options.get((answer_text or "").strip(), -1)
+
+    def refresh(self) -> None:
+        """Apply answers written since the previous refresh"""
+        refreshed_at = datetime.now()
+        since = self._cursor - CURSOR_OVERLAP if self._cursor else None
+        answers = get_answers_since(since, self._survey.survey_id)
+        self._cursor = refreshed_at
+
+        for user_id, run, question_id, answer_text in answers:
+            if question_id not in self._columns:
+                continue
+            row = self._row(user_id)
+            if run < self._runs[row]:
+                continue
+            if run > self._runs[row]:
+                self._clear_row(row)
+                self._runs[row] = run
+            self._columns[question_id][row] = self._encode(question_id, answer_text)
+
+        if answers:
+            debug(f"Оновлено матрицю відповідей: {len(answers)} відповідей, {len(self._rows)} респондентів")
+
+    def _indicators(self, question_id: int) -> np.ndarray:
+        """Build a respondents × options 0/1 matrix for a question"""
+        column = self._columns[question_id][:len(self._rows)]
+        options = np.arange(len(self._options[question_id]))
+        if self._multiple_choice[question_id]:
+            return ((column[:, None] >> options.astype(column.dtype)) & 1).astype(np.int32)
+        return (column[:, None] == options).astype(np.int32)
+
+    def crosstab(self, row_question: int, column_question: int) -> Tuple[np.ndarray, int]:
+        """Count respondents for every pair of options of two questions and how many answered both"""
+        with self._lock:
+            self.refresh()
+            rows = self._indicators(row_question)
+            columns = self._indicators(column_question)
+
+        answered_both = int(np.count_nonzero(rows.any(axis=1) & columns.any(axis=1)))
+        return rows.T @ columns, answered_both
+
+
+# Matrices per survey id, created when a survey's crosstab is first requested
+response_matrices: Dict[str, ResponseMatrix] = {}
+_matrices_lock = threading.Lock()
+
+register_cache("crosstab", lambda: response_matrices)
+
+
+def generate_crosstab_chart(row_question: int, column_question: int, backend: str = None,
+                            survey: Optional[Survey] = None):
+    """Render a heatmap of two questions' answers against each other and return it with a caption"""
+    from bot.utils.visualization import get_chart_renderer
+
+    survey = survey or surveys.default
+    questions_map = survey.questions_map
+    for question_id in (row_question, column_question):
+        if question_id not in questions_map or not questions_map[question_id]["answers"]:
+            return None, f"Питання {question_id} не має варіантів відповіді."
+
+    with _matrices_lock:
+        if survey.survey_id not in response_matrices:
+            response_matrices[survey.survey_id] = ResponseMatrix(survey)
+    counts, answered_both = response_matrices[survey.survey_id].crosstab(row_question, column_question)
+    if not answered_both:
+        return None, f"Немає респондентів, які відповіли на питання {row_question} та {column_question}."
+
+    title = f"Питання {row_question} × питання {column_question}"
+    buffer = get_chart_renderer(backend).render_heatmap(
+        title,
+        questions_map[row_question]["answers"],
+        questions_map[column_question]["answers"],
+        counts.tolist()
+    )
+
+    caption = (
+        f"📊 {title}\n\n"
+        f"Рядки: {questions_map[row_question]['question']}\n"
+        f"Стовпці: {questions_map[column_question]['question']}\n"
+        f"Респондентів: {answered_both}"
+    )
+    info(f"Побудовано перехресну таблицю для питань {row_question} та {column_question}")
+    return buffer, caption
@@ -0,0 +1,210 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.db.analytics import get_touched_run_answers, get_empty_run_counts
+from bot.db.database import get_data_version
+from bot.utils.surveys import Survey, surveys
+from bot.utils.memory import register_cache
+from bot.logger import info, debug
+
+# Unfinished runs without activity for this long are counted as abandoned, newer ones as in progress
+ABANDON_AFTER = timedelta(minutes=30)
+
+# Answers are timestamped before they are written, so re-read runs touched shortly before the cursor
+CURSOR_OVERLAP = timedelta(minutes=1)
+
+# Longest time (in seconds) counted for a single question, longer gaps are clipped
+MAX_QUESTION_SECONDS = 24 * 60 * 60
+
+
+class FunnelTracker:
+    """
+    Keeps a run × question matrix of time spent per answer and updates it incrementally.
+
+    Only runs that received answers since the previous refresh are re-read from the database,
+    the report itself is a vectorised pass over the matrix.
+    Like the other analytics, only the latest run of every respondent is counted.
+    """
+
+    def __init__(self, survey: Survey, capacity: int = 1024):
+        self._survey = survey
+        questions = survey.questions
+        self._positions = {q["question_id"]: idx for idx, q in enumerate(questions)}
+        self._rows: Dict[Tuple[int, int], int] = {}
+        # Latest known run and its matrix row for every respondent
+        self._latest: Dict[int, Tuple[int, int]] = {}
+        self._answered = np.zeros((capacity, len(questions)), dtype=bool)
+        # Seconds spent on every question, NaN if the question wasn't answered or the start time is unknown
+        self._seconds = np.full((capacity, len(questions)), np.nan, dtype=np.float32)
+        # Index of the question the user is looking at after the last answer of the run, -1 for superseded runs
+        self._stop = np.zeros(capacity, dtype=np.int16)
+        self._last_activity = np.zeros(capacity, dtype=np.float64)
+        self._cursor: Optional[datetime] = None
+        # Reports are built in worker threads
+        self._lock = threading.Lock()
+
+    def _row(self, key: Tuple[int, int]) -> int:
+        """Get the matrix row of a run, growing the matrix when needed"""
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._rows)
+            if row >= len(self._stop):
+                self._answered = np.concatenate([self._answered, np.zeros_like(self._answered)])
+                self._seconds = np.concatenate([self._seconds, np.full_like(self._seconds, np.nan)])
+                self._stop = np.concatenate([self._stop, np.zeros_like(self._stop)])
+                self._last_activity = np.concatenate([self._last_activity, np.zeros_like(self._last_activity)])
+            self._rows[key] = row
+        return row
+
+    def _supersede(self, user_id: int, run: int, row: int) -> None:
+        """Keep only the latest run of a respondent in the counts"""
+        latest = self._latest.get(user_id)
+        if latest is None or run > latest[0]:
+            if latest is not None:
+                self._drop_row(latest[1])
+            self._latest[user_id] = (run, row)
+        elif run < latest[0]:
+            self._drop_row(row)
+
+    def _drop_row(self, row: int) -> None:
+        """Exclude a run from every count of the report"""
+        self._answered[row] = False
+        self._seconds[row] = np.nan
+        self._stop[row] = -1
+
+    def refresh(self) -> None:
+        """Re-read the runs touched since the previous refresh"""
+        refreshed_at = datetime.now()
+        since = self._cursor - CURSOR_OVERLAP if self._cursor else None
+        answers = get_touched_run_answers(since, self._survey.survey_id)
+        self._cursor = refreshed_at
+
+        if not answers:
+            return
+
+        user_ids, runs, question_ids, answered_at, started_at = (
+            np.array(column) for column in zip(*((a[0], a[1], a[2], a[4], a[5] or np.nan) for a in answers))
+        )
+        answer_texts = [a[3] for a in answers]
+
+        # Sort answers chronologically within each run
+        order = np.lexsort((answered_at, runs, user_ids))
+        user_ids, runs, question_ids = user_ids[order], runs[order], question_ids[order]
+        answered_at, started_at = answered_at[order], started_at[order]
+
+        # The first answer of a run is timed from the run start, the rest from the previous answer
+        first_in_run = np.ones(len(order), dtype=bool)
+        first_in_run[1:] = (user_ids[1:] != user_ids[:-1]) | (runs[1:] != runs[:-1])
+        previous = np.where(first_in_run, started_at, np.roll(answered_at, 1))
+        seconds = np.clip(answered_at - previous, 0, MAX_QUESTION_SECONDS)
+
+        rows = np.array([self._row((int(u), int(r))) for u, r in zip(user_ids, runs)])
+        columns = np.array([self._positions.get(int(q), -1) for q in question_ids])
+
+        touched = np.unique(rows)
+        self._answered[touched] = False
+        self._seconds[touched] = np.nan
+        known = columns >= 0
+        self._answered[rows[known], columns[known]] = True
+        self._seconds[rows[known], columns[known]] = seconds[known]
+
+        last_in_run = np.ones(len(order), dtype=bool)
+        last_in_run[:-1] = first_in_run[1:]
+        for idx in np.flatnonzero(last_in_run & known):
+            self._stop[rows[idx]] = self._survey.next_question_index(int(columns[idx]), answer_texts[order[idx]])
+            self._last_activity[rows[idx]] = answered_at[idx]
+
+        # A retake supersedes the earlier runs of the respondent
+        for user_id, run, row in zip(user_ids[last_in_run], runs[last_in_run], rows[last_in_run]):
+            self._supersede(int(user_id), int(run), int(row))
+
+        debug(f"Оновлено воронку опитування '{self._survey.survey_id}' для {len(touched)} спроб")
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Compute reached/answered/abandoned counts and median time for every question"""
+        with self._lock:
+            self.refresh()
+            return self._summarize()
+
+    def _summarize(self) -> List[Dict[str, Any]]:
+        """Aggregate the matrix into per-question funnel rows"""
+        questions = self._survey.questions
+        count = len(self._rows)
+        seconds = self._seconds[:count]
+        stop = self._stop[:count].astype(np.int64)
+        idle_cutoff = datetime.now() - ABANDON_AFTER
+        # Stored times are naive local times converted as if they were UTC, convert the cutoff the same way
+        idle = self._last_activity[:count] < (idle_cutoff - datetime(1970, 1, 1)).total_seconds()
+        unfinished = (stop >= 0) & (stop < len(questions))
+
+        answered = np.count_nonzero(self._answered[:count], axis=0)
+        abandoned = np.bincount(stop[unfinished & idle], minlength=len(questions))[:len(questions)]
+        in_progress = np.bincount(stop[unfinished & ~idle], minlength=len(questions))[:len(questions)]
+
+        for is_idle, total in get_empty_run_counts(idle_cutoff, self._survey.survey_id):
+            if is_idle:
+                abandoned[0] += total
+            else:
+                in_progress[0] += total
+
+        medians = np.full(len(questions), np.nan)
+        timed = ~np.all(np.isnan(seconds), axis=0)
+        if timed.any():
+            medians[timed] = np.nanmedian(seconds[:, timed], axis=0)
+
+        reached = answered + abandoned + in_progress
+        return [
+            {
+                "question_id": q["question_id"],
+                "reached": int(reached[idx]),
+                "answered": int(answered[idx]),
+                "abandoned": int(abandoned[idx]),
+                "in_progress": int(in_progress[idx]),
+                "median_seconds": None if np.isnan(medians[idx]) else float(medians[idx])
+            }
+            for idx, q in enumerate(questions)
+        ]
+
+
+# Trackers per survey id, created when a survey's funnel is first requested
+funnel_trackers: Dict[str, FunnelTracker] = {}
+_trackers_lock = threading.Lock()
+
+# Reports per survey id, cached for the data version and minute they were built in
+_funnel_cache: Dict[str, Tuple[Tuple[int, datetime], List[Dict[str, Any]]]] = {}
+
+register_cache("funnel", lambda: (funnel_trackers, _funnel_cache))
+
+
+def build_funnel_report(survey: Optional[Survey] = None) -> List[Dict[str, Any]]:
+    """Build drop-off statistics for every question of the survey"""
+    survey = survey or surveys.default
+
+    cache_key = (get_data_version(survey.survey_id), datetime.now().replace(second=0, microsecond=0))
+    cached = _funnel_cache.get(survey.survey_id)
+    if cached and cached[0] == cache_key:
+        debug(f"Використано кешовану воронку опитування '{survey.survey_id}'")
+        return cached[1]
+
+    with _trackers_lock:
+        if survey.survey_id not in funnel_trackers:
+            funnel_trackers[survey.survey_id] = FunnelTracker(survey)
+    report = funnel_trackers[survey.survey_id].report()
+    _funnel_cache[survey.survey_id] = (cache_key, report)
+    info(f"Побудовано воронку опитування '{survey.survey_id}' для {len(report)} питань")
+    return report
+
+
+def format_funnel_report(report: List[Dict[str, Any]]) -> str:
+    """Format the drop-off funnel as a text message"""
+    lines = ["📉 Воронка проходження опитування:\n"]
+    for row in report:
+        median = f"{row['median_seconds']:.0f} с" if row["median_seconds"] is not None else "—"
+        lines.append(
+            f"Питання {row['question_id']}: дійшли {row['reached']}, відповіли {row['answered']}, "
+            f"покинули {row['abandoned']}, проходять {row['in_progress']}, медіана {median}"
+        )
+    return "\n".join(lines)
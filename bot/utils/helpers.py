@@ -1,21 +1,13 @@
 import textwrap
-import json
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from bot.configs import QUESTIONS_FILE, ADMIN_IDS
+from bot.configs import ADMIN_IDS, REMINDER_DELAYS_HOURS
 from bot.models.callbacks import AnswerCallback
-from bot.db.database import save_all_user_answers
-from bot.logger import info, error, debug
-
-# Load questions from JSON file
-with open(QUESTIONS_FILE, "r", encoding="utf-8") as json_file:
-    questions = json.load(json_file)
-    debug(f"Завантажено {len(questions)} питань з файлу {QUESTIONS_FILE}")
-
-# Create map for quick access to question parameters
-questions_map = {q["question_id"]: q for q in questions}
+from bot.db.checkpoints import checkpointer
+from bot.utils.surveys import Survey
+from bot.logger import info, debug
 
 
 def is_admin(user_id):
@@ -35,7 +27,26 @@ def wrap_text(text, max_width=20):
     return wrapped_text
 
 
-async def generate_keyboard(question_data: Dict[str, Any], user_answers: Dict[str, Any]) -> InlineKeyboardMarkup:
+def split_message(text: str, limit: int = 4096) -> List[str]:
+    """Split a long text into Telegram-sized messages on line boundaries"""
+    pages = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            pages.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + len(line) + 1 > limit:
+            pages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pages.append(current)
+    return pages
+
+
+async def generate_keyboard(survey: Survey, question_data: Dict[str, Any],
+                            user_answers: Dict[str, Any]) -> InlineKeyboardMarkup:
     """Generate an inline keyboard based on question data and current user answers."""
     keyboard = []
     q_text = question_data["question"]
@@ -45,6 +56,11 @@ async def generate_keyboard(question_data: Dict[str, Any], user_answers: Dict[st
     selected = current_answer.get("selected", []) if question_data["multiple_choice"] else current_answer.get(
         "selected")
 
+    # Keyboards without ticked options are the same for everyone, so they are built once per survey
+    shared = not (question_data["multiple_choice"] and selected)
+    if shared and question_data["question_id"] in survey.keyboards:
+        return survey.keyboards[question_data["question_id"]]
+
     # Create buttons for each answer
     for idx, answer in enumerate(question_data["answers"]):
         if not answer.strip():
@@ -91,20 +107,33 @@ async def generate_keyboard(question_data: Dict[str, Any], user_answers: Dict[st
         )])
 
     debug(f"Згенеровано клавіатуру для питання {question_data.get('question_id', 0)} з {len(keyboard)} кнопками")
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
-
-
-async def save_answers(user_id: int, user_answers: Dict[str, Any]) -> None:
-    """Save user answers to SQLAlchemy database."""
-    try:
-        info(f"Спроба збереження відповідей користувача {user_id}")
-
-        # Use the SQLAlchemy function to save all answers
-        result = save_all_user_answers(user_id, user_answers, questions_map)
-
-        if result:
-            info(f"Відповіді користувача {user_id} успішно збережено в базі даних")
-        else:
-            error(f"Не вдалося зберегти відповіді користувача {user_id} в базі даних")
-    except Exception as e:
-        error(f"Виникла помилка при збереженні відповідей користувача {user_id}: {e}")
\ No newline at end of file
+    markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+    if shared:
+        survey.keyboards[question_data["question_id"]] = markup
+    return markup
+
+
+def checkpoint_answer(user_id: int, survey_id: str, run: int, question_data: Dict[str, Any],
+                      user_answers: Dict[str, Any]) -> None:
+    """Queue the user's current answer to a question for saving in the database."""
+    answer = user_answers.get(question_data["question"], {})
+    checkpointer.checkpoint(
+        user_id,
+        survey_id,
+        run,
+        question_data["question_id"],
+        answer.get("selected"),
+        answer.get("custom")
+    )
+
+
+def track_progress(user_id: int, survey_id: str, run: int, question_index: int) -> None:
+    """Remember the question the user has reached, which restarts the reminder countdown."""
+    if REMINDER_DELAYS_HOURS:
+        checkpointer.progress(user_id, survey_id, run, question_index)
+
+
+def complete_survey(user_id: int, survey_id: str, run: int) -> None:
+    """Mark the user's survey run as completed once its answers are saved."""
+    checkpointer.complete(user_id, survey_id, run)
+    info(f"Опитування '{survey_id}' користувача {user_id} (спроба {run}) позначено як завершене")
@@ -0,0 +1,106 @@
+import io
+from typing import Dict, List
+
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from bot.utils.helpers import wrap_text
+
+
+def _save(figure: Figure) -> io.BytesIO:
+    """Save a figure to a PNG memory buffer with higher DPI for better quality"""
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=120, bbox_inches='tight')
+    buffer.seek(0)
+    return buffer
+
+
+def render_pie_chart(title: str, labels: List[str], values: List[int]) -> io.BytesIO:
+    """Draw a pie chart with matplotlib and return it as PNG"""
+    # A standalone Figure (no pyplot state) can be rendered safely from worker threads
+    figure = Figure(figsize=(8, 6))
+    ax = figure.add_subplot(111)
+
+    # Use color blind friendly color palette
+    colors = colormaps["tab10"].colors[:len(values)]
+
+    # Wrap labels for better display
+    wrapped_labels = [wrap_text(label, max_width=15) for label in labels]
+
+    # Create pie chart with wrapped labels
+    wedges, texts, autotexts = ax.pie(
+        values,
+        labels=wrapped_labels,
+        autopct='%1.1f%%',
+        colors=colors,
+        startangle=90,
+        wedgeprops={'edgecolor': 'w', 'linewidth': 1},
+        textprops={'fontsize': 9}
+    )
+
+    # Improve text properties for better readability
+    for text in texts:
+        text.set_fontsize(8)
+    for autotext in autotexts:
+        autotext.set_fontsize(8)
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+
+    ax.set_title(title, fontsize=10, pad=15)
+
+    # Make sure the pie chart is a circle
+    ax.axis('equal')
+
+    return _save(figure)
+
+
+def render_bar_chart(title: str, labels: List[str], series: Dict[str, List[int]]) -> io.BytesIO:
+    """Draw a (grouped) bar chart with matplotlib and return it as PNG"""
+    figure = Figure(figsize=(8, 6))
+    ax = figure.add_subplot(111)
+
+    colors = colormaps["tab10"].colors
+    positions = range(len(labels))
+    bar_width = 0.8 / max(len(series), 1)
+
+    for series_idx, (name, values) in enumerate(series.items()):
+        offsets = [position - 0.4 + bar_width * (series_idx + 0.5) for position in positions]
+        bars = ax.bar(offsets, values, width=bar_width, label=name, color=colors[series_idx % len(colors)])
+        if len(labels) <= 12:
+            ax.bar_label(bars, fontsize=8)
+
+    # Show only as many category labels as fit under the axis
+    label_step = max(1, -(-len(labels) // 24))
+    ax.set_xticks(list(positions)[::label_step])
+    ax.set_xticklabels([wrap_text(label, max_width=12) for label in labels][::label_step], fontsize=8, rotation=45)
+    ax.set_title(title, fontsize=10)
+    ax.legend(fontsize=8)
+    figure.tight_layout()
+
+    return _save(figure)
+
+
+def render_heatmap(title: str, row_labels: List[str], column_labels: List[str],
+                   values: List[List[int]]) -> io.BytesIO:
+    """Draw a heatmap of counts with matplotlib and return it as PNG"""
+    figure = Figure(figsize=(8, 6))
+    ax = figure.add_subplot(111)
+
+    image = ax.imshow(values, cmap="Blues", aspect="auto")
+    figure.colorbar(image, ax=ax)
+
+    # Annotate every cell, switching to white text on dark cells
+    maximum = max((max(row) for row in values), default=0) or 1
+    for row_idx, row in enumerate(values):
+        for column_idx, value in enumerate(row):
+            ax.text(column_idx, row_idx, str(value), ha="center", va="center", fontsize=8,
+                    color="white" if value > maximum * 0.6 else "black")
+
+    ax.set_xticks(range(len(column_labels)))
+    ax.set_xticklabels([wrap_text(label, max_width=12) for label in column_labels], fontsize=7, rotation=45)
+    ax.set_yticks(range(len(row_labels)))
+    ax.set_yticklabels([wrap_text(label, max_width=20) for label in row_labels], fontsize=7)
+    ax.set_title(title, fontsize=10)
+    figure.tight_layout()
+
+    return _save(figure)
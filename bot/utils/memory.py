@@ -0,0 +1,157 @@
+import sys
+import tracemalloc
+from types import FunctionType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bot.logger import info, debug
+
+# Objects that are shared by the whole process and are not counted as part of a session or cache
+_SKIPPED_TYPES = (type, ModuleType, FunctionType)
+# Objects without references to follow
+_ATOMIC_TYPES = {str, int, float, bool, bytes, type(None)}
+
+# Caches by name, each with a callable returning the objects it holds
+_caches: Dict[str, Callable[[], Any]] = {}
+
+# Snapshot of the previous on-demand report, used to show what grew since then
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate the memory held by an object and everything it references.
+
+    Containers and instance attributes are followed, classes, modules and functions are not.
+    Objects referenced several times are counted once.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if type(current) in _ATOMIC_TYPES:
+            if id(current) not in seen:
+                seen.add(id(current))
+                total += sys.getsizeof(current)
+            continue
+        if id(current) in seen or isinstance(current, _SKIPPED_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(vars(current))
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+def register_cache(name: str, getter: Callable[[], Any]) -> None:
+    """Register a cache to be included in memory reports"""
+    _caches[name] = getter
+
+
+def get_cache_sizes(attempts: int = 3) -> List[Tuple[str, int]]:
+    """Approximate size of every registered cache, largest first"""
+    sizes = []
+    for name, getter in _caches.items():
+        # Caches are updated from worker threads, measuring is simply repeated if one changes meanwhile
+        for attempt in range(attempts):
+            try:
+                sizes.append((name, deep_sizeof(getter())))
+                break
+            except RuntimeError:
+                if attempt == attempts - 1:
+                    debug(f"Не вдалося виміряти кеш {name}, він змінювався під час вимірювання")
+    return sorted(sizes, key=lambda item: item[1], reverse=True)
+
+
+def start_tracing(frames: int = 1) -> None:
+    """Start tracing allocations, it slows the bot down until stopped"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        info("Увімкнено відстеження виділення пам'яті (tracemalloc)")
+
+
+def stop_tracing() -> None:
+    """Stop tracing allocations and forget the previous snapshot"""
+    global _previous_snapshot
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        info("Вимкнено відстеження виділення пам'яті (tracemalloc)")
+    _previous_snapshot = None
+
+
+def format_allocations(limit: int = 10) -> List[str]:
+    """Take a tracemalloc snapshot and describe the largest allocation sites and their growth"""
+    global _previous_snapshot
+
+    if not tracemalloc.is_tracing():
+        return ["tracemalloc вимкнено, увімкніть його командою /memory trace"]
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"Відстежено: {format_bytes(current)}, пік {format_bytes(peak)}"]
+
+    if _previous_snapshot is None:
+        for stat in snapshot.statistics("lineno")[:limit]:
+            lines.append(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} — {format_bytes(stat.size)}")
+    else:
+        lines.append("Зміни з попереднього знімка:")
+        for stat in snapshot.compare_to(_previous_snapshot, "lineno")[:limit]:
+            lines.append(
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} — {format_bytes(stat.size)} "
+                f"({'+' if stat.size_diff >= 0 else '-'}{format_bytes(abs(stat.size_diff))})"
+            )
+
+    _previous_snapshot = snapshot
+    debug("Знято знімок пам'яті tracemalloc")
+    return lines
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count for people"""
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+def build_memory_report(sessions: List[Tuple[Any, int, float]], budget_bytes: int, evicted: int,
+                        top: int = 5) -> str:
+    """
+    Describe FSM sessions, caches and (when tracing) allocation sites as a text message.
+
+    :param sessions: (storage key, bytes, idle seconds) of every session
+    :param budget_bytes: Memory budget of the sessions
+    :param evicted: Number of sessions evicted so far
+    """
+    total = sum(size for _, size, _ in sessions)
+
+    lines = ["🧠 Пам'ять бота:\n", f"Активних сесій: {len(sessions)}, приблизно {format_bytes(total)}"]
+    if sessions:
+        lines.append(f"Середня сесія: {format_bytes(total / len(sessions))}")
+        lines.append(f"Бюджет: {format_bytes(budget_bytes)}, витіснено сесій: {evicted}")
+        lines.append("\nНайбільші сесії:")
+        for key, size, idle in sorted(sessions, key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"Користувач {key.user_id}: {format_bytes(size)}, неактивна {idle / 60:.0f} хв")
+
+    lines.append("\nКеші:")
+    for name, size in get_cache_sizes():
+        lines.append(f"{name}: {format_bytes(size)}")
+
+    lines.append("")
+    lines.extend(format_allocations())
+    return "\n".join(lines)
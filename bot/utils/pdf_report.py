@@ -0,0 +1,175 @@
+import io
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from bot.db.analytics import iter_custom_answers
+from bot.db.database import get_data_version, get_survey_stats
+from bot.utils.surveys import Survey, surveys
+from bot.utils.pillow_charts import find_font_path
+from bot.utils.visualization import generate_pie_chart
+from bot.logger import info, warning, debug
+
+REPORTS_FOLDER = os.path.join(tempfile.gettempdir(), "survey_reports")
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 18 * mm
+LINE_HEIGHT = 14
+
+# Replaced reports may still be uploading to another admin, they are deleted this long after (seconds)
+SUPERSEDED_GRACE_PERIOD = 15 * 60
+
+# Path of the last built report of every survey and the data version it was built from
+_report_cache: Dict[str, Tuple[int, str]] = {}
+# Only one report is built at a time, concurrent requests wait for it and reuse the result
+_build_lock = threading.Lock()
+# Replaced report files with the time they were replaced at
+_superseded: List[Tuple[float, str]] = []
+
+
+def _register_fonts() -> Tuple[str, str]:
+    """Register fonts with Cyrillic glyphs and return (regular, bold) font names"""
+    regular_path, bold_path = find_font_path(), find_font_path(bold=True)
+    if not regular_path:
+        warning("Не знайдено шрифт з кирилицею для PDF, текст може відображатися некоректно")
+        return "Helvetica", "Helvetica-Bold"
+
+    if "SurveyFont" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont("SurveyFont", regular_path))
+        pdfmetrics.registerFont(TTFont("SurveyFont-Bold", bold_path or regular_path))
+    return "SurveyFont", "SurveyFont-Bold"
+
+
+class ReportWriter:
+    """Writes text and images to a PDF canvas, starting new pages as the current one fills up"""
+
+    def __init__(self, path: str):
+        self.font, self.bold_font = _register_fonts()
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle("Результати опитування")
+        self.y = PAGE_HEIGHT - MARGIN
+        self.pages = 1
+
+    def new_page(self) -> None:
+        """Finish the current page and start a new one"""
+        self.canvas.showPage()
+        self.pages += 1
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure_space(self, height: float) -> None:
+        """Start a new page if the given height doesn't fit on the current one"""
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def text(self, text: str, size: int = 10, bold: bool = False) -> None:
+        """Write a paragraph wrapped to the page width"""
+        font = self.bold_font if bold else self.font
+        for line in simpleSplit(text, font, size, PAGE_WIDTH - 2 * MARGIN) or [""]:
+            self.ensure_space(LINE_HEIGHT)
+            self.canvas.setFont(font, size)
+            self.canvas.drawString(MARGIN, self.y - size, line)
+            self.y -= LINE_HEIGHT * size / 10
+
+    def image(self, data: bytes, width: float) -> None:
+        """Draw a PNG image scaled to the given width"""
+        reader = ImageReader(io.BytesIO(data))
+        image_width, image_height = reader.getSize()
+        height = width * image_height / image_width
+        self.ensure_space(height)
+        self.canvas.drawImage(reader, MARGIN, self.y - height, width=width, height=height)
+        self.y -= height + 6
+
+    def save(self) -> None:
+        """Finish the document"""
+        self.canvas.save()
+
+
+def _write_report(path: str, survey: Survey) -> int:
+    """Write the full report to the given path and return its page count"""
+    writer = ReportWriter(path)
+
+    # Completion statistics
+    stats = get_survey_stats(survey.survey_id)
+    title = f"Результати опитування «{survey.title}»" if len(surveys) > 1 else "Результати опитування"
+    writer.text(title, size=16, bold=True)
+    writer.text(f"Всього користувачів: {stats['total_users']}")
+    writer.text(f"Завершених опитувань: {stats['completed_surveys']}")
+    writer.text(f"Відсоток завершення: {stats['completion_rate']:.1f}%")
+    writer.text(f"Всього відповідей: {stats['total_answers']}")
+
+    # One chart with its tally per question, rendered and dropped one at a time
+    for question in survey.questions:
+        if not question["answers"]:
+            continue
+        writer.new_page()
+        question_id = question["question_id"]
+        writer.text(f"Питання {question_id}: {question['question']}", size=12, bold=True)
+
+        chart_buffer, color_data = generate_pie_chart(question_id, survey=survey)
+        if not chart_buffer:
+            writer.text("Немає відповідей на це питання.")
+            continue
+        writer.image(chart_buffer.getvalue(), width=PAGE_WIDTH - 2 * MARGIN)
+        for line in color_data.split("\n"):
+            if line.strip():
+                writer.text(line)
+
+    # Free-text answers are streamed from the database in batches
+    current_question = None
+    for question_id, custom_answer in iter_custom_answers(survey_id=survey.survey_id):
+        if question_id != current_question:
+            if current_question is None:
+                writer.new_page()
+                writer.text("Текстові відповіді", size=14, bold=True)
+            current_question = question_id
+            question_text = survey.questions_map.get(question_id, {}).get("question", "")
+            writer.text(f"Питання {question_id}: {question_text}", size=11, bold=True)
+        writer.text(f"• {custom_answer}", size=9)
+
+    writer.save()
+    return writer.pages
+
+
+def _remove_superseded() -> None:
+    """Delete replaced reports once nobody can be sending them anymore"""
+    expired_before = time.monotonic() - SUPERSEDED_GRACE_PERIOD
+    while _superseded and _superseded[0][0] < expired_before:
+        _, path = _superseded.pop(0)
+        try:
+            os.remove(path)
+            debug(f"Видалено застарілий PDF-звіт {path}")
+        except FileNotFoundError:
+            pass
+
+
+def build_pdf_report(survey: Optional[Survey] = None) -> str:
+    """Build (or reuse) the PDF report for the current data and return its path"""
+    survey = survey or surveys.default
+
+    with _build_lock:
+        version = get_data_version(survey.survey_id)
+        cached = _report_cache.get(survey.survey_id)
+        if cached and cached[0] == version and os.path.exists(cached[1]):
+            debug(f"Використано кешований PDF-звіт опитування '{survey.survey_id}' для версії даних {version}")
+            return cached[1]
+
+        os.makedirs(REPORTS_FOLDER, exist_ok=True)
+        path = os.path.join(REPORTS_FOLDER, f"survey_report_{survey.survey_id}_{os.getpid()}_{version}.pdf")
+        pages = _write_report(path, survey)
+
+        if cached and cached[1] != path:
+            _superseded.append((time.monotonic(), cached[1]))
+        _remove_superseded()
+        _report_cache[survey.survey_id] = (version, path)
+
+        info(f"Згенеровано PDF-звіт на {pages} сторінок: {path}")
+        return path
@@ -0,0 +1,231 @@
+import io
+import math
+import os
+import importlib.util
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bot.configs import CHART_FONT_PATH, CHART_FONT_BOLD_PATH
+from bot.utils.helpers import wrap_text
+from bot.logger import warning, debug
+
+# Same palette as matplotlib's tab10, so both backends produce matching charts
+CHART_COLORS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
+]
+
+# Charts are drawn at SCALE times the target size and downsampled for anti-aliasing
+SCALE = 2
+
+# Layout templates in target pixels (8x6 inches at 120 DPI, as the matplotlib charts)
+PIE_LAYOUT = {"size": (960, 720), "title_top": 20, "center": (330, 400), "radius": 250,
+              "legend_left": 620, "legend_top": 170, "legend_row": 46}
+BAR_LAYOUT = {"size": (960, 720), "title_top": 20, "plot_box": (90, 150, 930, 580), "legend_top": 110}
+HEATMAP_LAYOUT = {"size": (960, 720), "title_top": 20, "plot_box": (230, 80, 940, 600)}
+
+# Heatmap cells are shaded from white to the first palette color
+HEATMAP_COLOR = (31, 119, 180)
+
+# Fonts with Cyrillic glyphs, tried in order when CHART_FONT_PATH is not set
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+
+@lru_cache(maxsize=None)
+def find_font_path(bold: bool = False) -> Optional[str]:
+    """Find a TrueType font that can render Ukrainian text"""
+    configured = CHART_FONT_BOLD_PATH if bold else CHART_FONT_PATH
+    candidates = [configured] if configured else []
+    candidates += [path.replace("DejaVuSans.ttf", "DejaVuSans-Bold.ttf") if bold else path
+                   for path in FONT_CANDIDATES]
+
+    # matplotlib ships DejaVu fonts, use the file without importing matplotlib itself
+    spec = importlib.util.find_spec("matplotlib")
+    if spec and spec.submodule_search_locations:
+        font_name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+        candidates.append(os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf", font_name))
+
+    for path in candidates:
+        if path and os.path.exists(path):
+            debug(f"Використовується шрифт {path} для діаграм")
+            return path
+
+    warning("Не знайдено шрифт з кирилицею для діаграм, використовується стандартний шрифт Pillow")
+    return None
+
+
+@lru_cache(maxsize=32)
+def get_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+    """Load (once) a font of the given size in target pixels"""
+    path = find_font_path(bold)
+    if path is None:
+        return ImageFont.load_default(size * SCALE)
+    return ImageFont.truetype(path, size * SCALE)
+
+
+def _scaled(*values: float) -> List[int]:
+    """Convert target pixel coordinates to drawing coordinates"""
+    return [int(value * SCALE) for value in values]
+
+
+def _new_canvas(size: Sequence[int]):
+    """Create a white drawing canvas for the given target size"""
+    image = Image.new("RGB", tuple(_scaled(*size)), "white")
+    return image, ImageDraw.Draw(image)
+
+
+def _draw_title(draw: ImageDraw.ImageDraw, title: str, width: int, top: int) -> int:
+    """Draw a centered multiline title and return its bottom in target pixels"""
+    font = get_font(15)
+    x = width * SCALE / 2
+    draw.multiline_text((x, top * SCALE), title, font=font, fill="black", anchor="ma", align="center", spacing=6)
+    box = draw.multiline_textbbox((x, top * SCALE), title, font=font, anchor="ma", align="center", spacing=6)
+    return box[3] // SCALE
+
+
+def _finish(image: Image.Image) -> io.BytesIO:
+    """Downsample the canvas and encode it to a PNG buffer"""
+    buffer = io.BytesIO()
+    # Box downsampling is enough for flat-colored shapes and is much cheaper than LANCZOS,
+    # a light compression level keeps the PNG encoder from dominating the render time
+    image.reduce(SCALE).save(buffer, format="PNG", compress_level=3)
+    buffer.seek(0)
+    return buffer
+
+
+def render_pie_chart(title: str, labels: List[str], values: List[int]) -> io.BytesIO:
+    """Draw a pie chart with a legend and return it as PNG"""
+    layout = PIE_LAYOUT
+    image, draw = _new_canvas(layout["size"])
+    _draw_title(draw, title, layout["size"][0], layout["title_top"])
+
+    cx, cy, radius = layout["center"][0], layout["center"][1], layout["radius"]
+    box = _scaled(cx - radius, cy - radius, cx + radius, cy + radius)
+    total = sum(values) or 1
+    percent_font = get_font(13, bold=True)
+
+    # Wedges go counterclockwise from 12 o'clock like matplotlib's startangle=90
+    start_angle = 90.0
+    for idx, value in enumerate(values):
+        sweep = 360.0 * value / total
+        color = CHART_COLORS[idx % len(CHART_COLORS)]
+        if sweep >= 360.0:
+            draw.ellipse(box, fill=color, outline="white", width=2 * SCALE)
+        elif sweep > 0:
+            draw.pieslice(box, -(start_angle + sweep), -start_angle, fill=color, outline="white", width=2 * SCALE)
+
+        # Percentage label in the middle of the wedge
+        middle = math.radians(start_angle + sweep / 2)
+        text_x = cx + radius * 0.62 * math.cos(middle)
+        text_y = cy - radius * 0.62 * math.sin(middle)
+        if sweep >= 12:
+            draw.text(tuple(_scaled(text_x, text_y)), f"{value / total * 100:.1f}%",
+                      font=percent_font, fill="white", anchor="mm")
+        start_angle += sweep
+
+    # Legend with color swatches instead of labels around the pie
+    label_font = get_font(12)
+    row_top = layout["legend_top"]
+    for idx, label in enumerate(labels):
+        color = CHART_COLORS[idx % len(CHART_COLORS)]
+        left = layout["legend_left"]
+        draw.rectangle(_scaled(left, row_top + 2, left + 18, row_top + 20), fill=color)
+        draw.multiline_text(tuple(_scaled(left + 28, row_top)), wrap_text(label, max_width=28),
+                            font=label_font, fill="black", spacing=4)
+        row_top += layout["legend_row"] + 16 * wrap_text(label, max_width=28).count("\n")
+
+    return _finish(image)
+
+
+def render_bar_chart(title: str, labels: List[str], series: Dict[str, List[int]]) -> io.BytesIO:
+    """Draw a (grouped) bar chart with one group per label and return it as PNG"""
+    layout = BAR_LAYOUT
+    image, draw = _new_canvas(layout["size"])
+    _draw_title(draw, title, layout["size"][0], layout["title_top"])
+
+    left, top, right, bottom = layout["plot_box"]
+    maximum = max((max(values) for values in series.values() if values), default=0) or 1
+    small_font = get_font(11)
+
+    # Axes and horizontal grid lines with tick values
+    for step in range(5):
+        value = maximum * step / 4
+        y = bottom - (bottom - top) * step / 4
+        draw.line(_scaled(left, y, right, y), fill="#dddddd", width=SCALE)
+        draw.text(tuple(_scaled(left - 8, y)), f"{value:.0f}", font=small_font, fill="black", anchor="rm")
+    draw.line(_scaled(left, top, left, bottom), fill="black", width=SCALE)
+    draw.line(_scaled(left, bottom, right, bottom), fill="black", width=SCALE)
+
+    group_width = (right - left) / max(len(labels), 1)
+    bar_width = group_width * 0.8 / max(len(series), 1)
+    # Show only as many category labels as fit under the axis
+    label_step = max(1, math.ceil(len(labels) / 24))
+
+    for series_idx, (name, values) in enumerate(series.items()):
+        color = CHART_COLORS[series_idx % len(CHART_COLORS)]
+        for idx, value in enumerate(values):
+            x0 = left + group_width * idx + group_width * 0.1 + bar_width * series_idx
+            y0 = bottom - (bottom - top) * value / maximum
+            if value > 0:
+                draw.rectangle(_scaled(x0, y0, x0 + bar_width, bottom), fill=color)
+            if len(labels) <= 12 and value > 0:
+                draw.text(tuple(_scaled(x0 + bar_width / 2, y0 - 3)), str(value),
+                          font=small_font, fill="black", anchor="md")
+
+        # Series legend above the plot
+        legend_x = left + 180 * series_idx
+        draw.rectangle(_scaled(legend_x, layout["legend_top"], legend_x + 16, layout["legend_top"] + 16), fill=color)
+        draw.text(tuple(_scaled(legend_x + 24, layout["legend_top"])), name, font=small_font, fill="black")
+
+    for idx, label in enumerate(labels):
+        if idx % label_step:
+            continue
+        x = left + group_width * (idx + 0.5)
+        draw.multiline_text(tuple(_scaled(x, bottom + 8)), wrap_text(label, max_width=12),
+                            font=small_font, fill="black", anchor="ma", align="center")
+
+    return _finish(image)
+
+
+def render_heatmap(title: str, row_labels: List[str], column_labels: List[str],
+                   values: List[List[int]]) -> io.BytesIO:
+    """Draw a heatmap of counts and return it as PNG"""
+    layout = HEATMAP_LAYOUT
+    image, draw = _new_canvas(layout["size"])
+    _draw_title(draw, title, layout["size"][0], layout["title_top"])
+
+    left, top, right, bottom = layout["plot_box"]
+    cell_width = (right - left) / max(len(column_labels), 1)
+    cell_height = (bottom - top) / max(len(row_labels), 1)
+    maximum = max((max(row) for row in values), default=0) or 1
+    value_font = get_font(12, bold=True)
+    label_font = get_font(10)
+
+    for row_idx, row in enumerate(values):
+        for column_idx, value in enumerate(row):
+            share = value / maximum
+            fill = tuple(int(255 - (255 - channel) * share) for channel in HEATMAP_COLOR)
+            x0, y0 = left + column_idx * cell_width, top + row_idx * cell_height
+            draw.rectangle(_scaled(x0, y0, x0 + cell_width, y0 + cell_height), fill=fill, outline="white",
+                           width=SCALE)
+            draw.text(tuple(_scaled(x0 + cell_width / 2, y0 + cell_height / 2)), str(value), font=value_font,
+                      fill="white" if share > 0.6 else "black", anchor="mm")
+
+    for row_idx, label in enumerate(row_labels):
+        y = top + (row_idx + 0.5) * cell_height
+        draw.multiline_text(tuple(_scaled(left - 8, y)), wrap_text(label, max_width=26), font=label_font,
+                            fill="black", anchor="rm", align="right")
+
+    for column_idx, label in enumerate(column_labels):
+        x = left + (column_idx + 0.5) * cell_width
+        draw.multiline_text(tuple(_scaled(x, bottom + 8)), wrap_text(label, max_width=14), font=label_font,
+                            fill="black", anchor="ma", align="center")
+
+    return _finish(image)
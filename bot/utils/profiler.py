@@ -0,0 +1,197 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.configs import PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILES_FOLDER
+from bot.logger import info, debug
+
+# Deepest part of a stack that is kept per sample
+MAX_STACK_DEPTH = 64
+
+# Worker threads started by asyncio.to_thread, where charts, reports and heavy queries run
+WORKER_THREAD_PREFIX = "asyncio_"
+# Innermost frame of a worker waiting for the next job
+IDLE_WORKER_FRAME = "concurrent.futures.thread:_worker"
+
+
+def _frame_name(frame) -> str:
+    """Name a stack frame as module:function for the collapsed stacks"""
+    # co_qualname (with the class name) is only available since Python 3.11
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class HandlerStats:
+    """Wall time of the sampled updates of one handler"""
+
+    def __init__(self):
+        self.updates = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.samples = 0
+
+    def add(self, seconds: float) -> None:
+        self.updates += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class HandlerProfiler(BaseMiddleware):
+    """
+    Opt-in stack sampling profiler for the live bot.
+
+    Registered as an inner middleware, it picks a fraction of updates. While a picked update
+    is handled, a background thread samples the event loop stack and the to_thread workers
+    every few milliseconds. Samples are aggregated per handler and written as collapsed
+    stacks ("handler;frame;frame count" lines) that flamegraph.pl or speedscope can read.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, interval_ms: int = PROFILE_INTERVAL_MS):
+        self.sample_rate = 0.0
+        self.interval = interval_ms / 1000
+        self._stacks: Counter = Counter()
+        self._stats: Dict[str, HandlerStats] = {}
+        # Handler names by the code object of their function and how many of their sampled updates are in flight
+        self._names: Dict[Any, str] = {}
+        self._in_flight: Counter = Counter()
+        self._main_thread_id = threading.main_thread().ident
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if sample_rate > 0:
+            self.enable(sample_rate)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def enable(self, sample_rate: float) -> None:
+        """Start sampling the given fraction (0..1] of updates"""
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self._main_thread_id = threading.get_ident()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="handler-profiler", daemon=True)
+            self._thread.start()
+        info(f"Увімкнено профілювання {self.sample_rate:.0%} оновлень з інтервалом {self.interval * 1000:.0f} мс")
+
+    def disable(self) -> None:
+        """Stop sampling, collected data is kept until it is dumped"""
+        self.sample_rate = 0.0
+        self._stop.set()
+        info("Вимкнено профілювання обробників")
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return await handler(event, data)
+
+        # Answer buttons go through one dispatch handler, profile the handler it picked
+        callback = data.get("answer_handler") or data["handler"].callback
+        code = getattr(callback, "__code__", None)
+        name = getattr(callback, "__qualname__", repr(callback)).replace("<locals>.", "")
+
+        with self._lock:
+            self._names[code] = name
+            self._in_flight[code] += 1
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight[code] -= 1
+                if self._in_flight[code] <= 0:
+                    del self._in_flight[code]
+                self._stats.setdefault(name, HandlerStats()).add(elapsed)
+
+    def _sample_loop(self) -> None:
+        """Sample stacks while sampled updates are being handled"""
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                active = {code: self._names[code] for code in self._in_flight}
+            if active:
+                self._sample(active)
+
+    def _sample(self, active: Dict[Any, str]) -> None:
+        """Record the current stacks of the event loop and worker threads"""
+        workers = {thread.ident for thread in threading.enumerate() if thread.name.startswith(WORKER_THREAD_PREFIX)}
+        # With a single sampled update in flight, worker thread time can be attributed to it
+        single = next(iter(active.values())) if len(active) == 1 else "<concurrent>"
+
+        samples = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != self._main_thread_id and thread_id not in workers:
+                continue
+
+            stack = []
+            owner = None
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                if frame.f_code in active:
+                    owner = active[frame.f_code]
+                    break
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+
+            if thread_id == self._main_thread_id:
+                # Event loop stacks are kept from the handler down, others belong to unsampled updates
+                if owner is None:
+                    continue
+                stack.append(_frame_name(frame))
+            else:
+                # Idle workers wait for the next job
+                if not stack or stack[0] == IDLE_WORKER_FRAME:
+                    continue
+                stack.append("[to_thread]")
+                owner = owner or single
+            samples.append(";".join([owner] + stack[::-1]))
+
+        with self._lock:
+            for sample in samples:
+                self._stacks[sample] += 1
+                self._stats.setdefault(sample.split(";", 1)[0], HandlerStats()).samples += 1
+
+    def summary(self) -> str:
+        """Per-handler wall time and sample counts as a text message"""
+        with self._lock:
+            stats = sorted(self._stats.items(), key=lambda item: item[1].total_seconds, reverse=True)
+
+        state = f"увімкнено ({self.sample_rate:.0%} оновлень)" if self.enabled else "вимкнено"
+        lines = [f"⏱ Профілювання: {state}\n"]
+        for name, handler_stats in stats:
+            mean = handler_stats.total_seconds / handler_stats.updates * 1000 if handler_stats.updates else 0
+            lines.append(
+                f"{name}: оновлень {handler_stats.updates}, середнє {mean:.1f} мс, "
+                f"максимум {handler_stats.max_seconds * 1000:.1f} мс, семплів {handler_stats.samples}"
+            )
+        if not stats:
+            lines.append("Даних ще немає.")
+        return "\n".join(lines)
+
+    def dump(self, reset: bool = True) -> Optional[str]:
+        """Write the collected stacks in collapsed format and return the file path"""
+        with self._lock:
+            stacks: List[str] = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+            if reset:
+                self._stacks.clear()
+                self._stats.clear()
+        if not stacks:
+            return None
+
+        os.makedirs(PROFILES_FOLDER, exist_ok=True)
+        path = os.path.join(PROFILES_FOLDER, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded")
+        with open(path, "w", encoding="utf-8") as profile_file:
+            profile_file.write("\n".join(stacks) + "\n")
+        debug(f"Записано {len(stacks)} унікальних стеків профілю у {path}")
+        return path
+
+
+profiler = HandlerProfiler()
@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import time
+import zlib
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from bot.configs import RECORDINGS_FOLDER
+from bot.logger import info, error, debug
+
+
+class UpdateRecorder(BaseMiddleware):
+    """
+    Records incoming updates with their arrival time for later replay.
+
+    Registered as an outer middleware on dp.update, so every update is written before any
+    filter or handler sees it. Each line of the day's file is {"t": unix time, "update": {...}}.
+    Lines are compressed as they come and synced to disk every `flush_every` updates,
+    so a crash loses at most that many updates.
+    """
+
+    def __init__(self, folder: str = RECORDINGS_FOLDER, flush_every: int = 100):
+        self.folder = folder
+        self.flush_every = flush_every
+        self.recorded = 0
+        self._file: Optional[gzip.GzipFile] = None
+        self._day: Optional[date] = None
+        self._pending = 0
+
+    def _open(self, day: date) -> None:
+        """Start (or continue) the file of the given day"""
+        self.close()
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"updates_{day:%Y-%m-%d}.jsonl.gz")
+        # Appending adds a new gzip member, readers decompress the members as one stream
+        self._file = gzip.open(path, "ab")
+        self._day = day
+        info(f"Запис оновлень у файл {path}")
+
+    def record(self, update: Update) -> None:
+        """Append an update to the recording"""
+        today = date.today()
+        if self._day != today:
+            self._open(today)
+
+        line = json.dumps(
+            {"t": round(time.time(), 3), "update": update.model_dump(mode="json", exclude_none=True, by_alias=True)},
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        self._file.write(line.encode("utf-8") + b"\n")
+        self.recorded += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Make everything recorded so far readable from the file"""
+        if self._file is not None and self._pending:
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+            self._pending = 0
+
+    def close(self) -> None:
+        """Finish the current file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._day = None
+            self._pending = 0
+            debug(f"Закрито файл запису оновлень, записано {self.recorded} оновлень")
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        try:
+            self.record(event)
+        except Exception as e:
+            # Recording must never stop the bot from answering
+            error(f"Не вдалося записати оновлення {event.update_id}: {e}")
+        return await handler(event, data)
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """Yield (arrival time, update as dict) from a recorded file, skipping a truncated last line"""
+    with gzip.open(path, "rt", encoding="utf-8") as recording:
+        try:
+            for line in recording:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                yield entry["t"], entry["update"]
+        except EOFError:
+            # The bot was stopped before the file was closed, the synced part is still readable
+            debug(f"Файл {path} обірвано, прочитано все до останньої синхронізації")
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.configs import bot, REMINDER_DELAYS_HOURS, REMINDER_RATE_PER_SECOND
+from bot.db.reminders import get_due_reminders, get_next_due_at, reschedule_reminders, get_resume_point
+from bot.utils.surveys import Survey, surveys
+from bot.logger import info, warning, error, debug
+
+# Reminders read and rescheduled per transaction, a batch takes BATCH_SIZE / rate seconds to send
+BATCH_SIZE = 50
+# The queue is checked at least this often (seconds), reminders planned meanwhile can be due earlier
+MAX_SLEEP = 60
+# Delay before a reminder that failed for a temporary reason is tried again
+RETRY_DELAY = timedelta(minutes=10)
+
+
+class RateLimiter:
+    """Token bucket that spaces out outgoing messages to a steady rate"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: Messages per second
+        :param burst: Messages that may be sent at once after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until another message may be sent"""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Send nothing for a while, e.g. when Telegram asks to retry later"""
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+def resume_keyboard(survey: Survey) -> InlineKeyboardMarkup:
+    """Button that continues the survey where the respondent stopped"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="▶️ Продовжити опитування", callback_data=f"resume_survey:{survey.survey_id}")]
+    ])
+
+
+def reminder_text(survey: Survey, question_index: int) -> str:
+    """Text of the reminder about an unfinished survey"""
+    title = f" «{survey.title}»" if len(surveys) > 1 else ""
+    remaining = max(len(survey.questions) - question_index, 1)
+    return (
+        f"👋 Ви не завершили опитування{title}.\n\n"
+        f"Залишилось питань: {remaining}. Продовжимо з того місця, де ви зупинилися?"
+    )
+
+
+async def resume_session_data(user_id: int, survey: Survey) -> Optional[Dict[str, Any]]:
+    """Rebuild the FSM data of an unfinished run from the database, None if there is nothing to resume"""
+    resume_point = await asyncio.to_thread(get_resume_point, user_id, survey.survey_id)
+    if resume_point is None:
+        return None
+
+    run, question_index, answers = resume_point
+    user_answers = {}
+    for question_id, answer_text, custom_answer in answers:
+        question_data = survey.questions_map.get(question_id)
+        if question_data is None:
+            continue
+        if question_data["multiple_choice"]:
+            selected = [option for option in (answer_text or "").split(" | ") if option]
+        else:
+            selected = answer_text or None
+        user_answers[question_data["question"]] = {"selected": selected, "custom": custom_answer or None}
+
+    return {
+        "survey": survey.survey_id,
+        "current_question": min(question_index, len(survey.questions)),
+        "answers": user_answers,
+        "run": run
+    }
+
+
+class ReminderScheduler:
+    """
+    Sends reminders about abandoned surveys from a single background task.
+
+    Pending reminders live in the reminders table, ordered by the due_at index, so the queue
+    survives restarts and its size doesn't matter: only the earliest due batch is read.
+    Messages are sent through a token bucket to stay within Telegram's rate limits.
+    """
+
+    def __init__(self, rate: float = REMINDER_RATE_PER_SECOND, delays_hours: List[float] = REMINDER_DELAYS_HOURS,
+                 batch_size: int = BATCH_SIZE):
+        """
+        :param rate: Reminder messages per second
+        :param delays_hours: Hours of inactivity after which each successive reminder is sent
+        :param batch_size: Reminders read and rescheduled per transaction
+        """
+        self.delays = [timedelta(hours=hours) for hours in delays_hours]
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self.sent = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the reminder loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            hours = ", ".join(f"{delay.total_seconds() / 3600:g}" for delay in self.delays)
+            info(f"Запущено нагадування про незавершені опитування через {hours} год. неактивності")
+
+    async def stop(self) -> None:
+        """Stop the reminder loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _next_due(self, attempt: int, now: datetime) -> Optional[datetime]:
+        """When the reminder after the given number of sent ones is due, None if there are no more"""
+        if attempt >= len(self.delays):
+            return None
+        return now + self.delays[attempt] - self.delays[attempt - 1]
+
+    async def _send(self, user_id: int, survey: Survey, question_index: int) -> Optional[bool]:
+        """Send one reminder: True if sent, False if the user can't be reached, None to try again later"""
+        while True:
+            await self.limiter.acquire()
+            try:
+                await bot.send_message(
+                    user_id,
+                    reminder_text(survey, question_index),
+                    reply_markup=resume_keyboard(survey),
+                    parse_mode=None
+                )
+                return True
+            except TelegramRetryAfter as e:
+                warning(f"Telegram обмежив надсилання нагадувань, пауза {e.retry_after} с")
+                self.limiter.pause(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                debug(f"Нагадування користувачу {user_id} не доставлено: {e}")
+                return False
+            except Exception as e:
+                error(f"Помилка надсилання нагадування користувачу {user_id}: {e}")
+                return None
+
+    async def send_due(self) -> int:
+        """Send one batch of due reminders and plan the next ones, return the number of processed reminders"""
+        reminders = await asyncio.to_thread(get_due_reminders, datetime.now(), self.batch_size)
+        outcomes: List[Dict[str, Any]] = []
+        for user_id, survey_id, run, question_index, attempt, due_at in reminders:
+            survey = surveys.get(survey_id)
+            # Surveys that are no longer served (or changed) get no reminders, like blocked bots and deleted chats
+            delivered = False
+            if survey is not None and question_index < len(survey.questions):
+                delivered = await self._send(user_id, survey, question_index)
+
+            new_attempt, new_due = attempt, None
+            if delivered:
+                self.sent += 1
+                new_attempt = attempt + 1
+                new_due = self._next_due(new_attempt, datetime.now())
+            elif delivered is None:
+                new_due = datetime.now() + RETRY_DELAY
+
+            outcomes.append({
+                "b_user_id": user_id, "b_survey_id": survey_id, "b_attempt": attempt, "b_due_at": due_at,
+                "new_attempt": new_attempt, "new_due_at": new_due
+            })
+
+        await asyncio.to_thread(reschedule_reminders, outcomes)
+        if reminders:
+            info(f"Оброблено {len(reminders)} нагадувань, усього надіслано {self.sent}")
+        return len(reminders)
+
+    async def _seconds_to_next(self) -> float:
+        """How long the loop may sleep before the earliest planned reminder"""
+        next_due = await asyncio.to_thread(get_next_due_at)
+        if next_due is None:
+            return MAX_SLEEP
+        return min(max((next_due - datetime.now()).total_seconds(), 0.0), MAX_SLEEP)
+
+    async def _run(self) -> None:
+        """Send due reminders batch by batch, sleep until the next one when the queue is drained"""
+        while True:
+            try:
+                processed = await self.send_due()
+                if processed < self.batch_size:
+                    await asyncio.sleep(await self._seconds_to_next() or 1)
+            except Exception as e:
+                error(f"Помилка надсилання нагадувань: {e}")
+                await asyncio.sleep(MAX_SLEEP)
+
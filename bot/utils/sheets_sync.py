@@ -0,0 +1,272 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+
+from bot.configs import (
+    GOOGLE_SHEETS_ID, GOOGLE_SHEETS_WORKSHEET, GOOGLE_CREDENTIALS_FILE, SHEETS_API_URL, SHEETS_SYNC_INTERVAL
+)
+from bot.db.analytics import get_new_completed_runs
+from bot.db.database import get_sync_cursor, set_sync_cursor
+from bot.utils.surveys import Survey, surveys
+from bot.logger import info, warning, error, debug
+
+CURSOR_NAME = "google_sheets"
+
+# Completed runs exported per append_rows call
+BATCH_SIZE = 500
+
+# HTTP statuses worth retrying: rate limiting and server-side errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SheetsTransport:
+    """Interface of the spreadsheet backends the sync job can write to"""
+
+    def get_header(self) -> List[str]:
+        """Return the first row of the worksheet"""
+        raise NotImplementedError
+
+    def set_header(self, header: List[str]) -> None:
+        """Write the first row of the worksheet"""
+        raise NotImplementedError
+
+    def append_rows(self, rows: List[List[Any]]) -> None:
+        """Append rows after the last filled row of the worksheet"""
+        raise NotImplementedError
+
+
+class GspreadTransport(SheetsTransport):
+    """Writes to Google Sheets through gspread with a service account"""
+
+    def __init__(self, credentials_file: str, spreadsheet_id: str, worksheet: str, columns: int = 26):
+        import gspread
+
+        client = gspread.service_account(filename=credentials_file)
+        spreadsheet = client.open_by_key(spreadsheet_id)
+        try:
+            self.worksheet = spreadsheet.worksheet(worksheet)
+        except gspread.exceptions.WorksheetNotFound:
+            self.worksheet = spreadsheet.add_worksheet(title=worksheet, rows=1000, cols=columns)
+
+    def get_header(self) -> List[str]:
+        return self.worksheet.row_values(1)
+
+    def set_header(self, header: List[str]) -> None:
+        self.worksheet.batch_update([{"range": "A1", "values": [header]}], value_input_option="RAW")
+
+    def append_rows(self, rows: List[List[Any]]) -> None:
+        self.worksheet.append_rows(rows, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+
+
+class RestSheetsTransport(SheetsTransport):
+    """
+    Talks to the Sheets v4 REST API directly.
+
+    The base URL is configurable, so the sync can run against a local fake Sheets server.
+    Without a credentials file the requests are sent unauthenticated.
+    """
+
+    def __init__(self, base_url: str, spreadsheet_id: str, worksheet: str,
+                 credentials_file: Optional[str] = None, timeout: float = 30):
+        self.base_url = f"{base_url.rstrip('/')}/v4/spreadsheets/{spreadsheet_id}"
+        self.worksheet = worksheet
+        self.timeout = timeout
+
+        if credentials_file:
+            from google.auth.transport.requests import AuthorizedSession
+            from google.oauth2.service_account import Credentials
+
+            credentials = Credentials.from_service_account_file(
+                credentials_file, scopes=["https://www.googleapis.com/auth/spreadsheets"]
+            )
+            self.session = AuthorizedSession(credentials)
+        else:
+            self.session = requests.Session()
+
+    def _range(self, cells: str) -> str:
+        """Build an URL-encoded A1 range on the worksheet"""
+        return quote(f"'{self.worksheet}'!{cells}", safe="")
+
+    def get_header(self) -> List[str]:
+        response = self.session.get(f"{self.base_url}/values/{self._range('1:1')}", timeout=self.timeout)
+        response.raise_for_status()
+        values = response.json().get("values", [])
+        return values[0] if values else []
+
+    def set_header(self, header: List[str]) -> None:
+        response = self.session.post(
+            f"{self.base_url}/values:batchUpdate",
+            json={"valueInputOption": "RAW", "data": [{"range": f"'{self.worksheet}'!A1", "values": [header]}]},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def append_rows(self, rows: List[List[Any]]) -> None:
+        response = self.session.post(
+            f"{self.base_url}/values/{self._range('A1')}:append",
+            params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            json={"values": rows},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+def worksheet_name(survey: Survey) -> str:
+    """Worksheet of a survey, the default survey keeps the configured one"""
+    if survey.survey_id == surveys.default_id:
+        return GOOGLE_SHEETS_WORKSHEET
+    return f"{GOOGLE_SHEETS_WORKSHEET} ({survey.survey_id})"
+
+
+def cursor_name(survey: Survey) -> str:
+    """Export cursor of a survey, the default survey keeps the original one"""
+    if survey.survey_id == surveys.default_id:
+        return CURSOR_NAME
+    return f"{CURSOR_NAME}:{survey.survey_id}"
+
+
+def create_transport(survey: Survey) -> SheetsTransport:
+    """Create the transport selected by the configuration for the survey's worksheet"""
+    worksheet = worksheet_name(survey)
+    if SHEETS_API_URL:
+        credentials_file = GOOGLE_CREDENTIALS_FILE if os.path.exists(GOOGLE_CREDENTIALS_FILE) else None
+        return RestSheetsTransport(SHEETS_API_URL, GOOGLE_SHEETS_ID, worksheet, credentials_file)
+    return GspreadTransport(GOOGLE_CREDENTIALS_FILE, GOOGLE_SHEETS_ID, worksheet, len(build_header(survey)))
+
+
+def _is_retryable(exception: Exception) -> bool:
+    """Check whether a failed Sheets call is worth repeating"""
+    if isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # Both gspread.exceptions.APIError and requests.HTTPError carry the HTTP response
+    response = getattr(exception, "response", None)
+    return getattr(response, "status_code", None) in RETRYABLE_STATUSES
+
+
+def with_backoff(call, *args, max_retries: int = 5, base_delay: float = 1.0):
+    """Run a Sheets call, retrying rate-limited and failed requests with exponential backoff"""
+    for attempt in range(max_retries + 1):
+        try:
+            return call(*args)
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+            warning(f"Помилка запиту до Google Sheets ({e}), повтор через {delay:.1f} с")
+            time.sleep(delay)
+
+
+def build_header(survey: Survey) -> List[str]:
+    """Column names of the exported worksheet"""
+    header = ["Користувач", "Спроба", "Завершено"]
+    for question in survey.questions:
+        header.append(f"{question['question_id']}. {question['question']}")
+        if question["text_response"] and question["answers"]:
+            header.append(f"{question['question_id']}. Інше")
+    return header
+
+
+def build_rows(answers: List[tuple], survey: Survey) -> Tuple[List[List[Any]], int]:
+    """Turn answers of completed runs into one worksheet row per run and return them with the new cursor"""
+    runs: Dict[tuple, Dict[int, tuple]] = {}
+    finished_at: Dict[tuple, Any] = {}
+    last_id = 0
+    for run_last_id, user_id, run, question_id, answer_text, custom_answer, timestamp in answers:
+        key = (user_id, run)
+        runs.setdefault(key, {})[question_id] = (answer_text or "", custom_answer or "")
+        finished_at[key] = max(finished_at.get(key, timestamp), timestamp)
+        last_id = max(last_id, run_last_id)
+
+    rows = []
+    for (user_id, run), run_answers in runs.items():
+        row = [user_id, run, str(finished_at[(user_id, run)])[:19]]
+        for question in survey.questions:
+            answer_text, custom_answer = run_answers.get(question["question_id"], ("", ""))
+            if question["text_response"] and question["answers"]:
+                row += [answer_text, custom_answer]
+            else:
+                row.append(answer_text or custom_answer)
+        rows.append(row)
+    return rows, last_id
+
+
+class SheetsSyncJob:
+    """Periodically appends newly completed surveys to a Google Sheet without blocking the bot"""
+
+    def __init__(self, transport_factory=create_transport, interval: int = SHEETS_SYNC_INTERVAL):
+        """
+        :param transport_factory: Callable creating the SheetsTransport of a survey
+            (called lazily in the worker thread)
+        :param interval: Seconds between sync runs
+        """
+        self.transport_factory = transport_factory
+        self.interval = interval
+        # Every survey is exported to its own worksheet
+        self._transports: Dict[str, SheetsTransport] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _transport(self, survey: Survey) -> SheetsTransport:
+        """Get the survey's transport, making sure its worksheet has the current header"""
+        transport = self._transports.get(survey.survey_id)
+        if transport is None:
+            transport = self.transport_factory(survey)
+            header = build_header(survey)
+            if with_backoff(transport.get_header) != header:
+                with_backoff(transport.set_header, header)
+            self._transports[survey.survey_id] = transport
+        return transport
+
+    def sync_survey(self, survey: Survey) -> int:
+        """Export every completed run of a survey newer than its cursor and return the number of exported rows"""
+        exported = 0
+        cursor = get_sync_cursor(cursor_name(survey))
+        last_question_id = survey.questions[-1]["question_id"]
+        while True:
+            answers = get_new_completed_runs(cursor, last_question_id, BATCH_SIZE, survey.survey_id)
+            if not answers:
+                break
+
+            rows, cursor = build_rows(answers, survey)
+            with_backoff(self._transport(survey).append_rows, rows)
+            # Move the cursor only after the rows were accepted
+            set_sync_cursor(cursor_name(survey), cursor)
+            exported += len(rows)
+            debug(f"Експортовано {len(rows)} опитувань '{survey.survey_id}' у Google Sheets, курсор {cursor}")
+
+        if exported:
+            info(f"Експортовано {exported} нових опитувань '{survey.survey_id}' у Google Sheets")
+        return exported
+
+    def sync_once(self) -> int:
+        """Export the new completed runs of every survey and return the number of exported rows"""
+        return sum(self.sync_survey(survey) for survey in surveys)
+
+    def start(self) -> None:
+        """Start the periodic sync loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            info(f"Запущено синхронізацію з Google Sheets кожні {self.interval} с")
+
+    async def stop(self) -> None:
+        """Stop the periodic sync loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Run the sync in a worker thread every interval"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sync_once)
+            except Exception as e:
+                error(f"Помилка синхронізації з Google Sheets: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,114 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from bot.configs import QUESTIONS_FILE, IMAGES_FOLDER, DEFAULT_SURVEY, SURVEYS_FOLDER
+from bot.utils.memory import register_cache
+from bot.logger import info, warning, error, debug
+
+# Survey ids travel in deep links and callback data (64 bytes at most), so they are short and URL-safe
+SURVEY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+class Survey:
+    """
+    One questionnaire served by the bot, with the caches of everything it sends repeatedly.
+
+    The questions file is either a list of questions or an object with "questions" and
+    optional "title" and "final_message".
+    """
+
+    def __init__(self, survey_id: str, questions_file: str, images_folder: str):
+        with open(questions_file, "r", encoding="utf-8") as json_file:
+            content = json.load(json_file)
+        if isinstance(content, list):
+            content = {"questions": content}
+
+        self.survey_id = survey_id
+        self.title: str = content.get("title") or survey_id
+        self.final_message: Optional[str] = content.get("final_message")
+        self.questions: List[Dict[str, Any]] = content["questions"]
+        self.questions_map: Dict[int, Dict[str, Any]] = {q["question_id"]: q for q in self.questions}
+        self.images_folder = images_folder
+        self._positions = {q["question_id"]: idx for idx, q in enumerate(self.questions)}
+
+        # Keyboards without selected options per question id, they are the same for every respondent
+        self.keyboards: Dict[int, InlineKeyboardMarkup] = {}
+        # Telegram file_id of every question image uploaded once, by question index
+        self.photo_ids: Dict[int, str] = {}
+        # Answer counts per question id with the data version they were read at
+        self.tallies: Dict[int, Tuple[int, List[Tuple[str, int]]]] = {}
+
+        debug(f"Завантажено опитування '{survey_id}': {len(self.questions)} питань з файлу {questions_file}")
+
+    def next_question_index(self, question_index: int, answer_text: Any) -> int:
+        """Return the index of the question that follows the given answer"""
+        # "skip_to" maps an answer to the id of the question it jumps to, e.g. {"Ні": 20}
+        skip_to = self.questions[question_index].get("skip_to") if question_index < len(self.questions) else None
+        if skip_to and isinstance(answer_text, str) and answer_text in skip_to:
+            return self._positions.get(skip_to[answer_text], question_index + 1)
+        return question_index + 1
+
+    def image_path(self, question_index: int) -> str:
+        """Path of the image shown with a question, image files are numbered from 1"""
+        return os.path.join(self.images_folder, f"{question_index + 1}.PNG")
+
+
+class SurveyRegistry:
+    """All surveys of the bot by id, loaded once at startup"""
+
+    def __init__(self, default_id: str = DEFAULT_SURVEY):
+        self.default_id = default_id
+        self._surveys: Dict[str, Survey] = {}
+
+    def add(self, survey: Survey) -> None:
+        """Register a survey"""
+        self._surveys[survey.survey_id] = survey
+
+    def load(self, surveys_folder: str = SURVEYS_FOLDER) -> None:
+        """Load the default survey and every survey folder"""
+        self.add(Survey(self.default_id, QUESTIONS_FILE, IMAGES_FOLDER))
+
+        if not os.path.isdir(surveys_folder):
+            return
+        for survey_id in sorted(os.listdir(surveys_folder)):
+            folder = os.path.join(surveys_folder, survey_id)
+            questions_file = os.path.join(folder, "questions.json")
+            if not os.path.isfile(questions_file):
+                continue
+            if not SURVEY_ID_PATTERN.match(survey_id) or survey_id in self._surveys:
+                warning(f"Пропущено опитування '{survey_id}': недопустимий або повторений ідентифікатор")
+                continue
+            try:
+                self.add(Survey(survey_id, questions_file, os.path.join(folder, "src")))
+            except (OSError, ValueError, KeyError) as e:
+                error(f"Не вдалося завантажити опитування '{survey_id}': {e}")
+
+        info(f"Завантажено опитувань: {len(self._surveys)} ({', '.join(self._surveys)})")
+
+    @property
+    def default(self) -> Survey:
+        """The survey opened by a plain /start"""
+        return self._surveys[self.default_id]
+
+    def get(self, survey_id: Optional[str] = None) -> Optional[Survey]:
+        """Find a survey by id, None gives the default survey"""
+        return self._surveys.get(survey_id or self.default_id)
+
+    def __iter__(self) -> Iterator[Survey]:
+        return iter(self._surveys.values())
+
+    def __len__(self) -> int:
+        return len(self._surveys)
+
+
+surveys = SurveyRegistry()
+surveys.load()
+
+register_cache(
+    "surveys",
+    lambda: {survey.survey_id: (survey.keyboards, survey.photo_ids, survey.tallies) for survey in surveys}
+)
@@ -0,0 +1,245 @@
+import re
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.db.analytics import get_custom_answers_since
+from bot.utils.surveys import Survey, surveys
+from bot.utils.memory import register_cache
+from bot.logger import info, debug
+
+# Answers are timestamped before they are written, so re-read a short window before the cursor
+CURSOR_OVERLAP = timedelta(minutes=1)
+
+# Words (with Ukrainian apostrophes) of at least MIN_TERM_LENGTH letters are counted as terms
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['ʼ’][^\W\d_]+)*")
+MIN_TERM_LENGTH = 3
+STOP_WORDS = {
+    "але", "або", "без", "бути", "буде", "був", "була", "було", "вам", "вас", "все", "всі", "вже", "від",
+    "вона", "вони", "дуже", "для", "його", "коли", "мене", "мені", "мій", "між", "нам", "нас", "наш", "наша",
+    "наші", "немає", "нема", "них", "під", "при", "про", "так", "там", "тим", "тих", "тобто", "тут", "хочу",
+    "цей", "цих", "цього", "через", "щоб", "які", "який", "яка", "яке", "якщо", "також", "тому", "ніж", "саме",
+    "більше", "можна", "треба", "має", "мають", "щось", "чим", "чого", "той", "цим", "цієї", "їх", "її",
+}
+
+# Near-duplicate detection: hashed feature space size, cosine similarity threshold and rows per matmul block
+HASH_DIMENSIONS = 2048
+SIMILARITY_THRESHOLD = 0.8
+SIMILARITY_BLOCK = 512
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a free-text answer into lowercase terms without stop words"""
+    return [
+        word for word in WORD_PATTERN.findall(text.lower().replace("’", "'").replace("ʼ", "'"))
+        if len(word) >= MIN_TERM_LENGTH and word not in STOP_WORDS
+    ]
+
+
+def _hashed_features(terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash the terms and their character trigrams into a sparse L2-normalised vector"""
+    features = Counter()
+    for term in terms:
+        features[zlib.crc32(term.encode()) % HASH_DIMENSIONS] += 2.0
+        padded = f"<{term}>"
+        # Trigrams make different word forms ("кормів", "корм") similar
+        for idx in range(len(padded) - 2):
+            features[zlib.crc32(padded[idx:idx + 3].encode()) % HASH_DIMENSIONS] += 1.0
+
+    indices = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+    values = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    norm = np.linalg.norm(values)
+    return indices, values / norm if norm else values
+
+
+class QuestionTexts:
+    """Free-text answers of one question with their term and phrase counts"""
+
+    def __init__(self):
+        self.texts: Dict[int, str] = {}
+        # Number of answers mentioning every term / two-word phrase
+        self.terms: Counter = Counter()
+        self.phrases: Counter = Counter()
+        # Distinct normalised texts: how many respondents wrote them, their hashed vectors and an original text
+        self.variants: Counter = Counter()
+        self.vectors: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.samples: Dict[str, str] = {}
+        self.version = 0
+
+    def _count(self, text: str, change: int) -> None:
+        """Add (change=1) or remove (change=-1) a text from the counts"""
+        terms = tokenize(text)
+        phrases = {f"{first} {second}" for first, second in zip(terms, terms[1:])}
+        variant = " ".join(terms) or text.strip().lower()
+
+        for counter, keys in ((self.terms, set(terms)), (self.phrases, phrases), (self.variants, {variant})):
+            for key in keys:
+                counter[key] += change
+                if counter[key] <= 0:
+                    del counter[key]
+
+        if change > 0 and variant not in self.vectors:
+            self.vectors[variant] = _hashed_features(terms)
+            self.samples[variant] = text
+        elif variant not in self.variants:
+            self.vectors.pop(variant, None)
+            self.samples.pop(variant, None)
+
+    def set(self, user_id: int, text: Optional[str]) -> None:
+        """Replace the respondent's answer, an empty text removes it"""
+        text = (text or "").strip()
+        previous = self.texts.get(user_id)
+        if previous == (text or None):
+            return
+        if previous:
+            self._count(previous, -1)
+            del self.texts[user_id]
+        if text:
+            self.texts[user_id] = text
+            self._count(text, 1)
+        self.version += 1
+
+    def clusters(self) -> List[Tuple[str, int, int]]:
+        """Group similar answers, returning (most common text, respondents, distinct variants) per group"""
+        variants = list(self.variants)
+        if not variants:
+            return []
+
+        # Dense matrix of the distinct variants, identical answers were already merged
+        matrix = np.zeros((len(variants), HASH_DIMENSIONS), dtype=np.float32)
+        for row, variant in enumerate(variants):
+            indices, values = self.vectors[variant]
+            matrix[row, indices] = values
+
+        # Union-find over pairs above the similarity threshold, computed block by block
+        parents = np.arange(len(variants))
+
+        def find(node: int) -> int:
+            while parents[node] != node:
+                parents[node] = parents[parents[node]]
+                node = parents[node]
+            return node
+
+        for start in range(0, len(variants), SIMILARITY_BLOCK):
+            similarity = matrix[start:start + SIMILARITY_BLOCK] @ matrix.T
+            rows, columns = np.nonzero(similarity >= SIMILARITY_THRESHOLD)
+            rows += start
+            for first, second in zip(rows[rows < columns], columns[rows < columns]):
+                root_first, root_second = find(first), find(second)
+                if root_first != root_second:
+                    parents[root_second] = root_first
+
+        groups: Dict[int, List[str]] = {}
+        for row, variant in enumerate(variants):
+            groups.setdefault(find(row), []).append(variant)
+
+        clusters = []
+        for members in groups.values():
+            respondents = sum(self.variants[member] for member in members)
+            representative = max(members, key=lambda member: self.variants[member])
+            clusters.append((self.samples[representative], respondents, len(members)))
+        return sorted(clusters, key=lambda cluster: cluster[1], reverse=True)
+
+
+class FreeTextIndex:
+    """
+    Term and phrase counts of free-text answers, updated incrementally.
+
+    Only answers written since the previous refresh are read, the counts of a changed answer
+    are adjusted by removing its old text and adding the new one.
+    Like the other analytics, only the latest run of every respondent is counted.
+    """
+
+    def __init__(self, survey: Survey):
+        self._survey_id = survey.survey_id
+        self._questions = {q_id: QuestionTexts() for q_id, q in survey.questions_map.items() if q["text_response"]}
+        self._runs: Dict[int, int] = {}
+        self._cursor: Optional[datetime] = None
+        # Clusters per question with the text version they were computed for
+        self._clusters: Dict[int, Tuple[int, List[Tuple[str, int, int]]]] = {}
+        # Reports are built in worker threads
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Apply answers written since the previous refresh"""
+        refreshed_at = datetime.now()
+        since = self._cursor - CURSOR_OVERLAP if self._cursor else None
+        answers = get_custom_answers_since(since, self._survey_id)
+        self._cursor = refreshed_at
+
+        for user_id, run, question_id, custom_answer in answers:
+            known_run = self._runs.get(user_id, 0)
+            if run < known_run:
+                continue
+            if run > known_run:
+                # A retake replaces everything the respondent wrote before
+                for question_texts in self._questions.values():
+                    question_texts.set(user_id, None)
+                self._runs[user_id] = run
+            if question_id in self._questions:
+                self._questions[question_id].set(user_id, custom_answer)
+
+        if answers:
+            debug(f"Оновлено статистику текстових відповідей: {len(answers)} відповідей")
+
+    def _summarize(self, question_id: int, top: int) -> Dict[str, object]:
+        """Top terms, phrases and near-duplicate clusters of a question's free-text answers"""
+        question_texts = self._questions[question_id]
+        cached = self._clusters.get(question_id)
+        if cached is None or cached[0] != question_texts.version:
+            cached = (question_texts.version, question_texts.clusters())
+            self._clusters[question_id] = cached
+
+        return {
+            "answers": len(question_texts.texts),
+            "terms": question_texts.terms.most_common(top),
+            "phrases": [(phrase, count) for phrase, count in question_texts.phrases.most_common(top) if count > 1],
+            # Answers nobody else gave are not worth listing
+            "clusters": [cluster for cluster in cached[1] if cluster[1] > 1][:top],
+        }
+
+    def report(self, top: int = 10) -> Dict[int, Dict[str, object]]:
+        """Refresh the counts and summarise every free-text question"""
+        with self._lock:
+            self.refresh()
+            return {question_id: self._summarize(question_id, top) for question_id in self._questions}
+
+
+# Indexes per survey id, created when a survey's report is first requested
+text_indexes: Dict[str, FreeTextIndex] = {}
+_indexes_lock = threading.Lock()
+
+register_cache("free_text", lambda: text_indexes)
+
+
+def build_text_report(top: int = 10, survey: Optional[Survey] = None) -> str:
+    """Describe the free-text answers of every question that accepts them"""
+    survey = survey or surveys.default
+    with _indexes_lock:
+        if survey.survey_id not in text_indexes:
+            text_indexes[survey.survey_id] = FreeTextIndex(survey)
+
+    lines = ["📝 Текстові відповіді\n"]
+    for question_id, summary in text_indexes[survey.survey_id].report(top).items():
+        lines.append(f"Питання {question_id}: {survey.questions_map[question_id]['question']}")
+        if not summary["answers"]:
+            lines.append("Немає текстових відповідей.\n")
+            continue
+
+        lines.append(f"Відповідей: {summary['answers']}")
+        if summary["terms"]:
+            lines.append("Часті слова: " + ", ".join(f"{term} ({count})" for term, count in summary["terms"]))
+        if summary["phrases"]:
+            lines.append("Часті фрази: " + ", ".join(f"{phrase} ({count})" for phrase, count in summary["phrases"]))
+        if summary["clusters"]:
+            lines.append("Схожі відповіді:")
+            for text, respondents, variants in summary["clusters"]:
+                lines.append(f"• «{text[:100]}» — {respondents} відп. ({variants} варіантів)")
+        lines.append("")
+
+    info(f"Побудовано звіт з текстових відповідей опитування '{survey.survey_id}'")
+    return "\n".join(lines)
@@ -0,0 +1,126 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.db.analytics import get_event_times
+from bot.db.database import get_history_version
+from bot.utils.surveys import Survey, surveys
+from bot.utils.memory import register_cache
+from bot.logger import info, debug
+
+# Admin-selectable ranges: (title, number of buckets, bucket length)
+PERIODS = {
+    "24h": ("за останні 24 години", 24, timedelta(hours=1)),
+    "7d": ("за останні 7 днів", 7, timedelta(days=1)),
+    "30d": ("за останні 30 днів", 30, timedelta(days=1)),
+}
+
+SERIES = {
+    "started": "Розпочали",
+    "completed": "Завершили",
+    "answers": "Відповіді",
+}
+
+# Answers are timestamped before they are written, so a bucket is only cached a bit after it ends
+SETTLE_DELAY = timedelta(minutes=1)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Counts of closed buckets per (survey id, series, bucket length in seconds) and bucket start
+_closed_buckets: Dict[Tuple[str, str, int], Dict[int, int]] = {}
+# History version of every survey the cached buckets were counted at
+_cache_versions: Dict[str, int] = {}
+_cache_lock = threading.Lock()
+
+register_cache("timeseries", lambda: _closed_buckets)
+
+
+def _to_seconds(moment: datetime) -> int:
+    """Convert a naive local datetime to seconds, the same way the SQL queries do"""
+    return int((moment - EPOCH).total_seconds())
+
+
+def count_events(event: str, first_bucket: datetime, buckets: int, bucket: timedelta,
+                 survey_id: str) -> np.ndarray:
+    """Count events per bucket, re-reading only the buckets that are not cached yet"""
+    size = int(bucket.total_seconds())
+    start = _to_seconds(first_bucket)
+    starts = start + size * np.arange(buckets)
+    settled_until = _to_seconds(datetime.now() - SETTLE_DELAY)
+
+    version = get_history_version(survey_id)
+    with _cache_lock:
+        # Retakes rewrite run times and drop replaced answers, which changes buckets that are already closed
+        if _cache_versions.get(survey_id, 0) != version:
+            for key in [key for key in _closed_buckets if key[0] == survey_id]:
+                del _closed_buckets[key]
+            _cache_versions[survey_id] = version
+        cache = _closed_buckets.setdefault((survey_id, event, size), {})
+        cached = np.array([bucket_start in cache for bucket_start in starts], dtype=bool)
+        counts = np.array([cache.get(int(bucket_start), 0) for bucket_start in starts], dtype=np.int64)
+
+    if cached.all():
+        return counts
+
+    # Everything from the first missing bucket to the end of the range is read in one range scan
+    first_missing = int(np.argmin(cached))
+    since = EPOCH + timedelta(seconds=int(starts[first_missing]))
+    until = EPOCH + timedelta(seconds=int(start + size * buckets))
+    times = np.asarray(get_event_times(event, since, until, survey_id), dtype=np.float64)
+
+    positions = np.clip((times - start) // size, 0, buckets - 1).astype(np.int64)
+    fresh = np.bincount(positions, minlength=buckets)
+    counts[first_missing:] = fresh[first_missing:]
+
+    with _cache_lock:
+        for idx in range(first_missing, buckets):
+            if starts[idx] + size <= settled_until:
+                cache[int(starts[idx])] = int(counts[idx])
+
+    debug(f"Перераховано {buckets - first_missing} інтервалів для '{event}' з {len(times)} подій")
+    return counts
+
+
+def build_timeseries(period: str, survey: Optional[Survey] = None) -> Tuple[str, List[str], Dict[str, List[int]]]:
+    """Count survey starts, completions and answers per bucket over the selected period"""
+    survey = survey or surveys.default
+    title, buckets, bucket = PERIODS[period]
+
+    # Buckets are aligned to whole hours or days, the last one is the current (open) bucket
+    now = datetime.now()
+    if bucket >= timedelta(days=1):
+        current = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        label_format = "%d.%m"
+    else:
+        current = now.replace(minute=0, second=0, microsecond=0)
+        label_format = "%H:00"
+    first_bucket = current - bucket * (buckets - 1)
+
+    labels = [(first_bucket + bucket * idx).strftime(label_format) for idx in range(buckets)]
+    series = {
+        SERIES[event]: count_events(event, first_bucket, buckets, bucket, survey.survey_id).tolist()
+        for event in SERIES
+    }
+
+    info(f"Побудовано динаміку відповідей опитування '{survey.survey_id}' {title}")
+    return f"Динаміка опитування {title}", labels, series
+
+
+def generate_timeseries_chart(period: str, backend: str = None, survey: Optional[Survey] = None):
+    """Render the starts/completions chart and a text summary for the selected period"""
+    from bot.utils.visualization import get_chart_renderer
+
+    title, labels, series = build_timeseries(period, survey)
+    answers = series.pop(SERIES["answers"])
+    buffer = get_chart_renderer(backend).render_bar_chart(title, labels, series)
+
+    started, completed = sum(series[SERIES["started"]]), sum(series[SERIES["completed"]])
+    summary = (
+        f"📈 {title}:\n\n"
+        f"Розпочали опитування: {started}\n"
+        f"Завершили опитування: {completed}\n"
+        f"Надано відповідей: {sum(answers)}\n"
+    )
+    return buffer, summary
@@ -1,106 +1,90 @@
 import io
-import pandas as pd
-import matplotlib.pyplot as plt
-from typing import Tuple, Optional
+import importlib
+from collections import Counter
+from typing import List, Tuple, Optional
+
+from bot.configs import CHART_BACKEND
+from bot.utils.helpers import wrap_text
+from bot.utils.surveys import Survey, surveys
+from bot.db.analytics import get_answer_text_counts
+from bot.db.database import get_data_version
+from bot.logger import info, warning, error, debug
+
+# Modules implementing render_pie_chart/render_bar_chart/render_heatmap for every CHART_BACKEND value
+CHART_BACKENDS = {
+    "matplotlib": "bot.utils.matplotlib_charts",
+    "pillow": "bot.utils.pillow_charts",
+}
+
+
+def get_chart_renderer(backend: str = None):
+    """Import (on first use) the module that draws charts with the selected backend"""
+    backend = backend or CHART_BACKEND
+    if backend not in CHART_BACKENDS:
+        warning(f"Невідомий рушій діаграм '{backend}', використовується matplotlib")
+        backend = "matplotlib"
+    return importlib.import_module(CHART_BACKENDS[backend])
+
+
+def count_question_answers(question_id, survey: Optional[Survey] = None) -> List[Tuple[str, int]]:
+    """Count how many times every option was chosen, most frequent first"""
+    survey = survey or surveys.default
+    is_multiple_choice = survey.questions_map[question_id]["multiple_choice"]
+
+    # Tallies are reused until this survey receives new answers
+    data_version = get_data_version(survey.survey_id)
+    cached = survey.tallies.get(question_id)
+    if cached and cached[0] == data_version:
+        debug(f"Використано кешовані результати питання {question_id} опитування '{survey.survey_id}'")
+        return cached[1]
+
+    # Identical answers are grouped by the database, only distinct combinations are split here
+    answer_counts = Counter()
+    for answer_text, count in get_answer_text_counts(question_id, survey.survey_id):
+        if answer_text:
+            if is_multiple_choice and " | " in answer_text:
+                for option in answer_text.split(" | "):
+                    answer_counts[option.strip()] += count
+            else:
+                answer_counts[answer_text.strip()] += count
 
-from bot.utils.helpers import wrap_text, questions_map
-from bot.db.database import get_question_answers
-from bot.logger import info, error, debug
+    tally = answer_counts.most_common()
+    survey.tallies[question_id] = (data_version, tally)
+    return tally
 
 
-def generate_pie_chart(question_id):
+def generate_pie_chart(question_id, backend: str = None, survey: Optional[Survey] = None):
     """Generate a pie chart for a specific question and return image as bytes"""
     debug(f"Генерація діаграми для питання {question_id}")
+    survey = survey or surveys.default
 
-    if question_id not in questions_map:
+    if question_id not in survey.questions_map:
         warning(f"Питання з ID {question_id} не знайдено")
         return None, None  # If question not found
 
     # Get question info
-    question_info = questions_map[question_id]
-    question_text = question_info["question"]
-    is_multiple_choice = question_info["multiple_choice"]
-
-    # Get answers from SQLAlchemy database
-    answers_data = get_question_answers(question_id)
-
-    if not answers_data:
-        debug(f"Немає відповідей для питання {question_id}")
-        return None, None  # If no answers
-
-    # Process answers
-    all_answers = []
-
-    for answer in answers_data:
-        answer_text = answer["answer_text"]
-        if answer_text:
-            if is_multiple_choice and " | " in answer_text:
-                split_answers = answer_text.split(" | ")
-                all_answers.extend([a.strip() for a in split_answers])
-            else:
-                all_answers.append(answer_text.strip())
-
-    if not all_answers:
-        debug(f"Немає валідних відповідей для питання {question_id} після обробки")
-        return None, None  # If no valid answers after processing
+    question_text = survey.questions_map[question_id]["question"]
 
     # Count answer frequency
-    answer_counts = pd.Series(all_answers).value_counts()
-    debug(f"Знайдено {len(answer_counts)} різних варіантів відповідей для питання {question_id}")
-
-    # Create figure
-    plt.figure(figsize=(8, 6))
-
-    # Create subplot
-    ax = plt.subplot(111)
+    answer_counts = count_question_answers(question_id, survey)
 
-    # Use color blind friendly color palette
-    colors = plt.cm.tab10.colors[:len(answer_counts)]
-
-    # Get the original labels
-    original_labels = list(answer_counts.index)
+    if not answer_counts:
+        debug(f"Немає валідних відповідей для питання {question_id}")
+        return None, None  # If no valid answers
+    debug(f"Знайдено {len(answer_counts)} різних варіантів відповідей для питання {question_id}")
 
-    # Wrap labels for better display
-    wrapped_labels = [wrap_text(label, max_width=15) for label in original_labels]
+    labels = [answer for answer, _ in answer_counts]
+    values = [count for _, count in answer_counts]
 
     # Format question text with wrapping
-    wrapped_question = wrap_text(question_text, max_width=40)
-
-    # Create pie chart with wrapped labels
-    wedges, texts, autotexts = ax.pie(
-        answer_counts.values,
-        labels=wrapped_labels,
-        autopct='%1.1f%%',
-        colors=colors,
-        startangle=90,
-        wedgeprops={'edgecolor': 'w', 'linewidth': 1},
-        textprops={'fontsize': 9}
-    )
-
-    # Improve text properties for better readability
-    plt.setp(texts, fontsize=8)
-    for autotext in autotexts:
-        autotext.set_fontsize(8)
-        autotext.set_color('white')
-        autotext.set_fontweight('bold')
-
-    # Add title with wrapped question text
-    ax.set_title(f"Питання {question_id}:\n{wrapped_question}", fontsize=10, pad=15)
-
-    # Make sure the pie chart is a circle
-    ax.axis('equal')
-
-    # Save chart to memory buffer with higher DPI for better quality
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png", dpi=120, bbox_inches='tight')
-    buffer.seek(0)
-    plt.close()
+    title = f"Питання {question_id}:\n{wrap_text(question_text, max_width=40)}"
+    buffer = get_chart_renderer(backend).render_pie_chart(title, labels, values)
 
     # Prepare text data for return
-    total_responses = sum(answer_counts.values)
+    total_responses = sum(values)
     color_data_text = ""
 
-    for answer, count in answer_counts.items():
+    for answer, count in answer_counts:
         percentage = (count / total_responses) * 100
         color_data_text += f"{answer} - {count} відповідей ({percentage:.1f}%)\n"
 
@@ -108,13 +92,16 @@ def generate_pie_chart(question_id):
     return buffer, color_data_text
 
 
-def generate_survey_stats_chart() -> Tuple[Optional[io.BytesIO], Optional[str]]:
+def generate_survey_stats_chart(survey: Optional[Survey] = None) -> Tuple[Optional[io.BytesIO], Optional[str]]:
     """Generate a chart showing overall survey statistics"""
     debug("Генерація діаграми статистики опитування")
+    import matplotlib
+    matplotlib.use("Agg")  # The bot renders charts to PNG only, never to a window
+    import matplotlib.pyplot as plt
     from bot.db.database import get_survey_stats
 
     # Get survey statistics
-    stats = get_survey_stats()
+    stats = get_survey_stats((survey or surveys.default).survey_id)
 
     if stats["total_users"] == 0:
         debug("Немає даних для візуалізації статистики опитування")